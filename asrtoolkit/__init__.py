@@ -4,7 +4,7 @@ import logging
 from num2words import base
 from pkg_resources import get_distribution
 
-from .clean_formatting import clean_up
+from .clean_formatting import Normalizer, clean_up
 from .convert_transcript import convert
 from .data_structures import (
     AudioFile,
@@ -31,6 +31,7 @@ __all__ = [
     Corpus,
     Exemplar,
     get_extension,
+    Normalizer,
     sanitize,
     strip_extension,
     Transcript,
@@ -4,9 +4,16 @@
 Text line cleaning functions. For WER calculations, final text should be utf letter chars and \'
 """
 
+import json
 import logging
+import os
 import string
+import sys
+import time
 from collections import OrderedDict
+from contextlib import contextmanager
+from functools import partial
+from itertools import chain, islice
 
 import regex
 from fire import Fire
@@ -18,101 +25,207 @@ from asrtoolkit.deformatting_utils import (
     ordinal_to_string,
     plural_numbers_to_string,
 )
+from asrtoolkit.file_utils.executor import BoundedExecutor
+from asrtoolkit.file_utils.hashing import hash_bytes
+from asrtoolkit.file_utils.name_cleaners import basename, strip_extension
 from asrtoolkit.file_utils.script_input_validation import valid_input_file
 
 LOGGER = logging.getLogger(__name__)
 
+# lines cleaned per task by clean_text_file
+CHUNK_LINES = 2000
+
 # preserve any unicode letters
 invalid_chars = regex.compile(r"[^\p{L}<\[\]> \']", regex.IGNORECASE)
 
 spaces = regex.compile(r"\s+")
 
-KNOWN_REPLACEMENTS = OrderedDict(
-    [
-        ("millions", (regex.compile(r"\b(mln|mio|mlns)\b"), lambda m: "million")),
-        ("pleases", (regex.compile(r"\b(plz|pls)\b"), lambda m: "please")),
-        ("thanks", (regex.compile(r"\b(thks|thx)\b"), lambda m: "thanks")),
-        ("otc", (regex.compile(r"\b(otc)\b"), lambda m: "o t c")),
-        ("ellipses", (regex.compile(r"\.{2,}"), lambda m: " ")),
-        (
-            "websites",
-            (
-                regex.compile(r"[.](net|org|com|gov)\b"),
-                lambda m: " dot " + m.group().lower().replace(".", ""),
-            ),
-        ),
-        (
-            "phone_numbers",
-            (
-                regex.compile(
-                    r"\b((1|44)[ -.]?)?([\(]?([0-9]{1,}[\)]?[ -.]?){2,5})[0-9]{4}\b"
-                ),
-                lambda m: " ".join(
-                    digits_to_string(_) for _ in m.group() if _.isdigit()
-                ),
-            ),
-        ),
-        (
-            "acronyms",
-            (
-                regex.compile(r"\b(([A-Z]){1,}[.]?){2,}\b"),
-                lambda m: " ".join(m.group().lower().replace(".", "")),
-            ),
-        ),
-        (
-            "dashes",
-            (regex.compile(r"\-[0-9]\b"), lambda m: "negative " + m.group()[1:]),
-        ),
-        ("negatives", (regex.compile(r" \- "), lambda m: "")),
-        ("positives", (regex.compile(r"\+"), lambda m: " plus ")),
-        (
-            "ordinals",
-            (
-                regex.compile(r"[0-9]{1,}(st|nd|rd|th)"),
-                lambda m: ordinal_to_string(m.group()),
-            ),
-        ),
-        (
-            "many_dollars",
-            (
-                regex.compile(r"\$([0-9]{1,}\.?[0-9]{0,})\s(billion|million|trillion)"),
-                lambda m: " ".join(
-                    [digits_to_string(m.groups()[0]), m.groups()[1], "dollars"]
-                ),
-            ),
-        ),
-        (
-            "dollars",
-            (
-                regex.compile(r"\$[0-9]{1,}\.?[0-9]{0,}[mbkMBK]?"),
-                lambda m: dollars_to_string(m.group()),
-            ),
-        ),
-        ("percent", (regex.compile(r"\%"), lambda m: " percent")),
-        (
-            "fractions",
-            (
-                regex.compile(r"\b[0-9]\s?\/\s?[0-9]\b"),
-                lambda m: fraction_to_string(m.group()),
-            ),
-        ),
-        (
-            "plural_numbers",
-            (
-                regex.compile(r"\b[0-9]{1,}s\b"),
-                lambda m: plural_numbers_to_string(m.group()),
-            ),
-        ),
-        (
-            "numbers",
-            (
-                regex.compile(r"[0-9\.]{1,}"),
-                lambda m: " " + digits_to_string(m.group()) + " ",
-            ),
-        ),
-        ("apostrophes", (regex.compile(r"\'"), lambda m: " '")),
-    ]
-)
+# text made only of these characters needs no cleaning beyond removing double spaces
+CLEAN_CHARS = string.ascii_lowercase + " "
+DELETE_CLEAN_CHARS = str.maketrans("", "", CLEAN_CHARS)
+
+# named replacement functions which normalization rules can refer to
+REPLACEMENT_FUNCTIONS = {
+    "website": lambda m: " dot " + m.group().lower().replace(".", ""),
+    "spell_digits": lambda m: " ".join(
+        digits_to_string(_) for _ in m.group() if _.isdigit()
+    ),
+    "spell_letters": lambda m: " ".join(m.group().lower().replace(".", "")),
+    "negative": lambda m: "negative " + m.group()[1:],
+    "ordinal": lambda m: ordinal_to_string(m.group()),
+    "many_dollars": lambda m: " ".join(
+        [digits_to_string(m.groups()[0]), m.groups()[1], "dollars"]
+    ),
+    "dollars": lambda m: dollars_to_string(m.group()),
+    "fraction": lambda m: fraction_to_string(m.group()),
+    "plural_number": lambda m: plural_numbers_to_string(m.group()),
+    "number": lambda m: " " + digits_to_string(m.group()) + " ",
+}
+
+# rules of the default normalization profile, applied in order
+# each has a name, a regex pattern and either a replacement template or a function
+DEFAULT_RULES = [
+    {"name": "millions", "pattern": r"\b(mln|mio|mlns)\b", "replacement": "million"},
+    {"name": "pleases", "pattern": r"\b(plz|pls)\b", "replacement": "please"},
+    {"name": "thanks", "pattern": r"\b(thks|thx)\b", "replacement": "thanks"},
+    {"name": "otc", "pattern": r"\b(otc)\b", "replacement": "o t c"},
+    {"name": "ellipses", "pattern": r"\.{2,}", "replacement": " "},
+    {"name": "websites", "pattern": r"[.](net|org|com|gov)\b", "function": "website"},
+    {
+        "name": "phone_numbers",
+        "pattern": r"\b((1|44)[ -.]?)?([\(]?([0-9]{1,}[\)]?[ -.]?){2,5})[0-9]{4}\b",
+        "function": "spell_digits",
+    },
+    {
+        "name": "acronyms",
+        "pattern": r"\b(([A-Z]){1,}[.]?){2,}\b",
+        "function": "spell_letters",
+    },
+    {"name": "dashes", "pattern": r"\-[0-9]\b", "function": "negative"},
+    {"name": "negatives", "pattern": r" \- ", "replacement": ""},
+    {"name": "positives", "pattern": r"\+", "replacement": " plus "},
+    {"name": "ordinals", "pattern": r"[0-9]{1,}(st|nd|rd|th)", "function": "ordinal"},
+    {
+        "name": "many_dollars",
+        "pattern": r"\$([0-9]{1,}\.?[0-9]{0,})\s(billion|million|trillion)",
+        "function": "many_dollars",
+    },
+    {
+        "name": "dollars",
+        "pattern": r"\$[0-9]{1,}\.?[0-9]{0,}[mbkMBK]?",
+        "function": "dollars",
+    },
+    {"name": "percent", "pattern": r"\%", "replacement": " percent"},
+    {
+        "name": "fractions",
+        "pattern": r"\b[0-9]\s?\/\s?[0-9]\b",
+        "function": "fraction",
+    },
+    {
+        "name": "plural_numbers",
+        "pattern": r"\b[0-9]{1,}s\b",
+        "function": "plural_number",
+    },
+    {"name": "numbers", "pattern": r"[0-9\.]{1,}", "function": "number"},
+    {"name": "apostrophes", "pattern": r"\'", "replacement": " '"},
+]
+
+
+class TemplateReplacement:
+    "Replaces a match with a template, which may refer to groups as \\1 or \\g<name>"
+
+    def __init__(self, template):
+        self.template = template
+
+    def __call__(self, match):
+        return match.expand(self.template)
+
+
+def compile_rule(rule):
+    """
+    Returns (compiled pattern, replacement function) for a rule
+    >>> pattern, replace = compile_rule({"pattern": "([A-Z]+)", "replacement": r"<\\1>"})
+    >>> pattern.sub(replace, "buy AAPL")
+    'buy <AAPL>'
+    """
+    flags = 0
+    for flag in rule.get("flags", []):
+        flags |= getattr(regex, flag.upper())
+    if "function" in rule:
+        replacement = REPLACEMENT_FUNCTIONS[rule["function"]]
+    else:
+        replacement = TemplateReplacement(rule.get("replacement", ""))
+    return regex.compile(rule["pattern"], flags), replacement
+
+
+# compiled rules of each normalizer version already built in this process
+COMPILED_RULES = {}
+
+
+class Normalizer:
+    """
+    A normalization profile: an ordered list of rules compiled once per process
+    Normalizers are identified by a version hash of their rules, so pickled
+    copies in worker processes reuse the same compiled rules and give the same
+    results. Pass one to clean_up, standardize_transcript, wer or count_words.
+    """
+
+    def __init__(self, rules=DEFAULT_RULES, name="default"):
+        self.name = name
+        self.rules = [dict(rule) for rule in rules]
+        self.version = hash_bytes(
+            json.dumps(self.rules, sort_keys=True).encode("utf-8")
+        )[:12]
+        if self.version not in COMPILED_RULES:
+            COMPILED_RULES[self.version] = OrderedDict(
+                (rule["name"], compile_rule(rule)) for rule in self.rules
+            )
+        self.replacements = COMPILED_RULES[self.version]
+
+    def __getstate__(self):
+        return {"rules": self.rules, "name": self.name}
+
+    def __setstate__(self, state):
+        self.__init__(state["rules"], state["name"])
+
+    def __repr__(self):
+        return "Normalizer({!r}, version={!r})".format(self.name, self.version)
+
+    @classmethod
+    def from_file(cls, file_name):
+        """
+        Loads a profile from a JSON file of the form
+        {"name": ..., "extends": "default", "drop": [rule names], "rules": [rules]}
+        Rules are added after the rules of the profile extended (if any),
+        or before the rule named by their "before" key
+        """
+        with open(file_name, encoding="utf-8") as f:
+            profile = json.load(f)
+        rules = [
+            rule
+            for rule in (DEFAULT_RULES if profile.get("extends") == "default" else [])
+            if rule["name"] not in profile.get("drop", [])
+        ]
+        for rule in profile.get("rules", []):
+            names = [_["name"] for _ in rules]
+            before = rule.get("before")
+            position = names.index(before) if before in names else len(rules)
+            rules.insert(position, {k: v for k, v in rule.items() if k != "before"})
+        return cls(rules, profile.get("name", strip_extension(basename(file_name))))
+
+
+DEFAULT_NORMALIZER = Normalizer()
+
+# number of profile files whose compiled normalizers are kept
+NORMALIZER_CACHE_SIZE = 16
+
+# normalizers loaded from profile files, by path and modification time
+NORMALIZERS = OrderedDict()
+
+
+def load_normalizer(normalizer=None):
+    """
+    Returns a Normalizer from a Normalizer, a profile file name or None (default)
+    Profile files are only read and compiled again when they change,
+    keeping the latest version of the NORMALIZER_CACHE_SIZE most recent files
+    """
+    if normalizer is None or isinstance(normalizer, Normalizer):
+        return normalizer
+    path = os.path.abspath(normalizer)
+    key = (path, os.stat(normalizer).st_mtime_ns)
+    if key in NORMALIZERS:
+        NORMALIZERS.move_to_end(key)
+        return NORMALIZERS[key]
+
+    for old_key in [_ for _ in NORMALIZERS if _[0] == path]:
+        del NORMALIZERS[old_key]
+    NORMALIZERS[key] = Normalizer.from_file(normalizer)
+    while len(NORMALIZERS) > NORMALIZER_CACHE_SIZE:
+        NORMALIZERS.popitem(last=False)
+    return NORMALIZERS[key]
+
+
+KNOWN_REPLACEMENTS = DEFAULT_NORMALIZER.replacements
 
 
 def remove_special_chars(line, chars_to_replace):
@@ -137,16 +250,151 @@ def remove_double_spaces(line):
     return spaces.sub(" ", line)
 
 
-def apply_all_regex_and_replacements(input_line):
+class RuleStats:
+    """
+    Calls, time spent, matches and changed characters per normalization rule
+    and per clean_up step, for finding expensive rules and rules that never fire
+    """
+
+    FIELDS = ("calls", "seconds", "matches", "changed_chars")
+
+    def __init__(self, stats=None):
+        self.stats = OrderedDict(
+            (name, list(values)) for name, values in (stats or {}).items()
+        )
+
+    def record(self, name, seconds, matches=0, changed_chars=0):
+        values = self.stats.setdefault(name, [0, 0.0, 0, 0])
+        values[0] += 1
+        values[1] += seconds
+        values[2] += matches
+        values[3] += changed_chars
+
+    def merge(self, other):
+        "Adds the statistics of another RuleStats, e.g. from a worker process"
+        for name, (calls, seconds, matches, changed_chars) in other.stats.items():
+            values = self.stats.setdefault(name, [0, 0.0, 0, 0])
+            values[0] += calls
+            values[1] += seconds
+            values[2] += matches
+            values[3] += changed_chars
+        return self
+
+    def as_dict(self):
+        return OrderedDict(
+            (name, OrderedDict(zip(self.FIELDS, values)))
+            for name, values in self.stats.items()
+        )
+
+    def table(self):
+        """
+        Returns a text table of the statistics, slowest rules first
+        >>> stats = RuleStats()
+        >>> stats.record("percent", 0.5, 2, 2)
+        >>> print(stats.table())
+        rule                              calls    seconds    matches changed_chars
+        percent                               1     0.5000          2             2
+        """
+        rows = ["{:30s} {:>8s} {:>10s} {:>10s} {:>13s}".format("rule", *self.FIELDS)]
+        for name, (calls, seconds, matches, changed_chars) in sorted(
+            self.stats.items(), key=lambda item: -item[1][1]
+        ):
+            rows.append(
+                "{:30s} {:8d} {:10.4f} {:10d} {:13d}".format(
+                    name, calls, seconds, matches, changed_chars
+                )
+            )
+        return "\n".join(rows)
+
+    def dump(self, file_name):
+        "Writes the statistics as JSON if file_name ends in .json, else as a table"
+        with open(file_name, "w") as f:
+            if file_name.endswith(".json"):
+                json.dump(self.as_dict(), f, indent=2)
+            else:
+                f.write(self.table() + "\n")
+
+
+# statistics collected by clean_up while collect_rule_stats is active
+RULE_STATS = None
+
+
+@contextmanager
+def collect_rule_stats(stats=None):
+    """
+    Collects RuleStats for every clean_up call in this process while active
+    >>> with collect_rule_stats() as stats:
+    ...     _ = clean_up("up 6%")
+    >>> stats.as_dict()["percent"]["matches"]
+    1
+    """
+    global RULE_STATS
+    previous, RULE_STATS = RULE_STATS, stats if stats is not None else RuleStats()
+    try:
+        yield RULE_STATS
+    finally:
+        RULE_STATS = previous
+
+
+def changed_chars(before, after):
+    "Approximate number of characters changed between two versions of a line"
+    if len(before) == len(after):
+        return sum(a != b for a, b in zip(before, after))
+    return abs(len(before) - len(after))
+
+
+def timed_step(stats, name, func, line, *args):
+    "Applies func to line, recording its time and changes in stats if given"
+    if stats is None:
+        return func(line, *args)
+    start_time = time.perf_counter()
+    output = func(line, *args)
+    stats.record(
+        name,
+        time.perf_counter() - start_time,
+        changed_chars=changed_chars(line, output),
+    )
+    return output
+
+
+def apply_rule(pattern, replacement, input_line, stats=None, name=None):
+    """
+    Applies one regex rule, recording its time, number of matches
+    and characters of matches that were changed in stats if given
+    """
+    if stats is None:
+        return regex.sub(pattern, replacement, input_line)
+
+    changed = [0]
+
+    def counted_replacement(match):
+        output = replacement(match)
+        if output != match.group():
+            changed[0] += len(match.group())
+        return output
+
+    start_time = time.perf_counter()
+    input_line, matches = regex.subn(pattern, counted_replacement, input_line)
+    stats.record(name, time.perf_counter() - start_time, matches, changed[0])
+    return input_line
+
+
+def apply_all_regex_and_replacements(input_line, stats=None, normalizer=None):
     """
     For a line and list of paired regex and replacements,
       apply all replacements for all regex on the line
+    The rules of normalizer are used if given, else KNOWN_REPLACEMENTS
     """
+    replacements = normalizer.replacements if normalizer else KNOWN_REPLACEMENTS
 
-    for pat in KNOWN_REPLACEMENTS:
+    for pat in replacements:
         try:
-            input_line = regex.sub(
-                KNOWN_REPLACEMENTS[pat][0], KNOWN_REPLACEMENTS[pat][1], input_line
+            input_line = apply_rule(
+                replacements[pat][0],
+                replacements[pat][1],
+                input_line,
+                stats,
+                pat,
             )
         except Exception as exc:
             LOGGER.exception(
@@ -159,12 +407,34 @@ def apply_all_regex_and_replacements(input_line):
 def check_for_formatted_chars(input_line):
     "returns True if formatting or special chars are present otherwise False"
 
-    return bool(set(input_line).difference(set(string.ascii_lowercase + " ")))
+    return bool(input_line.translate(DELETE_CLEAN_CHARS))
 
 
-def clean_up(input_line):
+def is_normalized(input_line):
+    """
+    Quickly checks if clean_up with the default profile would leave a line
+    unchanged because it only has lowercase ascii words separated by single
+    spaces (any other character makes clean_up apply its rules)
+    >>> is_normalized("this is clean")
+    True
+    >>> is_normalized("it 's otc")
+    False
+    >>> is_normalized("this is  not")
+    False
+    """
+    return (
+        not check_for_formatted_chars(input_line)
+        and "  " not in input_line
+        and input_line[:1] != " "
+        and input_line[-1:] != " "
+    )
+
+
+def clean_up(input_line, stats=None, normalizer=None):
     """
     Apply all text cleaning operations to input line
+    Per-rule statistics are recorded in stats, or while collect_rule_stats is active
+    normalizer selects a normalization profile (a Normalizer or profile file)
     >>> clean_up("his license plate is a. c, f seven...five ! zero")
     'his license plate is a c f seven five zero'
     >>> clean_up("Q2")
@@ -197,51 +467,192 @@ def clean_up(input_line):
     '[laughter]'
     """
 
-    if check_for_formatted_chars(input_line):
+    stats = stats if stats is not None else RULE_STATS
+    normalizer = load_normalizer(normalizer)
+
+    # default rules leave plain lowercase text alone, but profile rules may not
+    if check_for_formatted_chars(input_line) or (
+        normalizer is not None and normalizer.version != DEFAULT_NORMALIZER.version
+    ):
 
-        input_line = remove_special_chars(input_line, ",*&!?")
+        input_line = timed_step(
+            stats, "remove_special_chars", remove_special_chars, input_line, ",*&!?"
+        )
 
-        input_line = apply_all_regex_and_replacements(input_line)
+        input_line = apply_all_regex_and_replacements(input_line, stats, normalizer)
 
-        input_line = remove_all_special_chars(input_line)
+        input_line = timed_step(
+            stats, "remove_all_special_chars", remove_all_special_chars, input_line
+        )
 
         input_line = input_line.encode().decode("utf-8").lower()
 
-    # check for double spacing
-    input_line = remove_double_spaces(input_line)
+    # check for double spacing (only spaces are left as whitespace by now)
+    if "  " in input_line:
+        input_line = timed_step(
+            stats, "remove_double_spaces", remove_double_spaces, input_line
+        )
 
     return input_line.strip()
 
 
-def clean_one_file(input_text_file):
+def clean_lines(lines, normalizer=None):
+    "Cleans a list of lines"
+    return [clean_up(line, normalizer=normalizer) for line in lines]
+
+
+def read_chunks(input_stream, chunk_lines=CHUNK_LINES):
     """
-    Cleans a single file
+    Yields lists of up to chunk_lines lines without line endings
+    (at least one, possibly empty, list per stream)
     """
-    with open(input_text_file, "r", encoding="utf-8") as f:
-        lines = f.read().splitlines()
+    chunk, n_chunks = [], 0
+    for line in input_stream:
+        chunk.append(line.rstrip("\r\n"))
+        if len(chunk) == chunk_lines:
+            yield chunk
+            chunk, n_chunks = [], n_chunks + 1
+    if chunk or not n_chunks:
+        yield chunk
+
+
+def output_file_name(input_text_file):
+    "Returns the *_cleaned.txt name for an input file, or - for stdin"
+    if input_text_file == "-":
+        return "-"
+    return input_text_file.replace(".txt", "") + "_cleaned.txt"
 
-    cleaned = map(clean_up, lines)
 
-    with open(
-        input_text_file.replace(".txt", "") + "_cleaned.txt", "w", encoding="utf-8"
-    ) as f:
-        f.write(" ".join(cleaned))
+def open_text(file_name, mode):
+    "Opens a utf-8 text file, or returns stdin/stdout for -"
+    if file_name == "-":
+        return sys.stdin if "r" in mode else sys.stdout
+    return open(file_name, mode, encoding="utf-8")
 
 
-def clean_text_file(*input_text_files):
+def close_text(f):
+    "Closes a file opened by open_text unless it is stdin/stdout"
+    if f not in (sys.stdin, sys.stdout):
+        f.close()
+
+
+def file_chunks(input_text_files, chunk_lines=CHUNK_LINES):
+    "Yields (file index, chunk of lines) for every chunk of every file in order"
+    for index, input_text_file in enumerate(input_text_files):
+        f = open_text(input_text_file, "r")
+        try:
+            for chunk in read_chunks(f, chunk_lines):
+                yield index, chunk
+        finally:
+            close_text(f)
+
+
+def clean_chunk(indexed_chunk, profile=False, normalizer=None):
+    """
+    Cleans the lines of a (file index, chunk of lines) pair
+    Returns (file index, cleaned lines, RuleStats of the chunk if profile else None)
+    """
+    index, chunk = indexed_chunk
+    if not profile:
+        return index, clean_lines(chunk, normalizer), None
+    with collect_rule_stats() as stats:
+        return index, clean_lines(chunk, normalizer), stats
+
+
+def clean_files(
+    input_text_files, workers=None, chunk_lines=CHUNK_LINES, stats=None, normalizer=None
+):
+    """
+    Cleans files (or - for stdin) in ordered chunks of lines over a process pool
+    with at most one worker per chunk, or in this process if there is one chunk
+    Each output is a stream of cleaned lines separated by spaces
+    Rule statistics from all workers are merged into stats if given
+    """
+    chunks = file_chunks(input_text_files, chunk_lines)
+    # read ahead up to one chunk per worker to size the pool
+    first_chunks = list(islice(chunks, workers or os.cpu_count() or 1))
+    chunks = chain(first_chunks, chunks)
+    clean = partial(
+        clean_chunk,
+        profile=stats is not None,
+        normalizer=load_normalizer(normalizer),
+    )
+    executor = (
+        BoundedExecutor(len(first_chunks), processes=True)
+        if len(first_chunks) > 1
+        else None
+    )
+    cleaned_chunks = executor.map(clean, chunks) if executor else map(clean, chunks)
+
+    output, output_index, separator = None, None, ""
+    try:
+        for cleaned in cleaned_chunks:
+            if cleaned is None:
+                raise executor.failures[-1][1]
+            index, lines, chunk_stats = cleaned
+            if chunk_stats is not None:
+                stats.merge(chunk_stats)
+            if index != output_index:
+                if output:
+                    close_text(output)
+                output_index, separator = index, ""
+                output = open_text(output_file_name(input_text_files[index]), "w")
+            for line in lines:
+                output.write(separator + line)
+                separator = " "
+        if output is sys.stdout:
+            output.write("\n")
+    finally:
+        if output:
+            close_text(output)
+        if executor:
+            executor.shutdown(cancel=True)
+
+
+def clean_one_file(input_text_file):
+    """
+    Cleans a single file
+    """
+    clean_files([input_text_file], workers=1)
+
+
+def clean_text_file(
+    *input_text_files,
+    workers=None,
+    chunk_lines=CHUNK_LINES,
+    rule_stats=None,
+    normalizer=None,
+):
     """
     Cleans input *.txt files and outputs *_cleaned.txt
+    Each output is one line: the cleaned lines of its input joined by spaces
+    Use - to clean stdin to stdout
+    Files, and chunks of chunk_lines lines within them, are cleaned in parallel
+    If rule_stats is a file name, time, matches and changed characters per
+    normalization rule are written to it (as JSON if it ends in .json)
+    If normalizer is a profile file, its rules are used instead of the default
     """
+    valid_files = []
     for input_text_file in input_text_files:
-        if not valid_input_file(input_text_file, valid_extensions=["txt"]):
+        if input_text_file != "-" and not valid_input_file(
+            input_text_file, valid_extensions=["txt"]
+        ):
             LOGGER.error(
                 "File %s does not end in .txt - please only use this for cleaning txt files",
                 input_text_file,
             )
             continue
-        clean_one_file(input_text_file)
+        valid_files.append(input_text_file)
+
+    stats = RuleStats() if rule_stats else None
+    clean_files(valid_files, workers, chunk_lines, stats, normalizer)
+    if stats is not None:
+        stats.dump(rule_stats)
+        LOGGER.info("Rule statistics: %s", rule_stats)
 
-        LOGGER.info("File output: %s", input_text_file.replace(".txt", "_cleaned.txt"))
+    for input_text_file in valid_files:
+        if input_text_file != "-":
+            LOGGER.info("File output: %s", output_file_name(input_text_file))
 
 
 def cli():
@@ -4,12 +4,14 @@ Script for combining audio files using their transcript files with start/stop ti
 """
 import argparse
 import logging
-import operator
 import os
 import sys
-from functools import reduce
 
 from asrtoolkit.data_structures import AudioFile, Transcript, combine_audio
+from asrtoolkit.data_structures.time_aligned_text import (
+    find_overlaps,
+    merge_transcripts,
+)
 from asrtoolkit.file_utils.name_cleaners import strip_extension
 from asrtoolkit.file_utils.script_input_validation import valid_input_file
 
@@ -42,14 +44,34 @@ def check_transcript_segment(segment):
         sys.exit(1)
 
 
-def combine_transcripts(transcripts, output_file_name):
+def combine_transcripts(transcripts, output_file_name, report_overlaps=False):
+    """
+    Merge transcripts into one, in time order, written next to output_file_name
+    With report_overlaps, logs and returns pairs of segments from different
+    transcripts that overlap in time
+    """
     # Get one list of segments
-    out_transcript = reduce(operator.add, transcripts)
+    out_transcript = merge_transcripts(transcripts)
     out_transcript.location = os.path.join(
         strip_extension(output_file_name) + "." + out_transcript.file_extension
     )
     out_transcript.write(out_transcript.location)
 
+    overlaps = find_overlaps(transcripts) if report_overlaps else []
+    for earlier, seg in overlaps:
+        LOGGER.warning(
+            "Segment %s-%s of %s overlaps %s-%s of %s",
+            seg.start,
+            seg.stop,
+            seg.filename,
+            earlier.start,
+            earlier.stop,
+            earlier.filename,
+        )
+    if report_overlaps:
+        LOGGER.warning("Found %d overlapping segments", len(overlaps))
+    return overlaps
+
 
 def main():
     """
@@ -59,7 +81,7 @@ def main():
         description="""Combine audio files using segments from their transcript files. For this utility, transcript files must contain start/stop times.
            Lists of transcripts and audio files must be ordered identically, meaning the first audio file's
            transcript is the first transcript.
-           Note: transcripts from each file are not checked for overlapping time intervals when they are combined and sorted.
+           Note: transcripts from each file are only checked for overlapping time intervals with --report_overlaps.
         """
     )
     parser.add_argument(
@@ -87,6 +109,12 @@ def main():
         action="store_true",
         help="Renormalize files to undo sox normalizing by 1/num_audio_files. Useful when combined audio has little overlap",
     )
+    parser.add_argument(
+        "--report_overlaps",
+        default=False,
+        action="store_true",
+        help="Log segments from different transcripts that overlap in time",
+    )
     # Sending audio through tanh could be helpful if there are significant transient audio signals
 
     args = parser.parse_args()
@@ -107,7 +135,7 @@ def main():
         for _ in transcript.segments
     ]
 
-    combine_transcripts(transcripts, args.output_file)
+    combine_transcripts(transcripts, args.output_file, args.report_overlaps)
     combine_audio(args.audio_files, args.output_file, args.renormalize)
 
 
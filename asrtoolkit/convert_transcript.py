@@ -3,12 +3,24 @@
 Python class for converting file formats used in Automatic Speech Recognition
 """
 
+import glob
 import logging
+import os
 import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 
 from fire import Fire
 
-from asrtoolkit.file_utils.script_input_validation import assign_if_valid
+from asrtoolkit.file_utils.name_cleaners import (
+    get_extension,
+    split_compression_extension,
+)
+from asrtoolkit.file_utils.script_input_validation import (
+    assign_if_valid,
+    valid_input_file,
+)
 
 LOGGER = logging.getLogger(__name__)
 
@@ -19,31 +31,192 @@ def check_input_file_validity(input_file):
         sys.exit(1)
 
 
-def convert(input_file, output_file, json_format=None):
+def convert(input_file, output_file, json_format=None, compression=None):
     """
     Convert between text file formats (supported formats are stm, json, srt, vtt, txt, and html)
+    and the binary atb format for fast reloading (compression may be gzip or zstd for atb output)
 
     Validates lines of transcript before writing new file.
     STM files are unformatted (eg 10 -> ten)
+    JSON input formats are detected from file contents unless --json-format is given
+
+    Returns the written transcript
     """
     check_input_file_validity(input_file)
-    input_file = assign_if_valid(
+    return write_converted(
+        read_input(input_file, json_format), output_file, json_format, compression
+    )
+
+
+def read_input(input_file, json_format=None):
+    "Reads a transcript to convert, in json_format if it is a JSON file"
+    return assign_if_valid(
         input_file,
         file_format=(
-            json_format if json_format and input_file.endswith(".json") else None
+            json_format if json_format and get_extension(input_file) == "json" else None
         ),
     )
-    input_file.write(
+
+
+def write_converted(transcript, output_file, json_format=None, compression=None):
+    "Writes a transcript to output_file, in json_format if it is a JSON file"
+    return transcript.write(
         output_file,
-        file_format=json_format
-        if json_format and output_file.endswith(".json")
-        else None,
+        file_format=(
+            json_format
+            if json_format and get_extension(output_file) == "json"
+            else None
+        ),
+        **({"compression": compression} if compression else {}),
+    )
+
+
+def find_input_files(inputs, manifest=None):
+    """
+    Expands globs and directories into a sorted, de-duplicated list of transcripts
+    A manifest is a text file listing one input (file, glob, or directory) per line
+    """
+    inputs = list(inputs)
+    if manifest:
+        with open(manifest) as f:
+            inputs.extend(line.strip() for line in f if line.strip())
+
+    input_files = []
+    for pattern in inputs:
+        pattern = str(pattern)
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "*")
+        input_files.extend(
+            sorted(_ for _ in glob.glob(pattern, recursive=True) if valid_input_file(_))
+        )
+    return list(dict.fromkeys(input_files))
+
+
+def output_file_name(input_file, output_dir, output_format):
+    """
+    Name of the converted copy of input_file in output_dir
+    >>> output_file_name("a/b/c.json.gz", "out", "stm")
+    'out/c.stm'
+    """
+    base = os.path.basename(split_compression_extension(input_file)[0])
+    return os.path.join(output_dir, os.path.splitext(base)[0] + "." + output_format)
+
+
+def is_up_to_date(input_file, output_file):
+    "True if output_file exists and is no older than input_file"
+    return (
+        os.path.isfile(output_file)
+        and os.stat(output_file).st_mtime_ns >= os.stat(input_file).st_mtime_ns
     )
 
 
+def convert_safely(input_file, output_file, json_format=None, compression=None):
+    """
+    Converts one file, returning (number of segments, error message or None)
+    Only these small results are sent back from worker processes
+    """
+    try:
+        transcript = read_input(input_file, json_format)
+        if transcript is None:
+            raise ValueError("not a transcript file ASRToolkit accepts")
+        write_converted(transcript, output_file, json_format, compression)
+        return len(transcript.segments), None
+    except Exception as exc:  # one bad file should not stop a batch
+        return 0, "{}: {}".format(type(exc).__name__, exc)
+
+
+def convert_many(
+    *inputs,
+    output_dir=".",
+    output_format="stm",
+    manifest=None,
+    workers=None,
+    force=False,
+    json_format=None,
+    compression=None,
+):
+    """
+    Convert many transcripts in parallel
+    Inputs may be files, globs (quote them, ** is supported) or directories,
+    plus an optional manifest file listing one input per line.
+    Outputs are named after their inputs and written to output_dir in output_format.
+    Outputs newer than their inputs are skipped unless --force is given.
+    workers defaults to the number of CPUs; workers=1 converts in this process.
+
+    Returns counts of converted/skipped/failed files and the throughput
+    """
+    start_time = time.time()
+    os.makedirs(output_dir, exist_ok=True)
+
+    input_files = find_input_files(inputs, manifest)
+    output_files = [output_file_name(_, output_dir, output_format) for _ in input_files]
+    duplicates = [k for k, v in Counter(output_files).items() if v > 1]
+    if duplicates:
+        raise ValueError(
+            "Several inputs would be written to {}".format(", ".join(duplicates))
+        )
+
+    jobs = [
+        (input_file, output_file)
+        for input_file, output_file in zip(input_files, output_files)
+        if force or not is_up_to_date(input_file, output_file)
+    ]
+    n_workers = min(workers or os.cpu_count() or 1, max(len(jobs), 1))
+    job_args = (
+        [_[0] for _ in jobs],
+        [_[1] for _ in jobs],
+        [json_format] * len(jobs),
+        [compression] * len(jobs),
+    )
+
+    if n_workers == 1:
+        results = list(map(convert_safely, *job_args))
+    else:
+        with ProcessPoolExecutor(n_workers) as executor:
+            results = list(
+                executor.map(
+                    convert_safely,
+                    *job_args,
+                    chunksize=max(1, len(jobs) // (4 * n_workers)),
+                )
+            )
+
+    n_segments, failed = 0, []
+    for (input_file, _), (segments, error) in zip(jobs, results):
+        n_segments += segments
+        if error:
+            LOGGER.error("Could not convert %s: %s", input_file, error)
+            failed.append(input_file)
+
+    seconds = max(time.time() - start_time, 1e-9)
+    n_converted = len(jobs) - len(failed)
+    summary = {
+        "converted": n_converted,
+        "skipped": len(input_files) - len(jobs),
+        "failed": len(failed),
+        "segments": n_segments,
+        "seconds": round(seconds, 3),
+        "files_per_second": round(n_converted / seconds, 2),
+        "segments_per_second": round(n_segments / seconds, 2),
+    }
+    LOGGER.info(
+        "Converted %d files (%d skipped, %d failed) at %.2f files/s, %.2f segments/s",
+        n_converted,
+        summary["skipped"],
+        len(failed),
+        summary["files_per_second"],
+        summary["segments_per_second"],
+    )
+    return summary
+
+
 def cli():
     Fire(convert)
 
 
+def batch_cli():
+    Fire(convert_many)
+
+
 if __name__ == "__main__":
     cli()
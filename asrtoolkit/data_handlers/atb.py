@@ -0,0 +1,255 @@
+#!/usr/bin/env python
+"""
+Module for reading/writing ATB (asrtoolkit transcript binary) files
+
+ATB is a compact columnar format for reloading transcripts quickly.
+Segments are stored already validated together with their normalized text,
+so loading skips parsing, Segment.validate, and clean_float.
+
+Layout (little endian)
+```
+magic      4 bytes   b"ATB1"
+compression 1 byte   0 none, 1 gzip, 2 zstd
+meta_size  uint32    size of the JSON metadata block
+metadata   JSON      {"n_segments": n, "columns": [[name, kind], ...], "normalizer": version}
+payload              one length-prefixed block per column, optionally compressed
+```
+Column kinds are
+- `f8`: n float64 values
+- `str`: NUL-separated utf-8 strings
+- `cat`: n uint32 codes followed by a `str` block of distinct values
+- `json`: a `str` block of JSON-encoded values
+
+Uncompressed files are read through a memory map.
+"""
+
+import gzip
+import json
+import mmap
+import struct
+import sys
+from array import array
+
+from asrtoolkit.clean_formatting import DEFAULT_NORMALIZER
+from asrtoolkit.data_structures import Segment
+from asrtoolkit.file_utils.common_file_operations import open_file
+from asrtoolkit.file_utils.name_cleaners import split_compression_extension
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MAGIC = b"ATB1"
+COMPRESSION_CODES = {None: 0, "gzip": 1, "zstd": 2}
+
+# column holding clean_up(text) for each segment, made with the
+# normalization profile whose version is stored in the metadata
+NORMALIZED_COLUMN = "normalized_text"
+
+# always store these Segment fields, even if they only hold class defaults
+SEGMENT_FIELDS = [
+    "filename",
+    "channel",
+    "speaker",
+    "start",
+    "stop",
+    "label",
+    "text",
+    "formatted_text",
+    "confidence",
+]
+
+prefix = struct.Struct("<4sBI")
+block_size = struct.Struct("<Q")
+
+
+def column_kind(values):
+    """
+    Choose how to store a column of values
+    >>> column_kind([1.0, 0.5])
+    'f8'
+    >>> column_kind(["a", "a", "b", "a"])
+    'cat'
+    >>> column_kind(["a", "b"])
+    'str'
+    >>> column_kind([1, "b"])
+    'json'
+    """
+    if all(type(_) is float for _ in values):
+        return "f8"
+    if all(isinstance(_, str) for _ in values):
+        return "cat" if len(set(values)) <= len(values) // 2 else "str"
+    return "json"
+
+
+def to_little_endian(values):
+    "byteswap an array in place on big endian machines"
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def encode_strings(values):
+    "join strings into one NUL-separated block"
+    if any("\x00" in _ for _ in values):
+        raise ValueError("ATB files cannot store strings containing NUL characters")
+    return "\x00".join(values).encode("utf-8")
+
+
+def decode_strings(data, n_values):
+    "split a NUL-separated block back into n_values strings"
+    return str(data, "utf-8").split("\x00") if n_values else []
+
+
+def encode_column(values, kind):
+    "encode a column of values as bytes"
+    if kind == "f8":
+        return to_little_endian(array("d", values)).tobytes()
+    if kind == "cat":
+        table = list(dict.fromkeys(values))
+        index = {value: code for code, value in enumerate(table)}
+        codes = to_little_endian(array("I", [index[_] for _ in values])).tobytes()
+        return codes + encode_strings(table)
+    if kind == "json":
+        values = [json.dumps(_) for _ in values]
+    return encode_strings(values)
+
+
+def decode_column(data, kind, n_values):
+    "decode a column of n_values values from bytes"
+    if kind == "f8":
+        values = array("d")
+        values.frombytes(data)
+        return to_little_endian(values).tolist()
+    if kind == "cat":
+        codes = array("I")
+        codes.frombytes(data[: 4 * n_values])
+        table = decode_strings(data[4 * n_values :], n_values)
+        return [table[_] for _ in to_little_endian(codes)]
+    values = decode_strings(data, n_values)
+    return list(map(json.loads, values)) if kind == "json" else values
+
+
+def compress(payload, compression):
+    "compress payload with the given compression"
+    if compression == "gzip":
+        return gzip.compress(payload)
+    if compression == "zstd":
+        if zstandard is None:
+            raise ImportError("zstd compression requires the zstandard package")
+        return zstandard.ZstdCompressor().compress(payload)
+    return payload
+
+
+def decompress(payload, compression_code):
+    "decompress payload compressed with the given compression code"
+    if compression_code == COMPRESSION_CODES["gzip"]:
+        return gzip.decompress(payload)
+    if compression_code == COMPRESSION_CODES["zstd"]:
+        if zstandard is None:
+            raise ImportError("zstd compression requires the zstandard package")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    return payload
+
+
+def column_names(segments):
+    "Segment fields followed by any extra public attributes set on segments"
+    extra = dict.fromkeys(key for seg in segments for key in vars(seg))
+    return SEGMENT_FIELDS + [
+        _
+        for _ in extra
+        if _ not in SEGMENT_FIELDS and _ != NORMALIZED_COLUMN and _[:1] != "_"
+    ]
+
+
+def dumps(segments, compression=None):
+    """
+    Encodes a list of segments as ATB bytes
+    """
+    if compression not in COMPRESSION_CODES:
+        raise ValueError("Unknown ATB compression {}".format(compression))
+
+    columns = {
+        name: [getattr(seg, name, None) for seg in segments]
+        for name in column_names(segments)
+    }
+    columns[NORMALIZED_COLUMN] = [seg.clean_text() for seg in segments]
+
+    kinds = [[name, column_kind(values)] for name, values in columns.items()]
+    payload = b"".join(
+        block_size.pack(len(block)) + block
+        for block in (encode_column(columns[name], kind) for name, kind in kinds)
+    )
+
+    metadata = json.dumps(
+        {
+            "n_segments": len(segments),
+            "columns": kinds,
+            "normalizer": DEFAULT_NORMALIZER.version,
+        }
+    ).encode()
+    return (
+        prefix.pack(MAGIC, COMPRESSION_CODES[compression], len(metadata))
+        + metadata
+        + compress(payload, compression)
+    )
+
+
+def loads(data):
+    """
+    Decodes ATB bytes (or a memory map of them) into a list of segments
+    """
+    with memoryview(data) as view:
+        magic, compression_code, meta_size = prefix.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError("Not an ATB file")
+
+        start = prefix.size + meta_size
+        metadata = json.loads(bytes(view[prefix.size : start]))
+        n_segments = metadata["n_segments"]
+
+        columns, offset = [], 0
+        with memoryview(decompress(view[start:], compression_code)) as payload:
+            for name, kind in metadata["columns"]:
+                (size,) = block_size.unpack_from(payload, offset)
+                offset += block_size.size
+                columns.append(
+                    decode_column(payload[offset : offset + size], kind, n_segments)
+                )
+                offset += size
+
+    names = [name for name, _ in metadata["columns"]]
+    # stored text only saves cleaning it again if the default profile is unchanged
+    clean = metadata.get("normalizer") == DEFAULT_NORMALIZER.version
+    segments = []
+    for row in zip(*columns):
+        # segments were validated before they were written
+        seg = Segment.__new__(Segment)
+        seg.__dict__.update(zip(names, row))
+        if clean:
+            seg.set_clean_text(getattr(seg, NORMALIZED_COLUMN))
+        segments.append(seg)
+    return segments
+
+
+def read_file(file_name):
+    """
+    Reads an ATB file, memory mapping it if it is uncompressed
+    """
+    if split_compression_extension(file_name)[1]:
+        with open_file(file_name, "rb") as f:
+            return loads(f.read())
+
+    with open(file_name, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return loads(data)
+
+
+def write_file(segments, file_name, compression=None):
+    """
+    Writes segments to an ATB file
+    compression may be None, 'gzip', or 'zstd'
+    """
+    with open_file(file_name, "wb") as f:
+        f.write(dumps(segments, compression))
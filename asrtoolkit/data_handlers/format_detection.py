@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+"""
+Module for detecting which JSON data handler a transcript belongs to
+
+Vendor JSON formats are recognized by the keys they contain.
+Files are sniffed from their first few KB and only fully parsed if the keys seen
+there are inconclusive. Results for the most recent files are remembered so that
+bulk jobs do not sniff the same unchanged file twice.
+"""
+
+import json
+import logging
+import os
+import re
+from collections import OrderedDict
+
+from asrtoolkit.file_utils.common_file_operations import open_file
+from asrtoolkit.file_utils.name_cleaners import get_extension
+
+LOGGER = logging.getLogger(__name__)
+
+# number of bytes read when sniffing a file
+SNIFF_SIZE = 4096
+
+# (data handler, keys which must all be present) in order of precedence
+JSON_SIGNATURES = [
+    ("gecko", {"schemaVersion", "monologues"}),
+    ("gecko", {"monologues", "terms"}),
+    ("rev", {"monologues", "elements"}),
+    ("truleo", {"segments", "tokens"}),
+    ("greenkey", {"segments", "startTimeSec"}),
+    ("greenkey", {"segments", "transcript"}),
+    ("aws", {"jobName", "results"}),
+    ("aws", {"results", "transcripts"}),
+    ("speechmatics", {"results", "alternatives"}),
+]
+
+json_key = re.compile(r'"((?:[^"\\]|\\.)*)"\s*:')
+
+# number of files whose detected format is remembered
+DETECTION_CACHE_SIZE = 65536
+
+# absolute file name -> (size, mtime, data handler), least recently used first
+DETECTED_FORMATS = OrderedDict()
+
+
+def match_signature(keys):
+    """
+    Returns the data handler whose signature is contained in keys, else None
+    >>> match_signature({"segments", "tokens", "speaker"})
+    'truleo'
+    >>> match_signature({"foo"}) is None
+    True
+    """
+    return next(
+        (handler for handler, signature in JSON_SIGNATURES if signature <= keys), None
+    )
+
+
+def conclusive_match(keys):
+    """
+    Returns the data handler whose signature is contained in keys, unless a
+    signature of another handler which takes precedence over it is partly
+    present (the rest of it may come after the keys seen), else None
+    >>> conclusive_match({"jobName", "results"})
+    'aws'
+    >>> conclusive_match({"segments", "transcript"}) is None
+    True
+    """
+    partly_present = set()
+    for handler, signature in JSON_SIGNATURES:
+        if signature <= keys:
+            return None if partly_present - {handler} else handler
+        if signature & keys:
+            partly_present.add(handler)
+    return None
+
+
+def nested_keys(input_data, depth=3):
+    """
+    Returns the keys of a JSON object and of the first elements nested inside it
+    >>> sorted(nested_keys({"results": {"items": [{"start_time": 1}]}}))
+    ['items', 'results', 'start_time']
+    """
+    keys = set()
+    if depth and isinstance(input_data, dict):
+        keys.update(input_data)
+        for value in input_data.values():
+            keys.update(nested_keys(value, depth - 1))
+    elif depth and isinstance(input_data, list) and input_data:
+        keys.update(nested_keys(input_data[0], depth))
+    return keys
+
+
+def detect_json_format(input_data):
+    """
+    Detects the data handler for an in-memory JSON object
+    >>> detect_json_format({"segments": [{"startTimeSec": 0.0, "transcript": "hi"}]})
+    'greenkey'
+    """
+    return match_signature(nested_keys(input_data))
+
+
+def sniff_json_format(file_name, sniff_size=SNIFF_SIZE):
+    """
+    Detects the data handler from the keys in the first sniff_size bytes of a file
+    Returns None if those keys are inconclusive
+    """
+    with open_file(file_name, "rb") as f:
+        prefix = f.read(sniff_size).decode("utf-8", errors="ignore")
+    return conclusive_match(set(json_key.findall(prefix)))
+
+
+def detect_format(file_name):
+    """
+    Detects the data handler for a JSON transcript file
+    Sniffs the start of the file first and parses it fully only if needed
+    Returns None if no known format matches
+    """
+    path = os.path.abspath(file_name)
+    stat = os.stat(file_name)
+    cached = DETECTED_FORMATS.get(path)
+    if cached and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+        DETECTED_FORMATS.move_to_end(path)
+        return cached[2]
+
+    data_handler = sniff_json_format(file_name)
+    if data_handler is None:
+        with open_file(file_name) as f:
+            data_handler = detect_json_format(json.load(f))
+
+    if data_handler is None:
+        LOGGER.warning("Could not detect the JSON format of %s", file_name)
+    else:
+        DETECTED_FORMATS[path] = (stat.st_size, stat.st_mtime_ns, data_handler)
+        DETECTED_FORMATS.move_to_end(path)
+        while len(DETECTED_FORMATS) > DETECTION_CACHE_SIZE:
+            DETECTED_FORMATS.popitem(last=False)
+    return data_handler
+
+
+def detect_directory_formats(directory):
+    """
+    Detects data handlers for all (possibly compressed) JSON files in a directory
+    Returns a dict of file name: data handler
+    """
+    return {
+        name: detect_format(os.path.join(directory, name))
+        for name in sorted(os.listdir(directory))
+        if get_extension(name) == "json"
+    }
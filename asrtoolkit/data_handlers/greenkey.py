@@ -7,6 +7,7 @@ import json
 import logging
 
 from asrtoolkit.data_structures import Segment
+from asrtoolkit.file_utils.common_file_operations import open_file
 from asrtoolkit.file_utils.name_cleaners import sanitize
 
 LOGGER = logging.getLogger(__name__)
@@ -124,7 +125,7 @@ def read_file(file_name):
     """
     Reads a JSON file, skipping any bad Segments
     """
-    with open(file_name, encoding="utf-8") as f:
+    with open_file(file_name) as f:
         input_json = json.load(f)
         segments = read_in_memory(input_json)
     return segments
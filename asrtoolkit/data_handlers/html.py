@@ -6,11 +6,28 @@ Note that the structure may change without notice and break backwards compatibil
 This expects a segment from class derived in convert_text
 """
 
+import re
+from html import unescape
+
 from bs4 import BeautifulSoup
 
 # do not delete - needed in time_aligned_text
 from asrtoolkit.data_handlers.data_handlers_common import separator
 from asrtoolkit.data_structures import Segment
+from asrtoolkit.file_utils.common_file_operations import open_file
+
+try:
+    import lxml  # noqa: F401
+
+    SOUP_PARSER = "lxml"
+except ImportError:
+    SOUP_PARSER = "html.parser"
+
+# rows exactly as written by format_segment
+ROW_PATTERN = re.compile(
+    r'<tr><td align="left">\[([^<\]]*) - ([^<\]]*)\]</td>'
+    r'<td align="left">([^<]*)</td><td align="left">([^<]*)</td></tr>'
+)
 
 
 def table_header(text, width):
@@ -65,28 +82,81 @@ def format_segment(seg):
     )
 
 
+def make_segment(start, stop, speaker, text):
+    "make a segment from the columns of a row, returning None if invalid"
+    seg = Segment({"speaker": speaker, "start": start, "stop": stop, "text": text})
+    return seg if seg.validate() else None
+
+
 def parse_line(line):
     "parse a single line of an html file"
-    cols = line.findAll("td")
+    cols = line.find_all("td")
     seg = None
     if cols:
         start_stop, speaker, text = [[val for val in col.children][0] for col in cols]
         start, stop = start_stop[1:-1].split(" - ")
-        seg = Segment({"speaker": speaker, "start": start, "stop": stop, "text": text})
-        seg = seg if seg.validate() else None
+        seg = make_segment(start, stop, speaker, text)
     return seg
 
 
-def read_file(file_name):
+def parse_row(line):
     """
-    Reads an HTML file, skipping any gap lines
+    parse a single line written by format_segment
+    raises ValueError if the line is not part of the layout from header/footer/format_segment
+    >>> parse_row('<tr><td align="left">[0.00 - 1.00]</td><td align="left">a</td><td align="left">b &amp; c</td></tr>').text
+    'b & c'
     """
-    soup = BeautifulSoup(open(file_name).read(), "html.parser")
-    table = soup.find("table", {})
+    match = ROW_PATTERN.fullmatch(line.strip())
+    if match is None:
+        raise ValueError("unexpected html layout in line {}".format(line))
+    start, stop, speaker, text = map(unescape, match.groups())
+    return make_segment(start, stop, speaker, text)
 
-    segments = [_ for _ in map(parse_line, table.findAll("tr")) if _]
 
+def read_rows(lines):
+    """
+    Reads segments from lines of a file written by this module
+    Raises ValueError if the file was edited into a different layout
+    """
+    lines = iter(lines)
+    if next(lines, "").strip() != "<table>" or not next(lines, "").startswith(
+        "<tr><th"
+    ):
+        raise ValueError("unexpected html header")
+
+    segments = []
+    for line in lines:
+        if line.startswith("<tr><td"):
+            seg = parse_row(line)
+            if seg is not None:
+                segments.append(seg)
+        elif line.strip() not in ("", "</table>"):
+            raise ValueError("unexpected html layout in line {}".format(line))
     return segments
 
 
+def read_soup(file_name):
+    """
+    Reads an arbitrary HTML file with BeautifulSoup, skipping any gap lines
+    """
+    with open_file(file_name) as f:
+        soup = BeautifulSoup(f.read(), SOUP_PARSER)
+    table = soup.find("table", {})
+
+    return [_ for _ in map(parse_line, table.find_all("tr")) if _]
+
+
+def read_file(file_name):
+    """
+    Reads an HTML file, skipping any gap lines
+    Files in the layout written by this module are streamed line by line,
+    hand-edited files fall back to BeautifulSoup
+    """
+    try:
+        with open_file(file_name) as f:
+            return read_rows(f)
+    except ValueError:
+        return read_soup(file_name)
+
+
 __all__ = [header, footer, separator]
@@ -7,6 +7,7 @@ import json
 import logging
 
 from asrtoolkit.data_structures import Segment
+from asrtoolkit.file_utils.common_file_operations import open_file
 
 LOGGER = logging.getLogger(__name__)
 separator = ",\n"
@@ -52,7 +53,7 @@ def read_file(file_name):
     """
     Reads a JSON file, skipping any bad Segments
     """
-    with open(file_name, encoding="utf-8") as f:
+    with open_file(file_name) as f:
         input_json = json.load(f)
         segments = read_in_memory(input_json)
     return segments
@@ -29,6 +29,7 @@ conf is the confidence (probability) that the object information is correct. If
 from asrtoolkit.data_handlers.data_handlers_common import footer, separator
 from asrtoolkit.data_structures import Segment
 from asrtoolkit.data_structures.formatting import clean_float
+from asrtoolkit.file_utils.common_file_operations import open_file
 
 
 def header():
@@ -48,7 +49,7 @@ def read_file(file_name):
     """Reads an RTTM file"""
 
     segments = []
-    with open(file_name) as data:
+    with open_file(file_name) as data:
         for line in data:
             _, filename, channel, start, duration, _, _, speaker, _, _ = line.split()
             seg = Segment(
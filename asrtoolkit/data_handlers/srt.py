@@ -11,6 +11,8 @@ from webvtt import WebVTT
 from asrtoolkit.data_handlers.data_handlers_common import footer, header, separator
 from asrtoolkit.data_handlers.webvtt_common import read_caption
 from asrtoolkit.data_structures.formatting import seconds_to_timestamp
+from asrtoolkit.file_utils.common_file_operations import open_file
+from asrtoolkit.file_utils.name_cleaners import split_compression_extension
 
 
 def format_segment(seg):
@@ -28,10 +30,16 @@ def format_segment(seg):
 
 
 def read_file(file_name):
-    """Reads an SRT file"""
+    """
+    Reads an SRT file
+    Compressed SRT files require webvtt-py>=0.5 for reading from a buffer
+    """
 
-    data = WebVTT.from_srt(file_name)
-    captions = data.captions
+    if split_compression_extension(file_name)[1]:
+        with open_file(file_name) as f:
+            captions = WebVTT.from_buffer(f, format="srt").captions
+    else:
+        captions = WebVTT.from_srt(file_name).captions
 
     segments = []
     for caption in captions:
@@ -7,11 +7,13 @@ Expected file format is derived from http://www1.icsi.berkeley.edu/Speech/docs/s
 This expects a Segment from class derived in convert_text
 """
 
-from asrtoolkit.clean_formatting import clean_up
-
 # leave in place for other imports
 from asrtoolkit.data_handlers.data_handlers_common import footer, header, separator
 from asrtoolkit.data_structures import Segment
+from asrtoolkit.file_utils.common_file_operations import open_file
+
+# format_segment cleans text, so text read back from STM files is usually normalized
+normalizes_text = True
 
 
 def footer():
@@ -26,13 +28,13 @@ def format_segment(seg):
       Formats a Segment assuming it's an instance of class Segment with elements
       filename, channel, speaker, start and stop times, label, and text
     """
-    # clean_up used to unformat stm file text
+    # clean_up used to unformat stm file text (once per segment text)
     return " ".join(
         [
             str(getattr(seg, _))
             for _ in ("filename", "channel", "speaker", "start", "stop", "label")
         ]
-        + [clean_up(seg.text)]
+        + [seg.clean_text()]
     )
 
 
@@ -61,13 +63,21 @@ def parse_line(line):
     return seg if (seg is not None) and seg.validate() else None
 
 
+def read_in_memory(input_data):
+    """
+    Reads STM text, skipping any gap lines
+    :return: list of Segment objects
+    """
+    return [seg for seg in map(parse_line, input_data.splitlines()) if seg is not None]
+
+
 def read_file(file_name):
     """
     Reads an STM file, skipping any gap lines
     :return: list of Segment objects
     """
     Segments = []
-    with open(file_name, encoding="utf-8") as f:
+    with open_file(file_name) as f:
         for line in f:
             seg = parse_line(line)
             if seg is not None:
@@ -8,6 +8,7 @@ This expects a segment from class derived in convert_text
 # do not delete - needed in time_aligned_text
 from asrtoolkit.data_handlers.data_handlers_common import footer, header, separator
 from asrtoolkit.data_structures import Segment
+from asrtoolkit.file_utils.common_file_operations import open_file
 
 
 def format_segment(seg):
@@ -32,7 +33,7 @@ def read_file(file_name):
     Reads a TXT file
     """
     segments = []
-    with open(file_name, encoding="utf-8") as f:
+    with open_file(file_name) as f:
         segments = read_in_memory(f.read())
     return segments
 
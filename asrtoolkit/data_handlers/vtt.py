@@ -11,6 +11,7 @@ from webvtt import WebVTT
 from asrtoolkit.data_handlers.data_handlers_common import footer, separator
 from asrtoolkit.data_handlers.webvtt_common import read_caption
 from asrtoolkit.data_structures.formatting import seconds_to_timestamp
+from asrtoolkit.file_utils.common_file_operations import open_file
 
 
 def header():
@@ -37,8 +38,8 @@ def format_segment(seg):
 def read_file(file_name):
     """Reads a VTT file"""
 
-    data = WebVTT.read(file_name)
-    captions = data.captions
+    with open_file(file_name) as f:
+        captions = WebVTT.read_buffer(f).captions
 
     segments = []
     for caption in captions:
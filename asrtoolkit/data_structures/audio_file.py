@@ -3,11 +3,20 @@
 Module for holding information about an audio file and doing basic conversions
 """
 
-import hashlib
 import logging
 import os
+import struct
 import subprocess
 
+from asrtoolkit.file_utils.audio_io import (
+    AudioInfo,
+    UnsupportedAudioError,
+    convert_audio,
+    header_info,
+    mix_audio,
+)
+from asrtoolkit.file_utils.hashing import hash_bytes, hash_file
+from asrtoolkit.file_utils.manifest import cached_file_property
 from asrtoolkit.file_utils.name_cleaners import (
     generate_segmented_file_name,
     sanitize_hyphens,
@@ -18,6 +27,74 @@ from asrtoolkit.file_utils.script_input_validation import valid_input_file
 LOGGER = logging.getLogger()
 
 
+def soxi_info(file_name):
+    "Returns the AudioInfo of any file sox can read (e.g. mp3) using soxi"
+    output = subprocess.run(
+        ["soxi", file_name],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        universal_newlines=True,
+        check=True,
+    ).stdout
+    fields = dict(
+        (key.strip(), value.strip())
+        for key, _, value in (line.partition(":") for line in output.splitlines())
+    )
+    sample_rate = int(fields["Sample Rate"])
+    n_frames = int(fields["Duration"].split("=")[1].split()[0])
+    return AudioInfo(
+        n_frames / sample_rate,
+        sample_rate,
+        int(fields["Channels"]),
+        n_frames,
+        fields.get("Sample Encoding", ""),
+    )
+
+
+def read_audio_info(file_name):
+    "Returns the AudioInfo of an audio file, reading only the header unless it is mp3"
+    try:
+        return header_info(file_name)
+    except UnsupportedAudioError:
+        if file_name.lower().endswith(".mp3"):
+            return soxi_info(file_name)
+        raise
+
+
+def audio_info(file_name):
+    """
+    Returns the AudioInfo (duration in seconds, sample rate, channels, frames
+    and encoding) of an audio file or None if it cannot be read
+    Results are cached in the directory manifest until the file changes
+    """
+    try:
+        return AudioInfo(
+            **cached_file_property(
+                file_name, "audio_info", lambda _: read_audio_info(_)._asdict()
+            )
+        )
+    except (
+        OSError,
+        KeyError,
+        IndexError,
+        ValueError,
+        ZeroDivisionError,
+        struct.error,
+        subprocess.CalledProcessError,
+    ) as exc:
+        LOGGER.debug("Could not read audio info of %s: %s", file_name, exc)
+    return None
+
+
+def audio_duration(file_name):
+    """
+    Returns the duration in seconds of an audio file from its audio_info
+    or None if it cannot be read
+    """
+    info = audio_info(file_name)
+    return info.duration if info is not None else None
+
+
 def cut_utterance(
     source_audio_file, target_audio_file, start_time, end_time, sample_rate=16000
 ):
@@ -78,7 +155,14 @@ def degrade_audio(source_audio_file, target_audio_file=None):
 def combine_audio(audio_files, output_file, gain=False):
     """
     Combine audio files with possible renormalization to 0dB
+    PCM WAV/SPH/AU inputs are mixed in-process in blocks, others with sox
     """
+    try:
+        mix_audio(audio_files, output_file, normalize=gain)
+        return
+    except UnsupportedAudioError as exc:
+        LOGGER.debug("Using sox to combine audio: %s", exc)
+
     gain_str = ""
     if gain:
         gain_str = "gain -n 0"
@@ -106,20 +190,27 @@ class AudioFile:
             raise FileNotFoundError('Could not find file at "{}"'.format(location))
         self.location = location
 
-    def hash(self):
+    def hash(self, algorithm="sha1"):
         """
-        Returns a sha1 hash of the file
+        Returns a sha1 hash of the file, read in chunks and cached while it is unchanged
+        Use algorithm='fast' for a quicker non-cryptographic digest for deduplication
         """
         if self.location:
-            with open(self.location, "rb") as f:
-                return hashlib.sha1(f.read()).hexdigest()
+            return hash_file(self.location, algorithm)
         else:
-            return hashlib.sha1("".encode()).hexdigest()
+            return hash_bytes(b"", algorithm)
+
+    def info(self):
+        """
+        Returns the duration, sample rate, channels, frames and encoding
+        read from the file header (or soxi for mp3), or None if unreadable
+        """
+        return audio_info(self.location)
 
     def prepare_for_training(self, file_name, sample_rate=16000):
         """
         Converts to single channel (from channel 1) audio file
-        in SPH file format
+        in SPH file format, in-process for PCM WAV/SPH/AU files and with sox otherwise
         Returns AudioFile object on success, else None
         """
         if file_name.split(".")[-1] != "sph":
@@ -130,6 +221,13 @@ class AudioFile:
 
         file_name = sanitize_hyphens(file_name)
 
+        # convert PCM audio in-process, falling back to sox for other formats
+        try:
+            convert_audio(self.location, file_name, sample_rate)
+            return AudioFile(file_name)
+        except UnsupportedAudioError as exc:
+            LOGGER.debug("Using sox for %s: %s", self.location, exc)
+
         # return None if error code given, otherwise return audio_file object
         output_file = (
             AudioFile(file_name)
@@ -144,11 +242,16 @@ class AudioFile:
 
         return output_file
 
-    def split(self, transcript, target_dir):
+    def split(self, transcript, target_dir, start=None, stop=None):
         """
         Split audio file and transcript into many pieces based on
-        valid segments of transcript
+        valid segments of transcript, optionally only those overlapping
+        start to stop seconds
         """
+        if start is not None or stop is not None:
+            location = transcript.location
+            transcript = transcript.slice(start, stop)
+            transcript.location = location
 
         os.makedirs(target_dir, exist_ok=True)
         for iseg, seg in enumerate(transcript.segments):
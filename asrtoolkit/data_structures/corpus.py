@@ -4,19 +4,32 @@ Module for organizing SPH/MP3/WAV & STM files from a Corpus
 """
 
 import glob
+import logging
 import os
 import random
-from concurrent.futures import ThreadPoolExecutor
+from bisect import bisect_right
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from functools import partial
+from itertools import accumulate
 
 from tqdm import tqdm
 
+from asrtoolkit.file_utils.executor import BoundedExecutor
+from asrtoolkit.file_utils.hashing import hash_files
+from asrtoolkit.file_utils.manifest import save_manifests
 from asrtoolkit.file_utils.name_cleaners import basename, strip_extension
 
-from .audio_file import AudioFile
-from .exemplar import Exemplar
+from .audio_file import AudioFile, audio_duration
+from .exemplar import (
+    Exemplar,
+    count_file_words_and_segments,
+    count_words_and_segments,
+)
 from .time_aligned_text import Transcript
 
+LOGGER = logging.getLogger(__name__)
+
 
 def get_files(data_dir, extension):
     """
@@ -24,10 +37,146 @@ def get_files(data_dir, extension):
     """
     files = []
     if data_dir and os.path.exists(data_dir):
-        files = glob.glob(data_dir + "/*." + extension)
+        files = sorted(glob.glob(data_dir + "/*." + extension))
     return files
 
 
+def hash_data_files(data_files, algorithm="sha1", max_workers=None):
+    """
+    Returns hashes of AudioFile or Transcript objects, hashing files on disk
+    over a thread pool and saving the digests to the corpus manifests
+    """
+    file_hashes = hash_files(
+        [_.location for _ in data_files if _.location and os.path.isfile(_.location)],
+        algorithm,
+        max_workers,
+    )
+    save_manifests()
+    return [
+        file_hashes[_.location] if _.location in file_hashes else _.hash(algorithm)
+        for _ in data_files
+    ]
+
+
+# count transcripts in worker processes when more than this many need counting
+MIN_PARALLEL_COUNTS = 16
+
+
+def count_transcripts(exemplars, max_workers=None):
+    """
+    Sets n_words and n_segments on each exemplar, reusing counts from the
+    corpus manifests and counting new or changed transcript files in parallel
+    """
+    to_count = [eg for eg in exemplars if not eg.cached_counts()]
+    on_disk = [eg for eg in to_count if eg.transcript_manifest() is not None]
+    if len(on_disk) > MIN_PARALLEL_COUNTS and max_workers != 1:
+        with ProcessPoolExecutor(max_workers) as executor:
+            counts = executor.map(
+                count_file_words_and_segments,
+                [eg.transcript_file.location for eg in on_disk],
+                [eg.transcript_file.file_format for eg in on_disk],
+                chunksize=max(1, len(on_disk) // (4 * (os.cpu_count() or 1))),
+            )
+            for eg, (n_words, n_segments) in zip(on_disk, counts):
+                eg.record_counts(n_words, n_segments)
+        to_count = [eg for eg in to_count if eg.transcript_manifest() is None]
+
+    for eg in to_count:
+        eg.record_counts(*count_words_and_segments(eg.transcript_file))
+    save_manifests()
+
+
+def audio_infos(audio_files, max_workers=None):
+    """
+    Returns the AudioInfo of each AudioFile (None if unreadable), reading
+    headers over a thread pool and saving them to the corpus manifests
+    """
+    with ThreadPoolExecutor(max_workers) as executor:
+        infos = list(executor.map(lambda _: _.info(), audio_files))
+    save_manifests()
+    return infos
+
+
+def prepare_exemplar(exemplar, target, sample_rate, nested):
+    "Exemplar.prepare_for_training at module level for worker processes"
+    return exemplar.prepare_for_training(
+        target=target, sample_rate=sample_rate, nested=nested
+    )
+
+
+def most_common(values):
+    """
+    Returns the most common value, preferring the first seen in case of ties
+    >>> most_common(["b", "a", "a", "b"])
+    'b'
+    """
+    counts = Counter(values)
+    return max(counts, key=counts.get) if counts else None
+
+
+# functions returning the stratum an exemplar belongs to when splitting
+STRATA = {
+    "source": lambda eg: os.path.dirname(os.path.abspath(eg.audio_file.location)),
+    "speaker": lambda eg: most_common(_.speaker for _ in eg.transcript_file.segments),
+    "channel": lambda eg: most_common(_.channel for _ in eg.transcript_file.segments),
+}
+
+
+def take_prefixes(sizes, targets):
+    """
+    Given the (words, segments) of items in order, and (words, segments) targets,
+    returns the end of each consecutive slice of items just exceeding its target
+    >>> take_prefixes([(5, 1), (5, 1), (5, 1), (5, 1)], [(6, 0), (4, 0)])
+    [2, 3]
+    """
+    word_sums = list(accumulate(_[0] for _ in sizes))
+    segment_sums = list(accumulate(_[1] for _ in sizes))
+    ends, start = [], 0
+    for words, segments in targets:
+        base_words = word_sums[start - 1] if start else 0
+        base_segments = segment_sums[start - 1] if start else 0
+        end = 1 + max(
+            bisect_right(word_sums, base_words + words, start),
+            bisect_right(segment_sums, base_segments + segments, start),
+        )
+        start = min(end, len(sizes))
+        ends.append(start)
+    return ends
+
+
+def clears_keyed(method):
+    "Wraps a list method so that it drops the list's keyed index"
+
+    def wrapped(self, *args, **kwargs):
+        self.keyed = None
+        return method(self, *args, **kwargs)
+
+    wrapped.__name__ = method.__name__
+    return wrapped
+
+
+class ExemplarList(list):
+    """
+    List of exemplars holding the keyed index of a Corpus,
+    which is dropped whenever the list is changed
+    """
+
+    keyed = None
+
+    __setitem__ = clears_keyed(list.__setitem__)
+    __delitem__ = clears_keyed(list.__delitem__)
+    __iadd__ = clears_keyed(list.__iadd__)
+    __imul__ = clears_keyed(list.__imul__)
+    append = clears_keyed(list.append)
+    extend = clears_keyed(list.extend)
+    insert = clears_keyed(list.insert)
+    pop = clears_keyed(list.pop)
+    remove = clears_keyed(list.remove)
+    clear = clears_keyed(list.clear)
+    sort = clears_keyed(list.sort)
+    reverse = clears_keyed(list.reverse)
+
+
 class Corpus:
     """
     Create a Corpus object for storing information about
@@ -35,14 +184,15 @@ class Corpus:
     """
 
     location = None
-    exemplars = []
     n_words = 0
+    failures = []
+    _exemplars = None
 
     def __init__(self, *args, **kwargs):
         """
         Initialize from location and populate list of
         SPH, WAV, or MP3 audio files
-        and STM files into segments
+        and STM files, which are parsed into segments when first used
         """
         for dictionary in args:
             if isinstance(dictionary, dict):
@@ -53,7 +203,7 @@ class Corpus:
 
         # only if not defined above should we search for exemplars
         # based on location
-        if not self.exemplars:
+        if self._exemplars is None:
             # instantiate exemplars for this object to override
             # static class variable
             self.exemplars = []
@@ -63,7 +213,9 @@ class Corpus:
                 Exemplar(
                     {
                         "audio_file": AudioFile(fl),
-                        "transcript_file": Transcript(strip_extension(fl) + ".stm"),
+                        "transcript_file": Transcript(
+                            strip_extension(fl) + ".stm", lazy=True
+                        ),
                     }
                 )
                 for audio_extension in audio_extensions_to_try
@@ -82,7 +234,8 @@ class Corpus:
                             self.location
                             + "/stm/"
                             + basename(strip_extension(fl))
-                            + ".stm"
+                            + ".stm",
+                            lazy=True,
                         ),
                     }
                 )
@@ -99,145 +252,303 @@ class Corpus:
                 )
             ]
 
+    @property
+    def exemplars(self):
+        "List of exemplars in this Corpus"
+        if self._exemplars is None:
+            self._exemplars = ExemplarList()
+        return self._exemplars
+
+    @exemplars.setter
+    def exemplars(self, exemplars):
+        self._exemplars = ExemplarList(exemplars)
+
+    def index(self):
+        """
+        Returns an ordered dict of exemplar key: exemplar, keeping the first
+        of any duplicates. It is rebuilt after exemplars are assigned or changed
+        """
+        exemplars = self.exemplars
+        if exemplars.keyed is None:
+            keyed = {}
+            for eg in exemplars:
+                keyed.setdefault(eg.key(), eg)
+            exemplars.keyed = keyed
+        return exemplars.keyed
+
     def validate(self):
         """
-        Check and validate each example after sorting by audio file hash
-        since stm hash may change
+        Check and validate each example after removing duplicates by audio file hash
+        since stm hash may change. The first of any duplicates is kept in order
         """
-        dict_of_examples = {_.audio_file.hash(): _ for _ in self.exemplars}
-        self.exemplars = [dict_of_examples[_] for _ in set(dict_of_examples)]
+        audio_hashes = hash_data_files([_.audio_file for _ in self.exemplars])
+        dict_of_examples = {}
+        for audio_hash, eg in zip(audio_hashes, self.exemplars):
+            dict_of_examples.setdefault(audio_hash, eg)
+        self.exemplars = dict_of_examples.values()
         return sum(_.validate() for _ in self.exemplars)
 
-    def count_exemplar_words(self):
+    def count_exemplar_words(self, max_workers=None, normalizer=None):
         """
         Count the number of words in valid Corpus exemplars
-        adds attribute n_words to exemplars
+        adds attributes n_words and n_segments to exemplars
+        Counts are kept in the corpus manifests until transcripts change,
+        unless a normalization profile other than the default is given
         """
         valid_exemplars = [_ for _ in self.exemplars if _.validate()]
+        if normalizer is None:
+            count_transcripts(valid_exemplars, max_workers)
+        else:
+            for eg in valid_exemplars:
+                eg.n_words, eg.n_segments = count_words_and_segments(
+                    eg.transcript_file, normalizer
+                )
+        return valid_exemplars, sum(eg.n_words for eg in valid_exemplars)
 
-        total_words = 0
-        for eg in valid_exemplars:
-            eg.n_words = eg.count_words()
-            total_words += eg.n_words
-        return valid_exemplars, total_words
+    def audio_info(self, max_workers=None):
+        """
+        Returns a dict of audio file location: AudioInfo for all exemplars
+        Headers are read in parallel and cached until files change
+        """
+        audio_files = [eg.audio_file for eg in self.exemplars]
+        return {
+            af.location: info
+            for af, info in zip(audio_files, audio_infos(audio_files, max_workers))
+        }
+
+    def duration(self, max_workers=None):
+        """
+        Total duration in seconds of the corpus audio, skipping unreadable files
+        """
+        return sum(
+            info.duration
+            for info in self.audio_info(max_workers).values()
+            if info is not None
+        )
 
-    def split(self, split_words, min_segments=10):
+    def split(self, split_words, min_segments=10, seed=None, stratify=None):
         """
         Select exemplars to create data split with specified number of words and minimum number of segments
         Returns the new splits as separate corpora
+        See split_many for seed and stratify
+        """
+        remaining_corpus, splits = self.split_many(
+            {"split": split_words}, min_segments, seed=seed, stratify=stratify
+        )
+        return remaining_corpus, splits["split"]
+
+    def split_many(self, splits, min_segments=10, seed=None, stratify=None):
+        """
+        Select exemplars for several data splits in one pass
+        splits is a dict of split name: number of words, e.g. {"test": 1000, "dev": 1000}
+        and each split gets just over its words and over min_segments segments.
+
+        Exemplars are sorted, then shuffled once with random.Random(seed)
+        (or the random module if seed is None), so a seed always gives the same splits.
+        stratify may be 'speaker', 'channel', or 'source' (audio directory)
+        to draw each split from every stratum in proportion to its words.
+
+        Returns the remaining corpus and a dict of split name: Corpus
         """
         valid_exemplars, total_words = self.count_exemplar_words()
 
-        # Raise error if we inputs are invalid to avoid infinite loop
-        if split_words < 0 or split_words > total_words:
+        # Raise error if we inputs are invalid
+        if any(_ < 0 for _ in splits.values()) or sum(splits.values()) > total_words:
             raise ValueError(
                 "cannot split Corpus with {} words into split with {} words".format(
-                    total_words, split_words
+                    total_words, sum(splits.values())
                 )
             )
 
-        exemplars_in_split = []
-        word_counter, seg_counter = 0, 0
-        while word_counter <= split_words or seg_counter <= min_segments:
-            exemplars_in_split += [
-                valid_exemplars.pop(random.randrange(len(valid_exemplars)))
-            ]
-            word_counter += exemplars_in_split[-1].n_words
-            seg_counter += len(exemplars_in_split[-1].transcript_file.segments)
+        valid_exemplars.sort(key=lambda eg: eg.key())
+        (random.Random(seed) if seed is not None else random).shuffle(valid_exemplars)
 
-        new_corpus = Corpus(
-            {"location": self.location, "exemplars": exemplars_in_split,}
-        )
+        strata = {}
+        for eg in valid_exemplars:
+            strata.setdefault(STRATA[stratify](eg) if stratify else None, []).append(eg)
+
+        chosen = {name: [] for name in splits}
+        for group in strata.values():
+            share = sum(eg.n_words for eg in group) / total_words if stratify else 1
+            ends = take_prefixes(
+                [(eg.n_words, eg.n_segments) for eg in group],
+                [(words * share, min_segments * share) for words in splits.values()],
+            )
+            for name, start, end in zip(splits, [0] + ends, ends):
+                chosen[name] += group[start:end]
+
+        for name, words in splits.items():
+            chosen_words = sum(eg.n_words for eg in chosen[name])
+            chosen_segments = sum(eg.n_segments for eg in chosen[name])
+            if chosen_words <= words or chosen_segments <= min_segments:
+                raise ValueError(
+                    "not enough words or segments left for split {}".format(name)
+                )
 
-        remaining_corpus = self - new_corpus
+        split_corpora = {
+            name: Corpus({"location": self.location, "exemplars": exemplars})
+            for name, exemplars in chosen.items()
+        }
+
+        remaining_corpus = self - Corpus(
+            {"exemplars": [eg for exemplars in chosen.values() for eg in exemplars]}
+        )
         remaining_corpus.location = self.location
 
-        return remaining_corpus, new_corpus
+        return remaining_corpus, split_corpora
 
     def log(self):
         """
         Log what each hashed example contains
+        Files are hashed once each, in parallel, and kept in the corpus manifests
         """
+        audio_hashes = hash_data_files([_.audio_file for _ in self.exemplars])
+        transcript_hashes = hash_data_files([_.transcript_file for _ in self.exemplars])
         return {
-            _.hash(): {
-                "audio_file": _.audio_file.location,
-                "audio_file_hash": _.audio_file.hash(),
-                "transcript_file": _.transcript_file.location,
-                "transcript_file_hash": _.transcript_file.hash(),
+            audio_file_hash
+            + transcript_file_hash: {
+                "audio_file": eg.audio_file.location,
+                "audio_file_hash": audio_file_hash,
+                "transcript_file": eg.transcript_file.location,
+                "transcript_file_hash": transcript_file_hash,
             }
-            for _ in self.exemplars
+            for eg, audio_file_hash, transcript_file_hash in zip(
+                self.exemplars, audio_hashes, transcript_hashes
+            )
         }
 
     def calculate_number_of_segments(self):
         """
         Calculate how many segments are in this Corpus
         """
-        return sum(len(eg.transcript_file.segments) for eg in self.exemplars)
-
-    def prepare_for_training(self, target=None, nested=False, sample_rate=16000):
+        count_transcripts(self.exemplars)
+        return sum(eg.n_segments for eg in self.exemplars)
+
+    def prepare_for_training(
+        self,
+        target=None,
+        nested=False,
+        sample_rate=16000,
+        max_workers=None,
+        max_in_flight=None,
+        processes=False,
+        incremental=False,
+    ):
         """
         Run validation and audio file preparation steps
+        Exemplars are prepared on a pool of max_workers threads (or processes)
+        with at most max_in_flight queued at once.
+        Exemplars which fail are logged and kept in the failures attribute
+
+        If incremental, finished exemplars are journaled in the target manifests
+        and exemplars whose outputs were already made from the same inputs
+        at the same sample rate are skipped, so interrupted runs resume
         """
 
         # write Corpus back in place if no target
         target = self.location if target is None else target
 
-        executor = ThreadPoolExecutor()
+        to_prepare, new_exemplars, audio_seconds = self.exemplars, [], 0.0
+        if incremental:
+            hash_data_files(
+                [_.audio_file for _ in to_prepare]
+                + [_.transcript_file for _ in to_prepare]
+            )
+            prepared = [
+                _.find_prepared(target, nested, sample_rate) for _ in to_prepare
+            ]
+            new_exemplars = [_ for _ in prepared if _ is not None]
+            to_prepare = [eg for eg, _ in zip(to_prepare, prepared) if _ is None]
+            LOGGER.info(
+                "Skipping %d exemplars already prepared in %s",
+                len(new_exemplars),
+                target,
+            )
 
-        # process audio files concurrently for speed
-        futures = [
-            executor.submit(
+        with BoundedExecutor(max_workers, max_in_flight, processes) as executor, tqdm(
+            total=len(to_prepare), unit="file"
+        ) as progress:
+            results = executor.map(
                 partial(
-                    _.prepare_for_training,
+                    prepare_exemplar,
                     target=target,
                     sample_rate=sample_rate,
                     nested=nested,
-                )
+                ),
+                to_prepare,
             )
-            for _ in self.exemplars
-        ]
-
-        # trigger conversion and gather results
-        new_exemplars = [future.result() for future in tqdm(futures)]
+            for eg, new_eg in zip(to_prepare, results):
+                progress.update()
+                if new_eg is None:
+                    continue
+                if incremental:
+                    eg.record_prepared(new_eg, sample_rate)
+                new_exemplars.append(new_eg)
+                audio_seconds += audio_duration(new_eg.audio_file.location) or 0.0
+                elapsed = max(progress.format_dict["elapsed"], 1e-9)
+                progress.set_postfix_str(
+                    "{:.3f} audio-hours/s".format(audio_seconds / 3600 / elapsed)
+                )
 
-        new_corpus = Corpus(
-            {
-                "location": target,
-                "exemplars": [eg for eg in new_exemplars if eg is not None],
-            }
+        self.failures = executor.failures
+        elapsed = max(progress.format_dict["elapsed"], 1e-9)
+        LOGGER.info(
+            "Prepared %d of %d exemplars (%d failed) at %.2f files/s, %.3f audio-hours/s",
+            len(to_prepare) - len(self.failures),
+            len(to_prepare),
+            len(self.failures),
+            (len(to_prepare) - len(self.failures)) / elapsed,
+            audio_seconds / 3600 / elapsed,
         )
+
+        new_corpus = Corpus({"location": target, "exemplars": new_exemplars})
         new_corpus.validate()
         return new_corpus.log()
 
     def __add__(self, other):
-        """Allow addition of corpora via + operator"""
-        return Corpus({"location": None, "exemplars": self.exemplars + other.exemplars})
+        """Allow addition of corpora via + operator, keeping one copy of shared exemplars"""
+        index = dict(self.index())
+        for key, eg in other.index().items():
+            index.setdefault(key, eg)
+        return Corpus({"location": None, "exemplars": index.values()})
 
     def __iadd__(self, other):
         """Allow addition of corpora via += operator"""
-        self.exemplars = self.exemplars + other.exemplars
+        self.exemplars = (self + other).exemplars
         return self
 
     def __sub__(self, other):
-        """Allow addition of corpora via - operator"""
+        """Allow subtraction of corpora via - operator"""
+        other_index = other.index()
         return Corpus(
             {
                 "location": None,
-                "exemplars": [_ for _ in self.exemplars if _ not in other.exemplars],
+                "exemplars": [_ for _ in self.exemplars if _.key() not in other_index],
             }
         )
 
     def __isub__(self, other):
         """Allow subtraction of corpora via -= operator"""
-        self.exemplars = [_ for _ in self.exemplars if _ not in other.exemplars]
+        self.exemplars = (self - other).exemplars
+        return self
+
+    def __contains__(self, exemplar):
+        """Allow membership tests of exemplars via in"""
+        return exemplar.key() in self.index()
+
+    def __len__(self):
+        """Number of exemplars in this Corpus"""
+        return len(self.exemplars)
 
     def __getitem__(self, given):
         """Allow slicing of corpora via []"""
         return Corpus(
             {
                 "location": self.location,
-                "exemplars": [self.exemplars[given]]
-                if not isinstance(given, slice)
-                else self.exemplars[given],
+                "exemplars": (
+                    [self.exemplars[given]]
+                    if not isinstance(given, slice)
+                    else self.exemplars[given]
+                ),
             }
         )
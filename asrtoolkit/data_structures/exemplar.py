@@ -3,10 +3,35 @@
 """
 Stores Exemplar class for corpus management
 """
+
 import os
 
-from asrtoolkit.clean_formatting import clean_up
-from asrtoolkit.file_utils.name_cleaners import basename, strip_extension
+from asrtoolkit.clean_formatting import DEFAULT_NORMALIZER, clean_up
+from asrtoolkit.file_utils.manifest import get_manifest
+from asrtoolkit.file_utils.name_cleaners import (
+    basename,
+    sanitize_hyphens,
+    strip_extension,
+)
+
+from .audio_file import AudioFile
+from .time_aligned_text import Transcript
+
+# manifest property journaling the inputs an output of prepare_for_training came from
+PREPARED_FROM = "prepared_from"
+
+
+def count_words_and_segments(transcript, normalizer=None):
+    "Returns the number of words after cleaning and the number of segments"
+    return (
+        len(clean_up(transcript.text(), normalizer=normalizer).split()),
+        len(transcript.segments),
+    )
+
+
+def count_file_words_and_segments(file_name, file_format=None):
+    "count_words_and_segments of a file, at module level for worker processes"
+    return count_words_and_segments(Transcript(file_name, file_format))
 
 
 class Exemplar:
@@ -16,6 +41,8 @@ class Exemplar:
 
     audio_file = None
     transcript_file = None
+    n_words = None
+    n_segments = None
 
     def __init__(self, *args, **kwargs):
         "Instantiate using input args and kwargs"
@@ -26,6 +53,34 @@ class Exemplar:
         for key, value in kwargs.items():
             setattr(self, key, value)
 
+    def __repr__(self):
+        return "Exemplar({!r}, {!r})".format(*self.locations())
+
+    def locations(self):
+        "Returns the absolute paths of the audio and transcript files, or None"
+        return tuple(
+            os.path.abspath(_.location) if _ is not None and _.location else None
+            for _ in (self.audio_file, self.transcript_file)
+        )
+
+    def key(self):
+        """
+        Stable identity of an Exemplar: the absolute paths of its files
+        Exemplars without either file are only identical to themselves
+        >>> first, second = Exemplar(), Exemplar()
+        >>> first.key() == second.key()
+        False
+        """
+        locations = self.locations()
+        return locations if any(locations) else (None, id(self))
+
+    def __eq__(self, other):
+        "Exemplars are equal if they pair the same files"
+        return isinstance(other, Exemplar) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
     def validate(self):
         """
         Validates Exemplar object by constraining that the filenames before the
@@ -48,20 +103,66 @@ class Exemplar:
 
         return bool(valid)
 
-    def count_words(self, clean_func=clean_up):
-        """Count words in a Exemplar after cleaning it"""
-        return (
-            len(clean_func(self.transcript_file.text()).split())
-            if self.validate()
-            else 0
-        )
+    def transcript_manifest(self):
+        "Returns the manifest of the transcript's directory, if it is a file"
+        location = self.transcript_file.location
+        if location and os.path.isfile(location):
+            return get_manifest(os.path.dirname(os.path.abspath(location)))
+        return None
 
-    def prepare_for_training(self, target, sample_rate=16000, nested=False):
+    def cached_counts(self):
         """
-        Prepare one Exemplar for training
-        Returning a new Exemplar object with updated file locations
-        and a resampled audio_file
+        Sets n_words and n_segments from the transcript's manifest
+        Returns False if the transcript is new or changed since it was counted,
+        or was counted with other default normalization rules
         """
+        manifest = self.transcript_manifest()
+        counts = manifest.lookup(self.transcript_file.location) if manifest else {}
+        if (
+            "n_words" in counts
+            and "n_segments" in counts
+            and counts.get("normalizer") == DEFAULT_NORMALIZER.version
+        ):
+            self.n_words, self.n_segments = counts["n_words"], counts["n_segments"]
+            return True
+        return False
+
+    def record_counts(self, n_words, n_segments):
+        "Sets n_words and n_segments and stores them in the transcript's manifest"
+        self.n_words, self.n_segments = n_words, n_segments
+        manifest = self.transcript_manifest()
+        if manifest:
+            manifest.record(
+                self.transcript_file.location,
+                n_words=n_words,
+                n_segments=n_segments,
+                normalizer=DEFAULT_NORMALIZER.version,
+            )
+
+    def count_transcript(self):
+        """
+        Returns the number of words and segments in the transcript, which are
+        cached until the transcript file changes
+        """
+        if not self.cached_counts():
+            self.record_counts(*count_words_and_segments(self.transcript_file))
+        return self.n_words, self.n_segments
+
+    def count_words(self, clean_func=clean_up, normalizer=None):
+        """
+        Count words in a Exemplar after cleaning it
+        Counts with the default normalization profile are cached
+        """
+        if not self.validate():
+            return 0
+        if clean_func is not clean_up:
+            return len(clean_func(self.transcript_file.text()).split())
+        if normalizer is not None:
+            return count_words_and_segments(self.transcript_file, normalizer)[0]
+        return self.count_transcript()[0]
+
+    def target_files(self, target, nested=False):
+        "Returns where prepare_for_training should write the audio and transcript"
         if nested:
             af_target_file = os.path.join(
                 target, "sph", basename(self.audio_file.location)
@@ -74,9 +175,63 @@ class Exemplar:
             tf_target_file = os.path.join(
                 target, basename(self.transcript_file.location)
             )
+        return af_target_file, tf_target_file
+
+    def source_id(self, sample_rate=16000):
+        "Identifies the inputs of prepare_for_training in its journal"
+        return [self.audio_file.hash(), self.transcript_file.hash(), sample_rate]
+
+    def find_prepared(self, target, nested=False, sample_rate=16000):
+        """
+        Returns an Exemplar of the files an earlier prepare_for_training wrote
+        from the same input files at the same sample rate, else None
+        """
+        af_target_file, tf_target_file = self.target_files(target, nested)
+        prepared_files = [
+            sanitize_hyphens(strip_extension(af_target_file) + ".sph"),
+            sanitize_hyphens(tf_target_file),
+        ]
+        source_id = self.source_id(sample_rate)
+        if all(
+            os.path.isfile(_)
+            and get_manifest(os.path.dirname(os.path.abspath(_)))
+            .lookup(_)
+            .get(PREPARED_FROM)
+            == source_id
+            for _ in prepared_files
+        ):
+            return Exemplar(
+                {
+                    "audio_file": AudioFile(prepared_files[0]),
+                    "transcript_file": Transcript(prepared_files[1], lazy=True),
+                }
+            )
+        return None
+
+    def record_prepared(self, prepared, sample_rate=16000):
+        "Journals that the prepared Exemplar was made from this one at sample_rate"
+        source_id = self.source_id(sample_rate)
+        for location in [
+            prepared.audio_file.location,
+            prepared.transcript_file.location,
+        ]:
+            manifest = get_manifest(
+                os.path.dirname(os.path.abspath(location)), persist=True
+            )
+            manifest.record(location, **{PREPARED_FROM: source_id})
+            manifest.save()
+
+    def prepare_for_training(self, target, sample_rate=16000, nested=False):
+        """
+        Prepare one Exemplar for training
+        Returning a new Exemplar object with updated file locations
+        and a resampled audio_file
+        """
+        af_target_file, tf_target_file = self.target_files(target, nested)
 
         af = self.audio_file.prepare_for_training(
-            af_target_file, sample_rate=sample_rate,
+            af_target_file,
+            sample_rate=sample_rate,
         )
 
         tf = self.transcript_file.write(tf_target_file)
@@ -87,8 +242,21 @@ class Exemplar:
             else None
         )
 
-    def hash(self):
+    def segments_outside_audio(self, tolerance=0.0):
+        """
+        Returns transcript segments ending more than tolerance seconds
+        after the end of the audio (all segments if the audio is unreadable)
+        """
+        info = self.audio_file.info()
+        duration = info.duration if info else 0.0
+        return [
+            seg
+            for seg in self.transcript_file.segments
+            if float(seg.stop) > duration + tolerance
+        ]
+
+    def hash(self, algorithm="sha1"):
         """
         Returns combined hash of two files
         """
-        return self.audio_file.hash() + self.transcript_file.hash()
+        return self.audio_file.hash(algorithm) + self.transcript_file.hash(algorithm)
@@ -6,6 +6,12 @@ Class for holding a segment
 import json
 import logging
 
+from asrtoolkit.clean_formatting import (
+    DEFAULT_NORMALIZER,
+    clean_up,
+    is_normalized,
+    load_normalizer,
+)
 from asrtoolkit.data_structures.formatting import clean_float
 
 LOGGER = logging.getLogger(__name__)
@@ -42,6 +48,8 @@ class Segment:
     formatted_text = ""
     # confidence in accuracy of text
     confidence = 1.0
+    # (normalizer version, text, cleaned text) of the last clean_text call
+    _clean_text = None
 
     def __init__(self, *args, **kwargs):
         """
@@ -74,6 +82,37 @@ class Segment:
 
         return ret_str
 
+    def clean_text(self, normalizer=None):
+        """
+        Returns text cleaned with a normalization profile (the default if None)
+        The result is kept with the profile version and the text it came from,
+        so writing or scoring the segment again does not clean it again
+        >>> seg = Segment({"text": "this is test 2"})
+        >>> seg.clean_text()
+        'this is test two'
+        >>> seg.text = "this is already clean"
+        >>> seg.clean_text()
+        'this is already clean'
+        """
+        normalizer = load_normalizer(normalizer) or DEFAULT_NORMALIZER
+        if self._clean_text is None or self._clean_text[:2] != (
+            normalizer.version,
+            self.text,
+        ):
+            # text which is already clean for the default profile is not cleaned
+            if normalizer.version == DEFAULT_NORMALIZER.version and is_normalized(
+                self.text
+            ):
+                clean_text = self.text
+            else:
+                clean_text = clean_up(self.text, normalizer=normalizer)
+            self.set_clean_text(clean_text, normalizer.version)
+        return self._clean_text[2]
+
+    def set_clean_text(self, clean_text, version=DEFAULT_NORMALIZER.version):
+        "Records clean_text as the text cleaned by the profile with this version"
+        self._clean_text = (version, self.text, clean_text)
+
     def validate(self):
         """
         Checks for common failure cases for if a line is valid or not
@@ -3,29 +3,220 @@
 Class for holding time_aligned text
 """
 
-import hashlib
+import copy
+import heapq
 import importlib
+import math
 import os
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
 
+from asrtoolkit.clean_formatting import is_normalized
+from asrtoolkit.data_handlers.format_detection import (
+    detect_format,
+    detect_json_format,
+)
+from asrtoolkit.data_structures.formatting import clean_float
+from asrtoolkit.file_utils.common_file_operations import open_file
+from asrtoolkit.file_utils.hashing import hash_bytes, hash_file
 from asrtoolkit.file_utils.name_cleaners import (
     generate_segmented_file_name,
+    get_extension,
     sanitize_hyphens,
 )
 
 
+def parse_segments(file_name, file_format=None):
+    """
+    Parse the segments of a transcript file with the data handler for its format
+    JSON formats are detected from the file if file_format is not given
+    """
+    file_extension = get_extension(file_name)
+    if file_format is None and file_extension == "json":
+        file_format = detect_format(file_name)
+    data_handler = importlib.import_module(
+        "asrtoolkit.data_handlers.{:}".format(
+            file_format if file_format is not None else file_extension
+        )
+    )
+    return list(filter(lambda seg: seg is not None, data_handler.read_file(file_name)))
+
+
+class ParsedTranscripts:
+    """
+    Bounded least-recently-used cache of parsed transcript files
+    keyed by path, format, size, and mtime. A max_size of 0 disables it.
+    Each caller gets its own list, but the Segment objects in it are shared
+    between callers and must not be edited in place.
+    """
+
+    def __init__(self, max_size=0):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, file_name, file_format=None):
+        "Returns a new list of the segments of a file, parsing it if it is not cached"
+        if not self.max_size:
+            return parse_segments(file_name, file_format)
+
+        stat = os.stat(file_name)
+        key = (os.path.abspath(file_name), file_format, stat.st_size, stat.st_mtime_ns)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return list(self.entries[key])
+
+        segments = parse_segments(file_name, file_format)
+        with self.lock:
+            self.entries[key] = segments
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        return list(segments)
+
+
+PARSED_TRANSCRIPTS = ParsedTranscripts()
+
+
+def set_transcript_cache_size(max_size):
+    """
+    Keep up to max_size parsed files in memory for lazy transcripts
+    Lazy transcripts then fetch their segments from this cache on every access
+    instead of holding on to them, bounding memory use for large corpora
+    The Segment objects are shared between readers of the same file
+    """
+    with PARSED_TRANSCRIPTS.lock:
+        PARSED_TRANSCRIPTS.max_size = max_size
+        while len(PARSED_TRANSCRIPTS.entries) > max_size:
+            PARSED_TRANSCRIPTS.entries.popitem(last=False)
+
+
+def time_key(segment):
+    "Sort key of a segment, its start then stop time in seconds"
+    return float(segment.start), float(segment.stop)
+
+
+def keyed_segments(segments, index):
+    """
+    Returns (start, stop, index, position, segment) tuples in time order,
+    only sorting if the segments are not already in order
+    """
+    keyed = [time_key(seg) + (index, i, seg) for i, seg in enumerate(segments)]
+    if any(a[:2] > b[:2] for a, b in zip(keyed, keyed[1:])):
+        keyed.sort()
+    return keyed
+
+
+def merge_segments(transcripts):
+    """
+    Yields (transcript index, segment) for the segments of all transcripts
+    ordered by start then stop time, with a k-way merge of their sorted segments
+    Ties keep the order of the transcripts and of their segments
+    """
+    for _, _, index, _, seg in heapq.merge(
+        *(keyed_segments(t.segments, i) for i, t in enumerate(transcripts))
+    ):
+        yield index, seg
+
+
+def merge_transcripts(transcripts):
+    """
+    Returns one Transcript with the segments of all transcripts in time order
+    >>> from asrtoolkit.data_structures.segment import Segment
+    >>> first, second = Transcript(), Transcript()
+    >>> first.segments = [Segment(start=0.0, stop=1.0), Segment(start=2.0, stop=3.0)]
+    >>> second.segments = [Segment(start=1.0, stop=2.0)]
+    >>> [seg.start for seg in merge_transcripts([first, second]).segments]
+    [0.0, 1.0, 2.0]
+    """
+    out_transcript = Transcript()
+    out_transcript.file_extension = (
+        transcripts[0].file_extension if transcripts else None
+    )
+    out_transcript.segments = [seg for _, seg in merge_segments(transcripts)]
+    return out_transcript
+
+
+def find_overlaps(transcripts):
+    """
+    Returns (earlier segment, segment) pairs from different transcripts
+    whose time ranges overlap, pairing each segment with the earlier segment of
+    another transcript that ends last
+    """
+    overlaps = []
+    # the latest ending segment, and the latest ending one of any other transcript
+    latest, runner_up = (float("-inf"), None, None), (float("-inf"), None, None)
+    for index, seg in merge_segments(transcripts):
+        start, stop = time_key(seg)
+        other = runner_up if latest[1] == index else latest
+        if other[2] is not None and start < other[0]:
+            overlaps.append((other[2], seg))
+        if stop > latest[0]:
+            if latest[1] != index:
+                runner_up = latest
+            latest = (stop, index, seg)
+        elif stop > runner_up[0] and latest[1] != index:
+            runner_up = (stop, index, seg)
+    return overlaps
+
+
+def clip_segment(segment, start, stop):
+    "Returns a copy of a segment with its times limited to start and stop"
+    clipped = copy.copy(segment)
+    if float(segment.start) < start:
+        clipped.start = clean_float(start)
+    if float(segment.stop) > stop:
+        clipped.stop = clean_float(stop)
+    return clipped
+
+
+class TimeIndex:
+    """
+    Segments sorted by start time with the longest segment duration,
+    so the segments overlapping a time range can be found by binary search
+    Queries scan every segment starting up to the longest duration before the
+    range, so one very long segment makes them linear in the number of segments
+    """
+
+    def __init__(self, segments):
+        keyed = keyed_segments(segments, 0)
+        self.starts = [_[0] for _ in keyed]
+        self.stops = [_[1] for _ in keyed]
+        self.segments = [_[-1] for _ in keyed]
+        self.max_duration = max(
+            (b - a for a, b in zip(self.starts, self.stops)), default=0.0
+        )
+
+    def overlapping(self, start, stop):
+        "Returns segments overlapping the range from start to stop in time order"
+        first = bisect_left(self.starts, start - self.max_duration)
+        last = bisect_left(self.starts, stop)
+        return [self.segments[i] for i in range(first, last) if self.stops[i] > start]
+
+    def at(self, time):
+        "Returns segments with start <= time < stop in time order"
+        first = bisect_left(self.starts, time - self.max_duration)
+        last = bisect_right(self.starts, time)
+        return [self.segments[i] for i in range(first, last) if self.stops[i] > time]
+
+
 class Transcript:
     """
     Class for storing time-aligned text and converting between formats
     """
 
     location = ""
-    segments = []
     file_extension = None
+    file_format = None
+    _segments = []
 
-    def __init__(self, input_data=None, file_format=None):
+    def __init__(self, input_data=None, file_format=None, lazy=False):
         """
         Instantiates a time_aligned text object
         If 'input_data' is a string, it tries to find the appropriate file.
+        JSON input is matched to a data handler by its content if file_format is not given.
+        With lazy=True, files are only parsed when segments are first used.
 
         >>> transcript = Transcript()
         """
@@ -34,25 +225,128 @@ class Transcript:
             and isinstance(input_data, str)
             and os.path.exists(input_data)
         ):
-            self.read(input_data, file_format)
+            if lazy:
+                self.location = input_data
+                self.file_extension = get_extension(input_data)
+                self.file_format = file_format
+                self._segments = None
+            else:
+                self.read(input_data, file_format)
         elif input_data is not None and type(input_data) in [str, dict]:
             self.file_extension = "txt" if isinstance(input_data, str) else "json"
+            if file_format is None and isinstance(input_data, dict):
+                file_format = detect_json_format(input_data)
             data_handler = importlib.import_module(
                 "asrtoolkit.data_handlers.{:}".format(
                     file_format if file_format is not None else self.file_extension
                 )
             )
-            self.segments = list(filter(lambda seg: seg is not None, data_handler.read_in_memory(input_data)))
+            self.segments = list(
+                filter(
+                    lambda seg: seg is not None, data_handler.read_in_memory(input_data)
+                )
+            )
+
+    @property
+    def segments(self):
+        """
+        List of segments, parsed from the file on first use for lazy transcripts
+        While the parsed transcript cache is enabled, lazy transcripts return a
+        new list on every access, so assign segments to change them
+        """
+        if self._segments is None:
+            segments = PARSED_TRANSCRIPTS.get(self.location, self.file_format)
+            if not PARSED_TRANSCRIPTS.max_size:
+                self._segments = segments
+            return segments
+        return self._segments
+
+    @segments.setter
+    def segments(self, segments):
+        self._segments = segments
+
+    def time_index(self):
+        """
+        Returns a TimeIndex of the segments as they are now
+        It is built on every call (sorting only if segments are out of order),
+        since segments may be replaced or edited in place
+        """
+        return TimeIndex(self.segments)
 
-    def hash(self):
+    @property
+    def normalized(self):
         """
-        Returns a sha1 hash of the file
+        True if the transcript comes from a format whose writer cleans text (STM)
+        and the text of every segment is already in the form clean_up gives,
+        so scoring can skip cleaning it. Checked on every access, as segments
+        may be edited in place.
         """
-        if self.location:
-            with open(self.location) as f:
-                return hashlib.sha1(f.read().encode()).hexdigest()
+        try:
+            data_handler = importlib.import_module(
+                "asrtoolkit.data_handlers.{:}".format(
+                    self.file_format or self.file_extension or "txt"
+                )
+            )
+        except ImportError:
+            return False
+        return getattr(data_handler, "normalizes_text", False) and all(
+            is_normalized(seg.formatted_text or seg.text) for seg in self.segments
+        )
+
+    def slice(self, start=None, stop=None, clip=False, index=None):
+        """
+        Returns a Transcript of the segments overlapping start to stop seconds
+        With clip=True, segment times are limited to the range (text is kept)
+        A TimeIndex of the segments may be passed to reuse it across slices
+        >>> from asrtoolkit.data_structures.segment import Segment
+        >>> transcript = Transcript()
+        >>> transcript.segments = [
+        ...     Segment(start="0.00", stop="2.00"), Segment(start="3.00", stop="5.00")
+        ... ]
+        >>> [(seg.start, seg.stop) for seg in transcript.slice(1, 4, clip=True).segments]
+        [('1.00', '2.00'), ('3.00', '4.00')]
+        """
+        start = float("-inf") if start is None else float(start)
+        stop = float("inf") if stop is None else float(stop)
+        segments = (index or self.time_index()).overlapping(start, stop)
+
+        out_transcript = Transcript()
+        out_transcript.file_extension = self.file_extension
+        out_transcript.segments = (
+            [clip_segment(seg, start, stop) for seg in segments] if clip else segments
+        )
+        return out_transcript
+
+    def at(self, time):
+        """
+        Returns the segments being spoken at a time in seconds
+        """
+        return self.time_index().at(float(time))
+
+    def windows(self, size, step=None, clip=False, start=0.0):
+        """
+        Yields (window start, Transcript) for windows of size seconds every step
+        seconds (default size) from start until the last segment ends
+        Windows hold the segments as they were when iteration started
+        """
+        step = step or size
+        index = self.time_index()
+        end = max(index.stops, default=start)
+        for i in range(max(math.ceil((end - float(start)) / step), 0)):
+            window_start = float(start) + i * step
+            yield window_start, self.slice(
+                window_start, window_start + size, clip, index=index
+            )
+
+    def hash(self, algorithm="sha1"):
+        """
+        Returns a sha1 hash of the file's bytes, cached while the file is unchanged
+        Use algorithm='fast' for a quicker non-cryptographic digest for deduplication
+        """
+        if self.location and os.path.isfile(self.location):
+            return hash_file(self.location, algorithm)
         else:
-            return hashlib.sha1("".encode()).hexdigest()
+            return hash_bytes(b"", algorithm)
 
     def __str__(self):
         """
@@ -67,6 +361,9 @@ class Transcript:
                 self.file_extension if self.file_extension else "txt"
             )
         )
+        if not hasattr(data_handler, "format_segment"):
+            # binary formats have no text representation
+            data_handler = importlib.import_module("asrtoolkit.data_handlers.txt")
         return "\n".join(_.__str__(data_handler) for _ in self.segments)
 
     def __add__(self, other):
@@ -74,15 +371,8 @@ class Transcript:
         Add two transcripts
         Set the location after adding if you want to save this!
         """
-        new_segments = self.segments + other.segments
-
-        # Sort the segments by their start time then stop time
-        new_segments.sort(key=lambda s: (float(s.start), float(s.stop)))
-
-        out_transcript = Transcript()
-        out_transcript.file_extension = self.file_extension
-        out_transcript.segments = new_segments
-        return out_transcript
+        # Merge the segments by their start time then stop time
+        return merge_transcripts([self, other])
 
     def text(self):
         """
@@ -95,20 +385,19 @@ class Transcript:
 
     def read(self, file_name, file_format=None):
         """Read a file using class-specific read function"""
-        self.file_extension = file_name.split(".")[-1]
+        self.file_extension = get_extension(file_name)
         self.location = file_name
-        data_handler = importlib.import_module(
-            "asrtoolkit.data_handlers.{:}".format(
-                file_format if file_format is not None else self.file_extension
-            )
-        )
-        self.segments = list(filter(lambda seg: seg is not None, data_handler.read_file(file_name)))
+        self.file_format = file_format
+        self.segments = parse_segments(file_name, file_format)
 
-    def write(self, file_name, file_format=None):
+    def write(self, file_name, file_format=None, **kwargs):
         """
         Output to file using segment-specific __str__ function
+        Data handlers with their own write_file function (e.g. binary formats)
+        write the segments directly and receive any extra keyword arguments
+        Returns a Transcript of the new file, which is re-read when first used
         """
-        file_extension = file_name.split(".")[-1] if "." in file_name else "stm"
+        file_extension = get_extension(file_name) if "." in file_name else "stm"
 
         file_name = sanitize_hyphens(file_name)
 
@@ -117,7 +406,11 @@ class Transcript:
                 file_format if file_format else file_extension
             )
         )
-        with open(file_name, "w", encoding="utf-8") as f:
+        if hasattr(data_handler, "write_file"):
+            data_handler.write_file(self.segments, file_name, **kwargs)
+            return Transcript(file_name, file_format, lazy=True)
+
+        with open_file(file_name, "w") as f:
             f.write(data_handler.header())
             f.writelines(
                 data_handler.separator.join(
@@ -127,7 +420,7 @@ class Transcript:
             f.write(data_handler.footer())
 
         # return back new object in case we are updating a list in place
-        return Transcript(file_name)
+        return Transcript(file_name, file_format, lazy=True)
 
     def split(self, target_dir):
         """
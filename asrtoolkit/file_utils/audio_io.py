@@ -0,0 +1,435 @@
+#!/usr/bin/env python
+"""
+In-process reading, downmixing, resampling and writing of PCM audio
+
+WAV, SPH and AU headers are parsed with the standard library.
+Converting samples requires NumPy, which is optional: without it, or for
+encodings other than linear PCM or float (e.g. mp3 or shorten-compressed SPH),
+UnsupportedAudioError is raised and callers fall back to sox.
+"""
+
+import math
+import os
+import struct
+from collections import namedtuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+AudioHeader = namedtuple(
+    "AudioHeader",
+    [
+        "sample_rate",
+        "channels",
+        "sample_width",
+        "n_frames",
+        "data_offset",
+        "encoding",
+        "byte_order",
+        "unsigned",
+    ],
+)
+
+AudioInfo = namedtuple(
+    "AudioInfo", ["duration", "sample_rate", "channels", "n_frames", "encoding"]
+)
+
+WAV_ENCODINGS = {1: "pcm", 3: "float", 6: "alaw", 7: "ulaw"}
+AU_ENCODINGS = {
+    1: ("ulaw", 1),
+    2: ("pcm", 1),
+    3: ("pcm", 2),
+    4: ("pcm", 3),
+    5: ("pcm", 4),
+    6: ("float", 4),
+    27: ("alaw", 1),
+}
+
+# frames mixed at a time by mix_audio
+MIX_BLOCK_SIZE = 2**16
+
+# inputs mixed with open file handles, above which files are reopened per block
+MAX_OPEN_INPUTS = 256
+
+# zero crossings on each side of the windowed sinc used for resampling
+FILTER_HALF_WIDTH = 16
+
+
+class UnsupportedAudioError(ValueError):
+    "Raised for audio which cannot be processed in-process"
+
+
+def read_wav_header(f):
+    "Parses the header of a RIFF WAVE file by walking its chunks"
+    riff, _, wave_id = struct.unpack("<4sI4s", f.read(12))
+    if riff != b"RIFF" or wave_id != b"WAVE":
+        raise UnsupportedAudioError("not a RIFF WAVE file")
+    fmt = None
+    while True:
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            raise UnsupportedAudioError("no data chunk in WAV file")
+        chunk_id, chunk_size = struct.unpack("<4sI", chunk)
+        if chunk_id == b"fmt ":
+            fmt = f.read(chunk_size + chunk_size % 2)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise UnsupportedAudioError("no fmt chunk before WAV data")
+            tag, channels, sample_rate, _, block_align, bits = struct.unpack_from(
+                "<HHIIHH", fmt
+            )
+            if tag == 0xFFFE and len(fmt) >= 26:
+                # WAVE_FORMAT_EXTENSIBLE stores the format tag in its sub-format GUID
+                (tag,) = struct.unpack_from("<H", fmt, 24)
+            return AudioHeader(
+                sample_rate,
+                channels,
+                block_align // max(channels, 1),
+                chunk_size // max(block_align, 1),
+                f.tell(),
+                WAV_ENCODINGS.get(tag, "format {}".format(tag)),
+                "<",
+                # 8 bit WAV is unsigned
+                tag == 1 and bits <= 8,
+            )
+        else:
+            f.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+
+
+def parse_sph_header(header):
+    "Parses a NIST SPHERE header"
+    fields = {}
+    for line in header.decode("ascii", errors="ignore").splitlines()[2:]:
+        parts = line.split(None, 2)
+        if len(parts) == 3:
+            fields[parts[0]] = parts[2].strip()
+    coding = fields.get("sample_coding", "pcm")
+    return AudioHeader(
+        int(fields["sample_rate"]),
+        int(fields.get("channel_count", 1)),
+        int(fields.get("sample_n_bytes", 2)),
+        int(fields["sample_count"]),
+        int(header[8:16]),
+        {"mu-law": "ulaw", "ulaw": "ulaw", "alaw": "alaw"}.get(coding, coding),
+        ">" if fields.get("sample_byte_format") == "10" else "<",
+        False,
+    )
+
+
+def parse_au_header(header):
+    "Parses a Sun/NeXT AU header"
+    _, data_offset, data_size, encoding, sample_rate, channels = struct.unpack_from(
+        ">4sIIIII", header
+    )
+    encoding, sample_width = AU_ENCODINGS.get(
+        encoding, ("format {}".format(encoding), 1)
+    )
+    n_frames = (
+        data_size // (sample_width * channels) if data_size != 0xFFFFFFFF else None
+    )
+    return AudioHeader(
+        sample_rate, channels, sample_width, n_frames, data_offset, encoding, ">", False
+    )
+
+
+def read_header(file_name):
+    """
+    Returns the AudioHeader of a WAV, SPH or AU file
+    Raises UnsupportedAudioError for other files
+    """
+    with open(file_name, "rb") as f:
+        magic = f.read(16)
+        f.seek(0)
+        if magic.startswith(b"RIFF"):
+            return read_wav_header(f)
+        if magic.startswith(b"NIST_1A"):
+            return parse_sph_header(f.read(int(magic[8:16])))
+        if magic.startswith(b".snd"):
+            header = parse_au_header(f.read(24))
+            if header.n_frames is None:
+                data_size = os.fstat(f.fileno()).st_size - header.data_offset
+                header = header._replace(
+                    n_frames=data_size // (header.sample_width * header.channels)
+                )
+            return header
+    raise UnsupportedAudioError("unknown audio header in {}".format(file_name))
+
+
+def header_info(file_name):
+    "Returns the AudioInfo of a WAV, SPH or AU file from its header"
+    header = read_header(file_name)
+    return AudioInfo(
+        header.n_frames / header.sample_rate,
+        header.sample_rate,
+        header.channels,
+        header.n_frames,
+        header.encoding,
+    )
+
+
+def sample_dtype(header):
+    """
+    Returns the NumPy dtype of the samples of a PCM or float WAV/SPH/AU file
+    Raises UnsupportedAudioError for other encodings
+    """
+    if np is None:
+        raise UnsupportedAudioError("in-process audio processing requires numpy")
+    if header.encoding not in ("pcm", "float") or header.sample_width not in (1, 2, 4):
+        raise UnsupportedAudioError(
+            "cannot decode {} bit {} audio".format(
+                8 * header.sample_width, header.encoding
+            )
+        )
+    if header.encoding == "float":
+        return np.dtype(header.byte_order + "f4")
+    if header.sample_width == 1:
+        return np.dtype("u1" if header.unsigned else "i1")
+    return np.dtype("{}i{}".format(header.byte_order, header.sample_width))
+
+
+def to_float(samples):
+    "Scales PCM samples to float32 in [-1, 1)"
+    if samples.dtype.kind == "f":
+        return np.asarray(samples, "float32")
+    scale = np.float32(2.0 ** (8 * samples.dtype.itemsize - 1))
+    offset = scale if samples.dtype.kind == "u" else np.float32(0.0)
+    return (samples.astype("float32") - offset) / scale
+
+
+def read_samples(file_name):
+    """
+    Memory maps the samples of a PCM or float WAV/SPH/AU file
+    Returns (float32 array of shape (frames, channels) in [-1, 1), sample rate)
+    """
+    header = read_header(file_name)
+    dtype = sample_dtype(header)
+    if not header.n_frames:
+        return np.zeros((0, header.channels), "float32"), header.sample_rate
+    samples = np.memmap(
+        file_name,
+        dtype=dtype,
+        mode="r",
+        offset=header.data_offset,
+        shape=(header.n_frames, header.channels),
+    )
+    return to_float(samples), header.sample_rate
+
+
+class BlockReader:
+    """
+    Reads blocks of float samples from a PCM WAV/SPH/AU file
+    The file is kept open unless keep_open is False, in which case it is
+    reopened for each block so that any number of readers can be used at once
+    """
+
+    def __init__(self, file_name, keep_open=True):
+        self.file_name = file_name
+        self.header = read_header(file_name)
+        self.dtype = sample_dtype(self.header)
+        self.frame_size = self.dtype.itemsize * self.header.channels
+        self.file = open(file_name, "rb") if keep_open else None
+
+    def read(self, start, n_frames):
+        "Returns up to n_frames frames from frame start, shape (frames, channels)"
+        n_frames = max(min(n_frames, self.header.n_frames - start), 0)
+        f = self.file or open(self.file_name, "rb")
+        try:
+            f.seek(self.header.data_offset + start * self.frame_size)
+            data = f.read(n_frames * self.frame_size)
+        finally:
+            if f is not self.file:
+                f.close()
+        samples = np.frombuffer(
+            data[: len(data) - len(data) % self.frame_size], self.dtype
+        )
+        return to_float(samples.reshape(-1, self.header.channels))
+
+    def close(self):
+        if self.file:
+            self.file.close()
+
+
+def downmix(samples):
+    "Averages channels into one, as sox remix - does"
+    return samples.mean(axis=1, dtype="float32") if samples.ndim > 1 else samples
+
+
+def lowpass_filter(up, down, half_width=FILTER_HALF_WIDTH):
+    """
+    Kaiser-windowed sinc low-pass filter for resampling by up / down,
+    scaled by up to make up for the zeros inserted when upsampling
+    """
+    factor = max(up, down)
+    taps = np.arange(-half_width * factor, half_width * factor + 1)
+    return (np.sinc(taps / factor) * np.kaiser(len(taps), 8.0) * (up / factor)).astype(
+        "float32"
+    )
+
+
+def resample(samples, from_rate, to_rate, half_width=FILTER_HALF_WIDTH):
+    """
+    Resamples a 1D array by the rational factor to_rate / from_rate
+    with a polyphase FIR filter, which only evaluates the output samples kept
+    >>> resample(np.ones(8, "float32"), 8000, 16000).shape
+    (16,)
+    """
+    gcd = math.gcd(int(from_rate), int(to_rate))
+    up, down = int(to_rate) // gcd, int(from_rate) // gcd
+    if up == down:
+        return samples.astype("float32")
+
+    lowpass = lowpass_filter(up, down, half_width)
+    delay = len(lowpass) // 2
+    n_phase_taps = -(-len(lowpass) // up)
+
+    # phases[p, j] = lowpass[p + up * j]
+    phases = np.zeros(n_phase_taps * up, "float32")
+    phases[: len(lowpass)] = lowpass
+    phases = phases.reshape(n_phase_taps, up).T
+
+    n_out = -(-len(samples) * up // down)
+    positions = np.arange(n_out, dtype="int64") * down + delay
+    phase, base = positions % up, positions // up
+
+    padded = np.concatenate(
+        [
+            np.zeros(n_phase_taps, "float32"),
+            samples.astype("float32"),
+            np.zeros(n_phase_taps, "float32"),
+        ]
+    )
+    base += n_phase_taps
+    resampled = np.zeros(n_out, "float32")
+    for j in range(n_phase_taps):
+        resampled += phases[phase, j] * padded[np.minimum(base - j, len(padded) - 1)]
+    return resampled
+
+
+def to_int16(samples):
+    "Rounds and clips float samples in [-1, 1) to little endian 16 bit integers"
+    return np.clip(np.round(samples * 32768.0), -32768, 32767).astype("<i2")
+
+
+def sph_header(n_samples, sample_rate, channels=1, sample_width=2):
+    "Returns a 1024 byte NIST SPHERE header for little endian PCM"
+    return (
+        "NIST_1A\n   1024\n"
+        "sample_count -i {}\n"
+        "sample_rate -i {}\n"
+        "channel_count -i {}\n"
+        "sample_n_bytes -i {}\n"
+        "sample_byte_format -s2 01\n"
+        "sample_coding -s3 pcm\n"
+        "end_head\n".format(n_samples, sample_rate, channels, sample_width)
+        .encode("ascii")
+        .ljust(1024, b" ")
+    )
+
+
+def wav_header(n_samples, sample_rate, channels=1, sample_width=2):
+    "Returns a 44 byte RIFF WAVE header for PCM"
+    data_size = n_samples * channels * sample_width
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF",
+        36 + data_size,
+        b"WAVE",
+        b"fmt ",
+        16,
+        1,
+        channels,
+        sample_rate,
+        sample_rate * channels * sample_width,
+        channels * sample_width,
+        8 * sample_width,
+        b"data",
+        data_size,
+    )
+
+
+def output_header(file_name, n_frames, sample_rate, channels=1):
+    "Returns a 16 bit PCM SPH or WAV header, chosen by the file extension"
+    extension = os.path.splitext(file_name)[1].lower()
+    if extension not in (".sph", ".wav"):
+        raise UnsupportedAudioError("cannot write {} files".format(extension))
+    return (sph_header if extension == ".sph" else wav_header)(
+        n_frames, sample_rate, channels
+    )
+
+
+def write_audio(file_name, samples, sample_rate):
+    """
+    Writes mono float samples as 16 bit PCM SPH or WAV, chosen by extension
+    The file is replaced atomically so it may also be the input file
+    """
+    header = output_header(file_name, len(samples), sample_rate)
+    with open(file_name + ".tmp", "wb") as f:
+        f.write(header)
+        f.write(to_int16(samples).tobytes())
+    os.replace(file_name + ".tmp", file_name)
+
+
+def convert_audio(source_file, target_file, sample_rate=16000):
+    """
+    Converts a PCM WAV/SPH/AU file to mono 16 bit SPH or WAV at sample_rate
+    Raises UnsupportedAudioError if it cannot be done in-process
+    """
+    samples, source_rate = read_samples(source_file)
+    write_audio(
+        target_file, resample(downmix(samples), source_rate, sample_rate), sample_rate
+    )
+
+
+def mix_audio(input_files, output_file, normalize=False, block_size=MIX_BLOCK_SIZE):
+    """
+    Mixes PCM WAV/SPH/AU files of the same sample rate and channel count
+    into a 16 bit SPH or WAV file, scaling each input by 1 / len(input_files)
+    as sox -m does. If normalize is True, a first pass finds the peak so the
+    output peaks at 0 dBFS like sox gain -n 0.
+    Inputs are read and summed block_size frames at a time, so memory use does
+    not depend on the length or number of inputs.
+    """
+    keep_open = len(input_files) <= MAX_OPEN_INPUTS
+    readers = []
+    try:
+        for file_name in input_files:
+            readers.append(BlockReader(file_name, keep_open))
+        formats = {(_.header.sample_rate, _.header.channels) for _ in readers}
+        if len(formats) != 1:
+            raise UnsupportedAudioError("inputs differ in sample rate or channels")
+        ((sample_rate, channels),) = formats
+        n_frames = max(_.header.n_frames for _ in readers)
+
+        def mixed_blocks(gain):
+            for start in range(0, n_frames, block_size):
+                block = np.zeros(
+                    (min(block_size, n_frames - start), channels), "float32"
+                )
+                for reader in readers:
+                    samples = reader.read(start, block_size)
+                    block[: len(samples)] += samples
+                yield block * np.float32(gain)
+
+        # raises for unsupported outputs before anything is written
+        header = output_header(output_file, n_frames, sample_rate, channels)
+
+        gain = 1.0 / len(readers)
+        if normalize:
+            peak = max((np.abs(_).max() for _ in mixed_blocks(gain)), default=0.0)
+            gain = gain / peak * 32767 / 32768 if peak > 0 else gain
+
+        try:
+            with open(output_file + ".tmp", "wb") as f:
+                f.write(header)
+                for block in mixed_blocks(gain):
+                    f.write(to_int16(block).tobytes())
+            os.replace(output_file + ".tmp", output_file)
+        except BaseException:
+            if os.path.exists(output_file + ".tmp"):
+                os.remove(output_file + ".tmp")
+            raise
+    finally:
+        for reader in readers:
+            reader.close()
@@ -3,6 +3,49 @@
 Simple wrapper for general file functions
 """
 
+import bz2
+import gzip
+import lzma
+
+from asrtoolkit.file_utils.name_cleaners import split_compression_extension
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def open_zstd(file_name, mode, encoding=None):
+    "open a zstd compressed file, if zstandard is installed"
+    if zstandard is None:
+        raise ImportError("Reading .zst files requires the zstandard package")
+    return zstandard.open(file_name, mode, encoding=encoding)
+
+
+COMPRESSION_OPENERS = {
+    "gz": gzip.open,
+    "bz2": bz2.open,
+    "xz": lzma.open,
+    "zst": open_zstd,
+}
+
+
+def open_file(file_name, mode="r", encoding="utf-8"):
+    """
+    Open a file, transparently decompressing or compressing it as a stream
+    if it ends in .gz, .bz2, .xz, or .zst
+    Text modes use the given encoding
+    """
+    compression = split_compression_extension(file_name)[1]
+    text_mode = "b" not in mode
+    if not compression:
+        return open(file_name, mode, encoding=encoding if text_mode else None)
+
+    mode = mode.replace("t", "") + ("t" if text_mode else "")
+    return COMPRESSION_OPENERS[compression](
+        file_name, mode, encoding=encoding if text_mode else None
+    )
+
 
 def make_list_of_dirs(input_dir_list):
     """
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+"""
+Bounded thread or process pool for running jobs over large corpora
+"""
+
+import logging
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+LOGGER = logging.getLogger(__name__)
+
+
+class BoundedExecutor:
+    """
+    Runs a function over many items on a thread or process pool
+    while keeping at most max_in_flight tasks submitted at a time,
+    so memory use does not grow with the number of items.
+    Failures are collected rather than raised.
+
+    >>> with BoundedExecutor(max_workers=2, max_in_flight=3) as executor:
+    ...     list(executor.map(abs, [-1, 2, "a", -4]))
+    [1, 2, None, 4]
+    >>> [item for item, error in executor.failures]
+    ['a']
+    """
+
+    def __init__(self, max_workers=None, max_in_flight=None, processes=False):
+        "max_in_flight defaults to twice the number of workers"
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_in_flight = max(max_in_flight or 2 * self.max_workers, 1)
+        self.executor = (ProcessPoolExecutor if processes else ThreadPoolExecutor)(
+            self.max_workers
+        )
+        self.in_flight = deque()
+        self.failures = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown(cancel=exc_type is not None)
+
+    def map(self, func, items):
+        """
+        Yields func(item) for each item in order, or None if it raised
+        (item, exception) pairs of failed items are kept in failures
+        """
+        for item in items:
+            self.in_flight.append((item, self.executor.submit(func, item)))
+            if len(self.in_flight) >= self.max_in_flight:
+                yield self.result()
+        while self.in_flight:
+            yield self.result()
+
+    def result(self):
+        "Waits for the oldest task in flight and returns its result"
+        item, future = self.in_flight.popleft()
+        try:
+            return future.result()
+        except Exception as exc:  # collect failures of any kind per item
+            LOGGER.error("Failed to process %s: %s", item, exc)
+            self.failures.append((item, exc))
+            return None
+
+    def shutdown(self, cancel=False):
+        "Waits for running tasks, cancelling queued ones first if cancel is True"
+        if cancel:
+            for _, future in self.in_flight:
+                future.cancel()
+            self.in_flight.clear()
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+Chunked, cached and parallel file hashing
+
+Files are hashed in fixed-size chunks so memory use does not grow with file size.
+Digests are remembered in the manifest of each file's directory
+and are only recomputed when the size or mtime of a file changes.
+"""
+
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+from asrtoolkit.file_utils.manifest import cached_file_property
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+CHUNK_SIZE = 2**20
+
+# non-cryptographic digest for deduplication, xxhash if installed else blake2b
+FAST_ALGORITHM = "xxh3_128" if xxhash else "blake2b_128"
+
+
+def new_hasher(algorithm="sha1"):
+    """
+    Returns a hash object for an algorithm name
+    'fast' selects FAST_ALGORITHM; any hashlib algorithm name is also accepted
+    >>> new_hasher("sha1").name
+    'sha1'
+    """
+    algorithm = FAST_ALGORITHM if algorithm == "fast" else algorithm
+    if algorithm == "xxh3_128":
+        return xxhash.xxh3_128()
+    if algorithm == "blake2b_128":
+        return hashlib.blake2b(digest_size=16)
+    return hashlib.new(algorithm)
+
+
+def hash_bytes(data, algorithm="sha1"):
+    """
+    Returns the hex digest of some bytes
+    >>> hash_bytes(b"")
+    'da39a3ee5e6b4b0d3255bfef95601890afd80709'
+    """
+    hasher = new_hasher(algorithm)
+    hasher.update(data)
+    return hasher.hexdigest()
+
+
+def compute_file_hash(file_name, algorithm="sha1", chunk_size=CHUNK_SIZE):
+    "Returns the hex digest of a file read in chunks of chunk_size bytes"
+    hasher = new_hasher(algorithm)
+    with open(file_name, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def hash_file(file_name, algorithm="sha1", chunk_size=CHUNK_SIZE):
+    """
+    Returns the hex digest of a file's bytes,
+    reusing the digest in the directory manifest if the file is unchanged
+    """
+    algorithm = FAST_ALGORITHM if algorithm == "fast" else algorithm
+    return cached_file_property(
+        file_name,
+        algorithm,
+        lambda _: compute_file_hash(_, algorithm, chunk_size),
+    )
+
+
+def hash_files(file_names, algorithm="sha1", max_workers=None):
+    """
+    Hashes many files over a thread pool (hashlib releases the GIL while hashing)
+    Returns a dict of file name: hex digest
+    """
+    file_names = list(dict.fromkeys(file_names))
+    with ThreadPoolExecutor(max_workers) as executor:
+        digests = executor.map(lambda _: hash_file(_, algorithm), file_names)
+        return dict(zip(file_names, digests))
@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+"""
+Persistent per-directory cache of file properties (hashes, counts, durations)
+
+Each directory gets a JSON-lines manifest next to its files.
+Every line is an entry of the form
+```
+{"name": "file.sph", "size": 1234, "mtime_ns": 1600000000000000000, "sha1": "..."}
+```
+and later lines override earlier ones.
+Entries are only trusted while the size and mtime of the file still match,
+so re-opening a corpus costs a stat per file instead of a full re-read.
+
+Manifests add hidden files to data directories, so they are only written
+when enabled with ASRTOOLKIT_MANIFESTS=1 or persist_manifests(); otherwise
+properties are cached in memory for the current process only.
+Writes from several processes are serialized with a lock on the directory.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+LOGGER = logging.getLogger(__name__)
+
+MANIFEST_NAME = ".asrtoolkit_manifest.jsonl"
+
+# whether manifests of data directories are written to disk
+PERSIST = os.environ.get("ASRTOOLKIT_MANIFESTS", "0") not in ("", "0")
+
+# number of pending entries kept in memory before appending them to disk
+FLUSH_SIZE = 1000
+
+STAT_KEYS = ["name", "size", "mtime_ns"]
+
+
+class Manifest:
+    """
+    Cache of properties of the files in one directory
+    """
+
+    def __init__(self, directory, persist=None):
+        """
+        Load the manifest of a directory if one exists
+        persist selects if it is saved to disk, following PERSIST if None
+        """
+        self.directory = os.path.abspath(directory)
+        self.location = os.path.join(self.directory, MANIFEST_NAME)
+        self.persist = persist
+        self.entries = {}
+        self.pending = []
+        self.n_lines = 0
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        "Read all entries"
+        self.entries, self.n_lines = self.read()
+
+    def read(self):
+        "Returns the entries on disk and their number of lines, ignoring corrupt lines"
+        entries, n_lines = {}, 0
+        if not os.path.isfile(self.location):
+            return entries, n_lines
+        with open(self.location) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    LOGGER.warning("Ignoring corrupt line in %s", self.location)
+                    continue
+                entries[entry["name"]] = entry
+                n_lines += 1
+        return entries, n_lines
+
+    @contextmanager
+    def file_lock(self):
+        "Holds an exclusive lock on the directory against other processes"
+        if fcntl is None:
+            yield
+            return
+        fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def lookup(self, file_name):
+        """
+        Returns the cached properties of a file in this directory
+        or an empty dict if the file changed since they were recorded
+        """
+        name = os.path.basename(file_name)
+        stat = os.stat(os.path.join(self.directory, name))
+        entry = self.entries.get(name)
+        if entry and (entry["size"], entry["mtime_ns"]) == (
+            stat.st_size,
+            stat.st_mtime_ns,
+        ):
+            return {k: v for k, v in entry.items() if k not in STAT_KEYS}
+        return {}
+
+    def record(self, file_name, **properties):
+        "Store properties of a file, dropping any recorded for older versions of it"
+        name = os.path.basename(file_name)
+        stat = os.stat(os.path.join(self.directory, name))
+        with self.lock:
+            entry = self.entries.get(name, {})
+            if (entry.get("size"), entry.get("mtime_ns")) != (
+                stat.st_size,
+                stat.st_mtime_ns,
+            ):
+                entry = {
+                    "name": name,
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                }
+            entry = dict(entry, **properties)
+            self.entries[name] = entry
+            self.pending.append(entry)
+            flush = len(self.pending) >= FLUSH_SIZE
+        if flush:
+            self.save()
+
+    def cached(self, file_name, key, compute):
+        """
+        Returns property key of a file, calling compute(file_name) only if it
+        is not already recorded for the current version of the file
+        """
+        properties = self.lookup(file_name)
+        if key not in properties:
+            properties[key] = compute(file_name)
+            self.record(file_name, **{key: properties[key]})
+        return properties[key]
+
+    def save(self):
+        """
+        Append pending entries to disk if the manifest is persisted
+        The manifest is rewritten atomically once superseded lines outnumber live ones,
+        keeping entries other processes appended since it was loaded
+        Read-only directories are left without a manifest
+        """
+        with self.lock:
+            if not self.pending:
+                return
+            if not (PERSIST if self.persist is None else self.persist):
+                self.pending = []
+                return
+            try:
+                with self.file_lock():
+                    self.write_pending()
+            except OSError as exc:
+                LOGGER.debug("Could not save manifest %s: %s", self.location, exc)
+            self.pending = []
+
+    def write_pending(self):
+        "Appends or compacts while holding the locks"
+        if self.n_lines + len(self.pending) <= 2 * len(self.entries):
+            with open(self.location, "a") as f:
+                f.writelines(json.dumps(_) + "\n" for _ in self.pending)
+            self.n_lines += len(self.pending)
+            return
+
+        entries, _ = self.read()
+        for entry in self.pending:
+            entries[entry["name"]] = entry
+        # forget files which no longer exist
+        self.entries = {
+            name: entry
+            for name, entry in entries.items()
+            if os.path.exists(os.path.join(self.directory, name))
+        }
+        tmp_location = self.location + ".tmp"
+        with open(tmp_location, "w") as f:
+            f.writelines(json.dumps(_) + "\n" for _ in self.entries.values())
+        os.replace(tmp_location, self.location)
+        self.n_lines = len(self.entries)
+
+
+# directory -> Manifest
+MANIFESTS = {}
+MANIFESTS_LOCK = threading.Lock()
+
+
+def persist_manifests(enabled=True):
+    "Selects if manifests of data directories are written to disk"
+    global PERSIST
+    PERSIST = enabled
+
+
+def get_manifest(directory, persist=None):
+    """
+    Returns the shared Manifest for a directory
+    persist=True always saves it, e.g. for journals in output directories
+    """
+    directory = os.path.abspath(directory)
+    with MANIFESTS_LOCK:
+        if directory not in MANIFESTS:
+            MANIFESTS[directory] = Manifest(directory)
+        if persist is not None:
+            MANIFESTS[directory].persist = persist
+        return MANIFESTS[directory]
+
+
+def cached_file_property(file_name, key, compute):
+    """
+    Returns property key of a file from the manifest of its directory,
+    computing it with compute(file_name) if the file is new or has changed
+    """
+    return get_manifest(os.path.dirname(os.path.abspath(file_name))).cached(
+        file_name, key, compute
+    )
+
+
+def save_manifests():
+    "Write pending entries of all manifests to disk"
+    with MANIFESTS_LOCK:
+        manifests = list(MANIFESTS.values())
+    for manifest in manifests:
+        manifest.save()
+
+
+atexit.register(save_manifests)
@@ -5,14 +5,40 @@ Simple wrapper for name-cleaning functions
 
 import os
 
+# extensions of compressed files which can be read and written transparently
+COMPRESSION_EXTENSIONS = ["gz", "bz2", "xz", "zst"]
+
+
+def split_compression_extension(file_name):
+    """
+    Splits off a compression extension if present
+    >>> split_compression_extension("foo.stm.gz")
+    ('foo.stm', 'gz')
+    >>> split_compression_extension("foo.stm")
+    ('foo.stm', '')
+    """
+    inner_name, _, extension = file_name.rpartition(".")
+    return (
+        (inner_name, extension)
+        if inner_name and extension in COMPRESSION_EXTENSIONS
+        else (file_name, "")
+    )
+
 
 def get_extension(file_name):
     """
-    Returns file extension
+    Returns file extension, ignoring any compression extension
     >>> get_extension("foo.txt")
     'txt'
+    >>> get_extension("foo.stm.gz")
+    'stm'
+    >>> get_extension("foo.gz")
+    ''
     """
-    return file_name.split(".")[-1]
+    inner_name, compression = split_compression_extension(file_name)
+    if compression and "." not in os.path.basename(inner_name):
+        return ""
+    return inner_name.split(".")[-1]
 
 
 def basename(file_name):
@@ -63,11 +89,16 @@ def sanitize_hyphens(file_name, silent=True):
 def generate_segmented_file_name(target_dir, file_name, iseg):
     """
     Take a target location, a current location, and a segment number and generate a target filename
+    Compressed files keep their compression extension
+    >>> generate_segmented_file_name("out", "in/foo.stm.gz", 3)
+    'out/foo_seg_00003.stm.gz'
     """
+    file_name, compression = split_compression_extension(file_name)
     return sanitize_hyphens(
         target_dir
         + os.sep
         + basename(strip_extension(file_name))
         + "_seg_{:05d}.".format(iseg)
         + file_name.split(".")[-1]
+        + ("." + compression if compression else "")
     )
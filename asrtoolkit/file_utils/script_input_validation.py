@@ -7,7 +7,7 @@ from os.path import isfile
 
 from asrtoolkit.file_utils.name_cleaners import get_extension
 
-VALID_EXTENSIONS = ["json", "srt", "stm", "vtt", "txt", "html"]
+VALID_EXTENSIONS = ["json", "srt", "stm", "vtt", "txt", "html", "atb"]
 
 
 def valid_input_file(file_name, valid_extensions=[]):
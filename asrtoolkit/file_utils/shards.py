@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+"""
+Module for packing many small files into size-bounded tar shards
+
+Files belonging to one exemplar share a key and are stored next to each other
+as `<key>.<extension>` members, so shards can be streamed sequentially.
+An `index.json` next to the shards lists each shard with its size and keys.
+Shards are assigned to workers by their position in the index.
+"""
+
+import json
+import os
+import tarfile
+from itertools import chain
+
+INDEX_NAME = "index.json"
+
+DEFAULT_SHARD_SIZE = 2**30
+
+# bytes of tar header and padding per member, used when estimating shard sizes
+TAR_OVERHEAD = 1024
+
+
+class ShardWriter:
+    """
+    Writes groups of files sharing a key into tar shards of at most
+    max_shard_size bytes (a single group larger than that gets its own shard)
+    """
+
+    def __init__(self, output_dir, max_shard_size=DEFAULT_SHARD_SIZE, prefix="shard"):
+        self.output_dir = output_dir
+        self.max_shard_size = max_shard_size
+        self.prefix = prefix
+        self.shards = []
+        self.tar = None
+        os.makedirs(output_dir, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, key, files):
+        """
+        Adds files, a dict of extension: file name, as members <key>.<extension>
+        """
+        size = sum(os.path.getsize(_) + TAR_OVERHEAD for _ in files.values())
+        if (
+            self.tar is not None
+            and self.shards[-1]["size"] + size > self.max_shard_size
+        ):
+            self.close_shard()
+        if self.tar is None:
+            self.open_shard()
+
+        for extension, file_name in sorted(files.items()):
+            self.tar.add(file_name, arcname="{}.{}".format(key, extension))
+        self.shards[-1]["size"] += size
+        self.shards[-1]["keys"].append(key)
+
+    def open_shard(self):
+        name = "{}-{:06d}.tar".format(self.prefix, len(self.shards))
+        self.tar = tarfile.open(os.path.join(self.output_dir, name), "w")
+        self.shards.append({"name": name, "size": 0, "keys": []})
+
+    def close_shard(self):
+        self.tar.close()
+        self.tar = None
+        self.shards[-1]["size"] = os.path.getsize(
+            os.path.join(self.output_dir, self.shards[-1]["name"])
+        )
+
+    def close(self):
+        "Closes the last shard and atomically writes the index"
+        if self.tar is not None:
+            self.close_shard()
+        index_file = os.path.join(self.output_dir, INDEX_NAME)
+        with open(index_file + ".tmp", "w") as f:
+            json.dump({"shards": self.shards}, f)
+        os.replace(index_file + ".tmp", index_file)
+
+
+def load_index(shard_dir):
+    "Returns the list of shards (name, size, keys) in a shard directory"
+    with open(os.path.join(shard_dir, INDEX_NAME)) as f:
+        return json.load(f)["shards"]
+
+
+def worker_shards(shard_dir, worker=0, n_workers=1):
+    """
+    Returns the shard files for one of n_workers workers
+    >>> import json, tempfile
+    >>> shard_dir = tempfile.mkdtemp()
+    >>> with open(os.path.join(shard_dir, INDEX_NAME), "w") as f:
+    ...     json.dump({"shards": [{"name": str(_)} for _ in range(5)]}, f)
+    >>> [os.path.basename(_) for _ in worker_shards(shard_dir, 1, 2)]
+    ['1', '3']
+    """
+    if not 0 <= worker < n_workers:
+        raise ValueError("worker must be between 0 and n_workers - 1")
+    return [
+        os.path.join(shard_dir, shard["name"])
+        for shard in load_index(shard_dir)[worker::n_workers]
+    ]
+
+
+def read_shard(shard_file):
+    """
+    Streams (key, {extension: bytes}) groups from a shard in order
+    """
+    key, files = None, {}
+    with tarfile.open(shard_file, "r|") as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            member_key, extension = os.path.splitext(member.name)
+            if files and member_key != key:
+                yield key, files
+                files = {}
+            key = member_key
+            files[extension[1:]] = tar.extractfile(member).read()
+    if files:
+        yield key, files
+
+
+def read_shards(shard_dir, worker=0, n_workers=1):
+    """
+    Streams (key, {extension: bytes}) groups from the shards of one worker
+    """
+    return chain.from_iterable(
+        map(read_shard, worker_shards(shard_dir, worker, n_workers))
+    )
@@ -0,0 +1,590 @@
+#!/usr/bin/env python
+"""
+Long-running scoring server which keeps data handlers, normalizers and parsed
+transcripts warm, so that many reference/hypothesis pairs can be scored
+without starting a process for each
+
+The server speaks HTTP/1.1 (with keep-alive) on a TCP port or a Unix socket.
+`POST /score` takes a JSON batch; options given next to "pairs" apply to every
+pair unless the pair overrides them
+```
+{
+  "pairs": [
+    {"reference": "ref.stm", "hypothesis": "hyp.json"},
+    {"reference": {"content": "this is a test", "format": "txt"}, "hypothesis": "hyp.stm"}
+  ],
+  "metrics": ["wer", "cer", "wder"],
+  "ignore_nsns": false
+}
+```
+and returns `{"results": [{"wer": 3.3, "cer": 1.2, "wder": 0.0}, {"error": "..."}]}`.
+`GET /stats` returns request, pair and error counts, throughput and latency.
+A pair's "normalizer" must name a profile the server was started with.
+"""
+
+import asyncio
+import http.client
+import importlib
+import json
+import logging
+import os
+import pkgutil
+import socket
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http import HTTPStatus
+
+from fire import Fire
+
+from asrtoolkit import data_handlers
+from asrtoolkit.clean_formatting import load_normalizer
+from asrtoolkit.data_handlers.format_detection import detect_json_format
+from asrtoolkit.data_structures import Transcript
+from asrtoolkit.data_structures.time_aligned_text import (
+    PARSED_TRANSCRIPTS,
+    set_transcript_cache_size,
+)
+from asrtoolkit.file_utils.name_cleaners import get_extension
+from asrtoolkit.file_utils.script_input_validation import valid_input_file
+from asrtoolkit.metrics.tswde import tswde
+from asrtoolkit.metrics.wder import wder
+from asrtoolkit.metrics.wer import cer, wer
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8090
+
+# parsed transcript files kept in memory by each worker
+TRANSCRIPT_CACHE_SIZE = 1024
+
+# number of recent requests used for latency percentiles
+LATENCY_WINDOW = 1024
+
+# largest request body accepted
+MAX_BODY_SIZE = 2**28
+
+# options which can be given for a whole batch or for each pair
+PAIR_OPTIONS = [
+    "metrics",
+    "ignore_nsns",
+    "normalizer",
+    "json_format",
+    "start",
+    "stop",
+    "target_speaker",
+    "drop_crosstalk",
+]
+
+
+class HTTPError(Exception):
+    "Error reported to the client with an HTTP status"
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def load_transcript(source, json_format=None):
+    """
+    Returns a Transcript for a file name, reusing parsed files from the
+    transcript cache, or for inline {"content": ..., "format": ...} data
+    """
+    if isinstance(source, dict):
+        content = source.get("content")
+        if not isinstance(content, (str, dict)):
+            raise ValueError("Inline transcripts need a string or JSON content")
+        file_format = source.get("format")
+        if isinstance(content, dict) and file_format in (None, "json"):
+            file_format = detect_json_format(content)
+        return Transcript(content, file_format=file_format)
+
+    if not isinstance(source, str) or not valid_input_file(source):
+        raise ValueError(
+            "{} is not a transcript file ASRToolkit accepts".format(source)
+        )
+
+    # segments are held directly, as lazy transcripts look them up on every access
+    transcript = Transcript()
+    transcript.location = source
+    transcript.file_extension = get_extension(source)
+    transcript.file_format = (
+        json_format if transcript.file_extension == "json" else None
+    )
+    transcript.segments = PARSED_TRANSCRIPTS.get(source, transcript.file_format)
+    return transcript
+
+
+def score_pair(pair, cache_size=TRANSCRIPT_CACHE_SIZE):
+    """
+    Scores one reference/hypothesis pair with the metrics it asks for,
+    returning a dict of results or of the error which stopped it
+    """
+    try:
+        if PARSED_TRANSCRIPTS.max_size != cache_size:
+            set_transcript_cache_size(cache_size)
+
+        ref, hyp = (
+            load_transcript(pair[key], pair.get("json_format"))
+            for key in ("reference", "hypothesis")
+        )
+        start, stop = pair.get("start"), pair.get("stop")
+        if start is not None or stop is not None:
+            ref, hyp = ref.slice(start, stop), hyp.slice(start, stop)
+
+        results = OrderedDict()
+        for metric in pair.get("metrics", ["wer"]):
+            if metric == "wer":
+                results[metric] = wer(
+                    ref, hyp, pair.get("ignore_nsns", False), pair.get("normalizer")
+                )
+            elif metric == "cer":
+                results[metric] = cer(
+                    ref, hyp, pair.get("ignore_nsns", False), pair.get("normalizer")
+                )
+            elif metric == "wder":
+                results[metric] = wder(
+                    ref, hyp, drop_crosstalk=pair.get("drop_crosstalk", False)
+                )
+            elif metric == "tswde":
+                results[metric] = tswde(ref, hyp, pair["target_speaker"])
+            else:
+                raise ValueError("Unknown metric {}".format(metric))
+        return results
+    except Exception as exc:  # report failures of any kind per pair
+        return {"error": "{}: {}".format(type(exc).__name__, exc)}
+
+
+def batch_pairs(batch):
+    """
+    Returns the pairs of a batch with the batch-level options filled in
+    >>> batch_pairs({"pairs": [{"reference": "a.stm", "hypothesis": "b.stm"}],
+    ...              "metrics": ["cer"]})
+    [{'metrics': ['cer'], 'reference': 'a.stm', 'hypothesis': 'b.stm'}]
+    """
+    if not isinstance(batch, dict) or not isinstance(batch.get("pairs"), list):
+        raise ValueError('Expected a JSON object with a list of "pairs"')
+    if not all(isinstance(_, dict) for _ in batch["pairs"]):
+        raise ValueError("Each pair must be a JSON object")
+
+    defaults = {key: batch[key] for key in PAIR_OPTIONS if key in batch}
+    return [dict(defaults, **pair) for pair in batch["pairs"]]
+
+
+def load_normalizers(profiles=()):
+    """
+    Returns a dict of the Normalizers of profile files, by file name and by
+    profile name, for the pairs of a request to choose from
+    """
+    if isinstance(profiles, str):
+        profiles = profiles.split(",")
+    normalizers = {}
+    for profile in profiles:
+        normalizer = load_normalizer(profile)
+        normalizers[profile] = normalizers[normalizer.name] = normalizer
+    return normalizers
+
+
+def warm_up(normalizers=()):
+    """
+    Imports every data handler, runs the metrics once with each normalizer
+    so that the first request does not pay for it
+    """
+    for module in pkgutil.iter_modules(data_handlers.__path__):
+        importlib.import_module("asrtoolkit.data_handlers.{}".format(module.name))
+    for normalizer in normalizers:
+        wer("warm up", "warm up", normalizer=normalizer)
+    score_pair(
+        {
+            "reference": {"content": "warm up one"},
+            "hypothesis": {"content": "warm up two"},
+            "metrics": ["wer", "cer", "wder"],
+        }
+    )
+
+
+class ServerStats:
+    """
+    Request, pair and error counts with throughput and recent request latency
+    """
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.started = time.time()
+        self.requests = 0
+        self.pairs = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.latencies = deque(maxlen=window)
+
+    def record(self, seconds, pairs, errors):
+        "Adds a finished request which scored pairs, errors of them failing"
+        self.requests += 1
+        self.pairs += pairs
+        self.errors += errors
+        self.latencies.append(seconds)
+
+    def as_dict(self):
+        """
+        Returns the counters, with latencies in milliseconds
+        >>> stats = ServerStats()
+        >>> for seconds in [0.1, 0.2, 0.3]:
+        ...     stats.record(seconds, 10, 0)
+        >>> stats.as_dict()["latency_ms"]["p50"]
+        200.0
+        """
+        uptime = time.time() - self.started
+        latencies = sorted(self.latencies)
+
+        def percentile(fraction):
+            index = min(len(latencies) - 1, int(fraction * len(latencies)))
+            return round(1000 * latencies[index], 3) if latencies else None
+
+        return OrderedDict(
+            [
+                ("uptime_seconds", round(uptime, 3)),
+                ("requests", self.requests),
+                ("pairs", self.pairs),
+                ("errors", self.errors),
+                ("in_flight", self.in_flight),
+                ("pairs_per_second", round(self.pairs / max(uptime, 1e-9), 3)),
+                (
+                    "latency_ms",
+                    OrderedDict(
+                        [
+                            (
+                                "mean",
+                                (
+                                    round(1000 * sum(latencies) / len(latencies), 3)
+                                    if latencies
+                                    else None
+                                ),
+                            ),
+                            ("p50", percentile(0.5)),
+                            ("p95", percentile(0.95)),
+                            ("max", percentile(1.0)),
+                        ]
+                    ),
+                ),
+            ]
+        )
+
+
+async def read_request(reader):
+    """
+    Reads one HTTP request as (method, path, version, headers, body),
+    or returns None once the client has closed the connection
+    """
+    request_line = await reader.readline()
+    while request_line in (b"\r\n", b"\n"):
+        request_line = await reader.readline()
+    if not request_line:
+        return None
+    method, path, version = request_line.decode("latin-1").split()
+
+    headers = {}
+    line = await reader.readline()
+    while line not in (b"\r\n", b"\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+        line = await reader.readline()
+
+    length = int(headers.get("content-length", 0))
+    if length > MAX_BODY_SIZE:
+        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request is too large")
+    body = await reader.readexactly(length) if length else b""
+    return method, path, version, headers, body
+
+
+async def write_response(writer, status, payload, keep_alive=True):
+    "Writes payload as a JSON response"
+    body = json.dumps(payload).encode("utf-8")
+    writer.write(
+        (
+            "HTTP/1.1 {} {}\r\n"
+            "Content-Type: application/json\r\n"
+            "Content-Length: {}\r\n"
+            "Connection: {}\r\n\r\n"
+        )
+        .format(
+            int(status),
+            HTTPStatus(status).phrase,
+            len(body),
+            "keep-alive" if keep_alive else "close",
+        )
+        .encode("latin-1")
+        + body
+    )
+    await writer.drain()
+
+
+class ScoringServer:
+    """
+    Scores batches of reference/hypothesis pairs on a process pool,
+    answering requests from many clients concurrently
+    Scoring is CPU bound, so with processes=False the threads only overlap
+    reading files and share one core, but each keeps no separate caches
+    Pairs may only use the normalization profiles given here, by file or name
+    """
+
+    def __init__(
+        self,
+        max_workers=None,
+        processes=True,
+        cache_size=TRANSCRIPT_CACHE_SIZE,
+        normalizers=(),
+    ):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.processes = processes
+        self.cache_size = cache_size
+        self.normalizers = load_normalizers(normalizers)
+        self.stats = ServerStats()
+        self.connections = set()
+        self.ready = threading.Event()
+        self.address = None
+        self.loop = None
+        self.executor = None
+
+    async def score(self, pairs):
+        "Scores pairs concurrently on the pool, keeping their order"
+        start = time.time()
+        self.stats.in_flight += 1
+        try:
+            results = await asyncio.gather(*map(self.score_pair, pairs))
+        finally:
+            self.stats.in_flight -= 1
+        self.stats.record(
+            time.time() - start, len(pairs), sum("error" in _ for _ in results)
+        )
+        return results
+
+    async def score_pair(self, pair):
+        "Scores one pair on the pool with a normalizer loaded at startup"
+        normalizer = pair.get("normalizer")
+        if normalizer is not None:
+            if not isinstance(normalizer, str) or normalizer not in self.normalizers:
+                message = "{!r} is not a normalizer this server loaded"
+                return {"error": "ValueError: " + message.format(normalizer)}
+            pair = dict(pair, normalizer=self.normalizers[normalizer])
+        return await self.loop.run_in_executor(
+            self.executor, score_pair, pair, self.cache_size
+        )
+
+    async def dispatch(self, method, path, body):
+        "Returns the response payload for a request"
+        path = path.split("?")[0]
+        if path == "/stats":
+            if method != "GET":
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "Use GET /stats")
+            return self.stats.as_dict()
+        if path == "/score":
+            if method != "POST":
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "Use POST /score")
+            try:
+                pairs = batch_pairs(json.loads(body.decode("utf-8")))
+            except ValueError as exc:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, str(exc))
+            return {"results": await self.score(pairs)}
+        raise HTTPError(HTTPStatus.NOT_FOUND, "Unknown path {}".format(path))
+
+    async def handle_connection(self, reader, writer):
+        "Answers requests on one connection until either side closes it"
+        self.connections.add(writer)
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except HTTPError as exc:
+                    await write_response(writer, exc.status, {"error": str(exc)}, False)
+                    break
+                except (ValueError, asyncio.IncompleteReadError):
+                    await write_response(
+                        writer,
+                        HTTPStatus.BAD_REQUEST,
+                        {"error": "Malformed HTTP request"},
+                        False,
+                    )
+                    break
+                if request is None:
+                    break
+
+                method, path, version, headers, body = request
+                keep_alive = (
+                    version == "HTTP/1.1"
+                    and headers.get("connection", "").lower() != "close"
+                )
+                try:
+                    status, payload = HTTPStatus.OK, await self.dispatch(
+                        method, path, body
+                    )
+                except HTTPError as exc:
+                    status, payload = exc.status, {"error": str(exc)}
+                except Exception as exc:  # keep serving other clients
+                    LOGGER.exception("Failed to answer %s %s", method, path)
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {
+                        "error": "{}: {}".format(type(exc).__name__, exc)
+                    }
+                await write_response(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self.connections.discard(writer)
+            writer.close()
+
+    def run(self, host="127.0.0.1", port=DEFAULT_PORT, socket_path=None):
+        """
+        Serves until stop() is called or the process is interrupted,
+        on a Unix socket if socket_path is given
+        """
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.executor = (ProcessPoolExecutor if self.processes else ThreadPoolExecutor)(
+            self.max_workers
+        )
+        set_transcript_cache_size(self.cache_size)
+        warm_up(set(self.normalizers.values()))
+
+        if socket_path:
+            server = self.loop.run_until_complete(
+                asyncio.start_unix_server(self.handle_connection, socket_path)
+            )
+            self.address = socket_path
+        else:
+            server = self.loop.run_until_complete(
+                asyncio.start_server(self.handle_connection, host, port)
+            )
+            self.address = server.sockets[0].getsockname()[:2]
+        LOGGER.info("Scoring server listening on %s", self.address)
+        self.ready.set()
+
+        try:
+            self.loop.run_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+            for writer in list(self.connections):
+                writer.close()
+            self.loop.run_until_complete(server.wait_closed())
+            self.loop.run_until_complete(asyncio.sleep(0))
+            self.executor.shutdown()
+            self.loop.close()
+            if socket_path and os.path.exists(socket_path):
+                os.remove(socket_path)
+
+    def stop(self):
+        "Stops a running server from any thread"
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    "HTTP connection over a Unix socket"
+
+    def __init__(self, socket_path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class ScoringClient:
+    """
+    Client for a scoring server which reuses one connection for all requests
+    """
+
+    def __init__(
+        self, host="127.0.0.1", port=DEFAULT_PORT, socket_path=None, timeout=None
+    ):
+        self.host = host
+        self.port = port
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def connect(self):
+        if self.socket_path:
+            return UnixHTTPConnection(self.socket_path, self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def request(self, method, path, payload=None):
+        "Sends a request, reconnecting once if the server closed the connection"
+        body = None if payload is None else json.dumps(payload).encode("utf-8")
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = self.connect()
+            try:
+                self.connection.request(
+                    method, path, body, {"Content-Type": "application/json"}
+                )
+                response = self.connection.getresponse()
+                data = json.loads(response.read().decode("utf-8"))
+                break
+            except ConnectionError:
+                self.close()
+                if attempt:
+                    raise
+        if response.status != HTTPStatus.OK:
+            raise RuntimeError(
+                "Scoring server error {}: {}".format(response.status, data["error"])
+            )
+        return data
+
+    def score(self, pairs, **options):
+        """
+        Scores a list of {"reference": ..., "hypothesis": ...} pairs, with
+        options such as metrics=["wer", "cer"] applying to all of them
+        """
+        return self.request("POST", "/score", dict(options, pairs=list(pairs)))[
+            "results"
+        ]
+
+    def stats(self):
+        "Returns the server's counters"
+        return self.request("GET", "/stats")
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def serve(
+    host="127.0.0.1",
+    port=DEFAULT_PORT,
+    socket_path=None,
+    max_workers=None,
+    processes=True,
+    cache_size=TRANSCRIPT_CACHE_SIZE,
+    normalizers=(),
+):
+    """
+    Serves wer, cer, wder and tswde scoring over HTTP on host:port,
+    or on a Unix socket if --socket-path is given
+    Pairs are scored on --max-workers processes, each keeping up to
+    --cache-size parsed transcript files in memory. With --noprocesses they
+    are scored on threads, which share one cache but not more than one core
+    Normalization profiles listed in --normalizers are loaded at startup,
+    and are the only ones pairs may name
+    """
+    ScoringServer(max_workers, processes, cache_size, normalizers).run(
+        host, port, socket_path
+    )
+
+
+def cli():
+    Fire(serve)
+
+
+if __name__ == "__main__":
+    cli()
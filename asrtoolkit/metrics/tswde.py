@@ -89,6 +89,7 @@ def tswde(
 def compute_tswde(reference_file, transcript_file, target_speaker, json_format=None):
     """
     Compares a reference and transcript file and the calculates word diarization error rate (WER) between these two files
+    JSON input formats are detected from file contents unless --json-format is given
     """
 
     # read files from arguments
@@ -9,6 +9,7 @@ from collections import defaultdict
 import rapidfuzz
 from fire import Fire
 
+from asrtoolkit.data_structures.time_aligned_text import TimeIndex
 from asrtoolkit.file_utils.script_input_validation import assign_if_valid
 
 
@@ -60,13 +61,16 @@ def find_speaker_with_most_crosstalk(ref, hyp, target_ref_speaker):
     """
     overlapping_speaker_duration = defaultdict(lambda: 0.0)
 
-    target_speaker_segments = [
-        seg for seg in ref.segments if seg.speaker == target_ref_speaker
-    ]
+    target_speaker_segments = TimeIndex(
+        [seg for seg in ref.segments if seg.speaker == target_ref_speaker]
+    )
 
     for seg in hyp.segments:
         overlapping_speaker_duration[seg.speaker] += sum(
-            segments_crosstalk(seg, ref_seg) for ref_seg in target_speaker_segments
+            segments_crosstalk(seg, ref_seg)
+            for ref_seg in target_speaker_segments.overlapping(
+                float(seg.start), float(seg.stop)
+            )
         )
 
     return dict(overlapping_speaker_duration)
@@ -158,6 +162,7 @@ def compute_wder(
 ):
     """
     Compares a reference and transcript file and the calculates word diarization error rate (WER) between these two files
+    JSON input formats are detected from file contents unless --json-format is given
     """
 
     # read files from arguments
@@ -8,7 +8,7 @@ import re
 import editdistance
 from fire import Fire
 
-from asrtoolkit.clean_formatting import clean_up
+from asrtoolkit.clean_formatting import DEFAULT_NORMALIZER, clean_up, load_normalizer
 from asrtoolkit.data_structures import Transcript
 from asrtoolkit.file_utils.script_input_validation import assign_if_valid
 
@@ -65,11 +65,12 @@ def get_wer_components(ref_string, hyp_string):
     return WER_numerator, WER_denominator
 
 
-def standardize_transcript(input_transcript, remove_nsns=False):
+def standardize_transcript(input_transcript, remove_nsns=False, normalizer=None):
     """
     Given an input Transcript object or string,
     remove non-speech events
     [optionally] remove non-silence noises
+    and clean it up with a normalization profile (the default if None)
 
     >>> standardize_transcript("this is a test")
     'this is a test'
@@ -79,6 +80,20 @@ def standardize_transcript(input_transcript, remove_nsns=False):
     'this is a test'
     """
 
+    normalizer = load_normalizer(normalizer)
+
+    # text read from STM files written by asrtoolkit is usually clean already
+    if (
+        isinstance(input_transcript, Transcript)
+        and (normalizer or DEFAULT_NORMALIZER).version == DEFAULT_NORMALIZER.version
+        and input_transcript.normalized
+    ):
+        segments = input_transcript.segments
+        text = " ".join(filter(None, (_.formatted_text or _.text for _ in segments)))
+        if remove_nsns:
+            text = clean_up(remove_nonsilence_noises(text))
+        return text
+
     # accept Transcript objects but use their output text
     input_transcript = (
         input_transcript.text()
@@ -93,12 +108,12 @@ def standardize_transcript(input_transcript, remove_nsns=False):
         input_transcript = remove_nonsilence_noises(input_transcript)
 
     # clean punctuation, etc.
-    input_transcript = clean_up(input_transcript)
+    input_transcript = clean_up(input_transcript, normalizer=normalizer)
 
     return input_transcript
 
 
-def wer(ref, hyp, remove_nsns=False):
+def wer(ref, hyp, remove_nsns=False, normalizer=None):
     """
     Calculate word error rate between two string or Transcript objects
     >>> wer("this is a cat", "this is a dog")
@@ -106,7 +121,10 @@ def wer(ref, hyp, remove_nsns=False):
     """
 
     # standardize input string
-    ref, hyp = map(lambda t: standardize_transcript(t, remove_nsns), (ref, hyp))
+    normalizer = load_normalizer(normalizer)
+    ref, hyp = map(
+        lambda t: standardize_transcript(t, remove_nsns, normalizer), (ref, hyp)
+    )
 
     # calculate WER with helper function
     WER_numerator, WER_denominator = get_wer_components(ref, hyp)
@@ -114,7 +132,7 @@ def wer(ref, hyp, remove_nsns=False):
     return 100 * WER_numerator / WER_denominator
 
 
-def cer(ref, hyp, remove_nsns=False):
+def cer(ref, hyp, remove_nsns=False, normalizer=None):
     """
     Calculate character error rate between two strings or Transcript objects
     >>> cer("this cat", "this bad")
@@ -122,10 +140,13 @@ def cer(ref, hyp, remove_nsns=False):
     """
 
     # standardize and convert string to a list of characters
+    normalizer = load_normalizer(normalizer)
     ref, hyp = map(
         list,
         map(
-            lambda transcript: standardize_transcript(transcript, remove_nsns),
+            lambda transcript: standardize_transcript(
+                transcript, remove_nsns, normalizer
+            ),
             (ref, hyp),
         ),
     )
@@ -142,11 +163,17 @@ def compute_wer(
     char_level=False,
     ignore_nsns=False,
     json_format=None,
+    start=None,
+    stop=None,
+    normalizer=None,
 ):
     """
     Compares a reference and transcript file and calculates word error rate (WER) between these two files
     If --char-level is given, compute CER instead
     If --ignore-nsns is given, ignore non silence noises
+    JSON input formats are detected from file contents unless --json-format is given
+    If --start or --stop are given, only segments overlapping that time range in seconds are scored
+    If --normalizer is given, text is normalized with that profile file
     """
 
     # read files from arguments
@@ -163,15 +190,18 @@ def compute_wer(
         else None,
     )
 
+    if (start is not None or stop is not None) and ref is not None and hyp is not None:
+        ref, hyp = ref.slice(start, stop), hyp.slice(start, stop)
+
     metric = None
     if ref is None or hyp is None:
         print(
             "Error with an input file. Please check all files exist and are accepted by ASRToolkit"
         )
     elif char_level:
-        metric = cer(ref, hyp, ignore_nsns)
+        metric = cer(ref, hyp, ignore_nsns, normalizer)
     else:
-        metric = wer(ref, hyp, ignore_nsns)
+        metric = wer(ref, hyp, ignore_nsns, normalizer)
 
     return metric
 
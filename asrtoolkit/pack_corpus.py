@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""
+Script for packing prepared corpora into tar shards for training data loaders
+"""
+
+import logging
+import os
+import time
+
+from fire import Fire
+
+from asrtoolkit.data_structures import Corpus, Transcript
+from asrtoolkit.file_utils.name_cleaners import get_extension, strip_extension
+from asrtoolkit.file_utils.shards import DEFAULT_SHARD_SIZE, ShardWriter, read_shards
+
+LOGGER = logging.getLogger(__name__)
+
+
+def shard_key(exemplar, corpus_dir, prefix=""):
+    """
+    Key of an exemplar's files in the shards: the path of its audio file
+    relative to its corpus directory, without extension, after any prefix
+    """
+    relative = os.path.relpath(
+        strip_extension(exemplar.audio_file.location), corpus_dir
+    )
+    return prefix + relative.replace(os.sep, "/")
+
+
+def pack_corpus(*corpus_dirs, output_dir="shards", max_shard_size=DEFAULT_SHARD_SIZE):
+    """
+    Pack the audio and STM files of one or more corpus directories
+    (e.g. the output of prepare_audio_corpora or split_audio_file)
+    into tar shards of at most max_shard_size bytes with an index.json
+    Exemplars are keyed by their path in their corpus directory, prefixed by
+    the name of that directory when packing several
+
+    Returns the number of exemplars and shards written
+    """
+    start_time = time.time()
+    keys = {}
+    for corpus_dir in corpus_dirs:
+        prefix = (
+            os.path.basename(os.path.normpath(corpus_dir)) + "/"
+            if len(corpus_dirs) > 1
+            else ""
+        )
+        for eg in Corpus({"location": corpus_dir}).exemplars:
+            keys.setdefault(eg.key(), (shard_key(eg, corpus_dir, prefix), eg))
+
+    packed = sorted(keys.values(), key=lambda _: _[0])
+    duplicates = sorted({a[0] for a, b in zip(packed, packed[1:]) if a[0] == b[0]})
+    if duplicates:
+        raise ValueError(
+            "Several exemplars would be packed as {}".format(", ".join(duplicates))
+        )
+
+    n_exemplars = 0
+    with ShardWriter(output_dir, max_shard_size) as writer:
+        for key, eg in packed:
+            writer.write(
+                key,
+                {
+                    get_extension(eg.audio_file.location): eg.audio_file.location,
+                    "stm": eg.transcript_file.location,
+                },
+            )
+            n_exemplars += 1
+
+    LOGGER.info(
+        "Packed %d exemplars into %d shards in %.1f s",
+        n_exemplars,
+        len(writer.shards),
+        time.time() - start_time,
+    )
+    return {"exemplars": n_exemplars, "shards": len(writer.shards)}
+
+
+def read_exemplars(shard_dir, worker=0, n_workers=1):
+    """
+    Streams (key, audio extension, audio bytes, Transcript) from the shards
+    assigned to one of n_workers workers
+    """
+    for key, files in read_shards(shard_dir, worker, n_workers):
+        transcript = Transcript(files.pop("stm").decode("utf-8"), file_format="stm")
+        transcript.file_extension = "stm"
+        for audio_extension, audio in files.items():
+            yield key, audio_extension, audio, transcript
+
+
+def cli():
+    Fire(pack_corpus)
+
+
+if __name__ == "__main__":
+    cli()
@@ -6,6 +6,7 @@ If present, train, test, dev sets will be used from the individual corpora
 """
 import json
 import logging
+import os
 
 from fire import Fire
 
@@ -75,13 +76,15 @@ def get_corpus(loc):
     return Corpus({"location": loc})
 
 
-def prep_all_for_training(corpora, target_dir, nested, sample_rate=16000):
+def prep_all_for_training(corpora, target_dir, nested, sample_rate=16000, **kwargs):
     """
     prepare all corpora for training and return logs of what was where
+    kwargs (max_workers, max_in_flight, processes, incremental) are passed
+    to Corpus.prepare_for_training
     """
     return {
         data_dir: corpora[data_dir].prepare_for_training(
-            target_dir + "/" + data_dir, nested, sample_rate
+            target_dir + "/" + data_dir, nested, sample_rate, **kwargs
         )
         for data_dir in data_dirs
     }
@@ -105,7 +108,14 @@ def gather_all_corpora(corpora_dirs):
 
 
 def prepare_audio_corpora(
-    *corpora, target_dir="input-data", nested=False, min_train_dev_segments=50
+    *corpora,
+    target_dir="input-data",
+    nested=False,
+    min_train_dev_segments=50,
+    max_workers=None,
+    max_in_flight=None,
+    processes=False,
+    incremental=False,
 ):
     """
     Copy and organize specified corpora into a target directory.
@@ -116,6 +126,11 @@ def prepare_audio_corpora(
         target-dir, str - target directory where corpora should be organized
         nested, bool (default False) - if present/True, store in stm and sph subdirectories
         min_train_dev_segments int - enforces a minimum number of speech segments in train and dev splits
+        max_workers int - number of audio files converted at once (default: number of CPUs)
+        max_in_flight int - number of files queued for conversion at once (default: 2 * max_workers)
+        processes bool (default False) - if present/True, convert in processes instead of threads
+        incremental bool (default False) - if present/True, skip files already prepared from
+            unchanged inputs by an earlier (possibly interrupted) run
     """
 
     make_list_of_dirs(
@@ -129,9 +144,20 @@ def prepare_audio_corpora(
     corpora = gather_all_corpora(corpora)
     corpora = auto_split_corpora(corpora, min_size=min_train_dev_segments)
 
-    log = prep_all_for_training(corpora, target_dir, nested)
-    with open(target_dir + "/corpora.json", "w") as f:
+    log = prep_all_for_training(
+        corpora,
+        target_dir,
+        nested,
+        max_workers=max_workers,
+        max_in_flight=max_in_flight,
+        processes=processes,
+        incremental=incremental,
+    )
+
+    # replace corpora.json atomically so it is never left half written
+    with open(target_dir + "/corpora.json.tmp", "w") as f:
         f.write(json.dumps(log))
+    os.replace(target_dir + "/corpora.json.tmp", target_dir + "/corpora.json")
 
 
 def cli():
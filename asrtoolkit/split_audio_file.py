@@ -14,15 +14,22 @@ from asrtoolkit.file_utils.script_input_validation import valid_input_file
 LOGGER = logging.getLogger(__name__)
 
 
-def split_audio_file(source_audio_file, source_transcript, target_directory="split"):
+def split_audio_file(
+    source_audio_file,
+    source_transcript,
+    target_directory="split",
+    start=None,
+    stop=None,
+):
     """
     Split source audio file into segments denoted by transcript file
     into target_directory
+    If start or stop are given, only segments overlapping that time range in seconds are split
     Results in stm and sph files in target directory
     """
     source_audio = AudioFile(source_audio_file)
     transcript = Transcript(source_transcript)
-    source_audio.split(transcript, target_directory)
+    source_audio.split(transcript, target_directory, start, stop)
 
 
 def validate_transcript(transcript):
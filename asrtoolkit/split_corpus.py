@@ -7,7 +7,6 @@ Create train, dev, and test splits a folder of ASR data
 import logging
 import os
 import sys
-from random import seed
 
 from fire import Fire
 
@@ -35,8 +34,12 @@ def perform_split(
     split_words,
     min_split_segs,
     leftover_data_split_name,
+    rand_seed=None,
+    stratify=None,
 ):
-    leftover_corpus, new_corpus = corpus_to_split.split(split_words, min_split_segs)
+    leftover_corpus, new_corpus = corpus_to_split.split(
+        split_words, min_split_segs, seed=rand_seed, stratify=stratify
+    )
 
     new_corpus.prepare_for_training(os.path.join(split_dir, split_name))
     log_corpus_creation(new_corpus, split_name)
@@ -55,6 +58,7 @@ def split_corpus(
     min_split_segs=10,
     leftover_data_split_name="orig",
     rand_seed=None,
+    stratify=None,
 ):
     """
     Splits an ASR corpus directory based on number of words outputting splits in split_dir.
@@ -62,9 +66,8 @@ def split_corpus(
     Invalid files, such as empty files, will not be included in data splits.
 
     Set rand_seed for reproducible splits
+    Set stratify to speaker, channel, or source to split each of those proportionally
     """
-    seed(rand_seed)
-
     c = Corpus({"location": in_dir})
     LOGGER.debug("%d exemplars before validating them", len(c.exemplars))
     valid_exemplars, total_words = c.count_exemplar_words()
@@ -80,7 +83,14 @@ def split_corpus(
         sys.exit(1)
 
     perform_split(
-        c, split_dir, split_name, split_words, min_split_segs, leftover_data_split_name
+        c,
+        split_dir,
+        split_name,
+        split_words,
+        min_split_segs,
+        leftover_data_split_name,
+        rand_seed=rand_seed,
+        stratify=stratify,
     )
 
 
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""
+Benchmark per-file latency of preparing short clips for training
+in-process with NumPy versus with sox (if installed)
+Requires numpy, e.g. from the audio extra (pip install asrtoolkit[audio])
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import wave
+
+import numpy as np
+from fire import Fire
+
+from asrtoolkit.file_utils.audio_io import convert_audio
+
+
+def make_clip(file_name, seconds, sample_rate, channels):
+    "Writes a 16 bit PCM WAV file of noise"
+    samples = np.random.randint(-2000, 2000, (int(seconds * sample_rate), channels))
+    with wave.open(file_name, "wb") as f:
+        f.setnchannels(channels)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(samples.astype("<i2").tobytes())
+
+
+def time_per_file(convert, clips):
+    "Returns mean seconds per file of convert(source, target)"
+    start_time = time.perf_counter()
+    for clip in clips:
+        convert(clip, clip[:-4] + ".sph")
+    return (time.perf_counter() - start_time) / len(clips)
+
+
+def sox_convert(source_file, target_file, sample_rate=16000):
+    subprocess.check_call(
+        "sox -V1 {} {} rate {} remix -".format(source_file, target_file, sample_rate),
+        shell=True,
+    )
+
+
+def benchmark(
+    n_files=100, seconds=3.0, source_rate=44100, channels=2, sample_rate=16000
+):
+    """
+    Converts n_files clips of a few seconds to mono SPH at sample_rate
+    and prints the mean latency per file of each engine
+    """
+    work_dir = tempfile.mkdtemp()
+    try:
+        clips = [
+            os.path.join(work_dir, "clip_{}.wav".format(_)) for _ in range(n_files)
+        ]
+        for clip in clips:
+            make_clip(clip, seconds, source_rate, channels)
+
+        engines = {"numpy": convert_audio}
+        if shutil.which("sox"):
+            engines["sox"] = sox_convert
+        for name, convert in engines.items():
+            latency = time_per_file(
+                lambda source, target: convert(source, target, sample_rate), clips
+            )
+            print("{:6s} {:8.2f} ms per file".format(name, 1000 * latency))
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    Fire(benchmark)
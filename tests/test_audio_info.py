@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""
+Test reading audio information from file headers
+"""
+
+import os
+import shutil
+import wave
+
+from utils import get_test_dir
+
+from asrtoolkit.data_structures.audio_file import AudioFile, audio_duration
+from asrtoolkit.data_structures.corpus import Corpus
+from asrtoolkit.file_utils.manifest import persist_manifests
+
+test_dir = get_test_dir(__file__)
+
+
+def test_audio_duration():
+    "durations are read from WAV and SPH headers"
+    wav_file = f"{test_dir}/duration_test.wav"
+    with wave.open(wav_file, "wb") as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(8000)
+        f.writeframes(b"\x00\x00" * 2 * 12000)
+    assert audio_duration(wav_file) == 1.5
+
+    sph_file = f"{test_dir}/duration_test.sph"
+    header = "NIST_1A\n   1024\nsample_rate -i 16000\nsample_count -i 8000\nend_head\n"
+    with open(sph_file, "wb") as f:
+        f.write(header.encode().ljust(1024, b" ") + b"\x00\x00" * 8000)
+    assert audio_duration(sph_file) == 0.5
+
+    assert audio_duration(f"{test_dir}/small-test-file.stm") is None
+
+    os.remove(wav_file)
+    os.remove(sph_file)
+
+
+def test_audio_info():
+    "AudioFile.info reads WAV headers, is cached, and sums over a Corpus"
+    corpus_dir = f"{test_dir}/audio-info-corpus"
+    os.makedirs(corpus_dir, exist_ok=True)
+    for i in range(3):
+        with wave.open(f"{corpus_dir}/info_{i}.wav", "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(16000)
+            f.writeframes(b"\x00\x00" * 8000 * (i + 1))
+        with open(f"{corpus_dir}/info_{i}.stm", "w") as f:
+            f.write(
+                f"info_{i} 1 speaker 0.0 {0.5 * (i + 1) + 0.25} <o,f0,male> some words\n"
+            )
+
+    info = AudioFile(f"{corpus_dir}/info_0.wav").info()
+    assert (info.duration, info.sample_rate, info.channels) == (0.5, 16000, 1)
+
+    corpus = Corpus({"location": corpus_dir})
+    assert corpus.duration(max_workers=2) == 3.0
+    assert not os.path.exists(f"{corpus_dir}/.asrtoolkit_manifest.jsonl")
+
+    persisted_dir = shutil.copytree(corpus_dir, f"{corpus_dir}-persisted")
+    persist_manifests()
+    try:
+        assert Corpus({"location": persisted_dir}).duration(max_workers=2) == 3.0
+    finally:
+        persist_manifests(False)
+    assert os.path.exists(f"{persisted_dir}/.asrtoolkit_manifest.jsonl")
+    shutil.rmtree(persisted_dir)
+    assert all(
+        len(eg.segments_outside_audio(tolerance=0.1)) == 1 for eg in corpus.exemplars
+    )
+    assert not any(eg.segments_outside_audio(tolerance=0.5) for eg in corpus.exemplars)
+
+    assert AudioFile(f"{test_dir}/small-test-file.stm").info() is None
+
+    shutil.rmtree(corpus_dir)
+
+
+if __name__ == "__main__":
+    import sys
+
+    import pytest
+
+    pytest.main(sys.argv)
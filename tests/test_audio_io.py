@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+"""
+Test in-process audio conversion
+"""
+
+import os
+import wave
+
+import pytest
+from utils import get_test_dir
+
+from asrtoolkit.data_structures.audio_file import AudioFile, combine_audio
+from asrtoolkit.file_utils.audio_io import (
+    UnsupportedAudioError,
+    mix_audio,
+    read_header,
+    read_samples,
+    resample,
+)
+
+np = pytest.importorskip("numpy")
+
+test_dir = get_test_dir(__file__)
+
+
+def test_resample_sine():
+    "a resampled sine stays a sine at the new rate"
+    for from_rate, to_rate in [(8000, 16000), (44100, 16000), (16000, 8000)]:
+        x = 0.5 * np.sin(2 * np.pi * 440 * np.arange(from_rate) / from_rate)
+        y = resample(x.astype("float32"), from_rate, to_rate)
+        expected = 0.5 * np.sin(2 * np.pi * 440 * np.arange(to_rate) / to_rate)
+        assert len(y) == to_rate
+        assert np.abs(y - expected)[100:-100].max() < 1e-3
+
+
+def test_prepare_wav_in_process():
+    "a stereo 8 kHz WAV is prepared as a mono 16 kHz SPH without sox"
+    wav_file = f"{test_dir}/audio_io_test.wav"
+    left = (8000 * np.sin(2 * np.pi * 200 * np.arange(8000) / 8000)).astype("<i2")
+    with wave.open(wav_file, "wb") as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(8000)
+        f.writeframes(np.stack([left, np.zeros_like(left)], axis=1).tobytes())
+
+    sph_file = AudioFile(wav_file).prepare_for_training(f"{test_dir}/audio_io_test.sph")
+    header = read_header(sph_file.location)
+    assert (header.sample_rate, header.channels, header.n_frames) == (16000, 1, 16000)
+    samples, _ = read_samples(sph_file.location)
+    assert abs(np.abs(samples).max() - 8000 / 32768 / 2) < 1e-3
+
+    os.remove(wav_file)
+    os.remove(sph_file.location)
+
+
+def test_8_bit_wav_from_header():
+    "8 bit WAV samples are unsigned whatever the file is called"
+    wav_file = f"{test_dir}/audio_io_8_bit_test.audio"
+    with wave.open(wav_file, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(1)
+        f.setframerate(8000)
+        f.writeframes(bytes([0, 128, 192]))
+
+    assert read_header(wav_file).unsigned
+    samples, _ = read_samples(wav_file)
+    assert samples[:, 0].tolist() == [-1.0, 0.0, 0.5]
+
+    os.remove(wav_file)
+
+
+def write_wav(file_name, samples, sample_rate=16000):
+    with wave.open(file_name, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(samples.astype("<i2").tobytes())
+
+
+def test_mix_audio():
+    "inputs of different lengths are mixed block by block like sox -m"
+    first, second = f"{test_dir}/mix_1.wav", f"{test_dir}/mix_2.wav"
+    write_wav(first, np.full(1000, 1000))
+    write_wav(second, np.full(2500, -3000))
+
+    mix_audio([first, second], f"{test_dir}/mixed.sph", block_size=256)
+    mixed, sample_rate = read_samples(f"{test_dir}/mixed.sph")
+    assert sample_rate == 16000 and mixed.shape == (2500, 1)
+    assert np.allclose(mixed[:1000] * 32768, -1000)
+    assert np.allclose(mixed[1000:] * 32768, -1500)
+
+    combine_audio([first, second], f"{test_dir}/mixed.wav", gain=True)
+    mixed, _ = read_samples(f"{test_dir}/mixed.wav")
+    assert abs(np.abs(mixed).min() * 32768 - 32767 / 1.5) < 1
+    assert np.abs(mixed).max() * 32768 == 32767
+
+    # unsupported outputs are rejected before a temporary file is written
+    with pytest.raises(UnsupportedAudioError):
+        mix_audio([first, second], f"{test_dir}/mixed.mp3")
+    assert not os.path.exists(f"{test_dir}/mixed.mp3.tmp")
+
+    for file_name in [first, second, f"{test_dir}/mixed.sph", f"{test_dir}/mixed.wav"]:
+        os.remove(file_name)
+
+
+if __name__ == "__main__":
+    import sys
+
+    import pytest
+
+    pytest.main(sys.argv)
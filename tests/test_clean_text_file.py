@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""
+Test cleaning text files in parallel chunks
+"""
+
+import io
+import json
+import os
+
+from utils import get_sample_dir, get_test_dir
+
+from asrtoolkit import clean_formatting
+from asrtoolkit.clean_formatting import clean_text_file, clean_up
+
+sample_dir = get_sample_dir(__file__)
+test_dir = get_test_dir(__file__)
+
+
+def test_clean_text_file():
+    "chunked parallel cleaning matches cleaning every line in order"
+    with open(f"{sample_dir}/BillGatesTEDTalk.txt", encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    expected = " ".join(map(clean_up, lines))
+
+    input_files = [f"{test_dir}/clean_test_{i}.txt" for i in range(2)]
+    for input_file in input_files:
+        with open(input_file, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+    with open(f"{test_dir}/clean_test_empty.txt", "w") as f:
+        pass
+    input_files.append(f"{test_dir}/clean_test_empty.txt")
+
+    clean_text_file(*input_files, workers=2, chunk_lines=7)
+    for input_file, output in zip(input_files, [expected, expected, ""]):
+        with open(input_file[:-4] + "_cleaned.txt", encoding="utf-8") as f:
+            assert f.read() == output
+        os.remove(input_file)
+        os.remove(input_file[:-4] + "_cleaned.txt")
+
+
+def test_clean_stdin(monkeypatch, capsys):
+    "- cleans stdin to stdout, without a process pool for a single chunk"
+    monkeypatch.setattr("sys.stdin", io.StringIO("Hello, World!\nNBA 2K18\n"))
+    monkeypatch.setattr(clean_formatting, "BoundedExecutor", None)
+    clean_text_file("-", workers=4)
+    assert capsys.readouterr().out == "hello world n b a two k eighteen\n"
+
+
+def test_rule_stats():
+    "rule statistics are collected across worker processes"
+    input_file = f"{test_dir}/rule_stats_test.txt"
+    with open(input_file, "w", encoding="utf-8") as f:
+        f.write("up 6% to $380 million\n" * 10 + "nothing to clean\n" * 5)
+
+    clean_text_file(
+        input_file,
+        workers=2,
+        chunk_lines=4,
+        rule_stats=f"{test_dir}/rule_stats_test.json",
+    )
+    with open(f"{test_dir}/rule_stats_test.json") as f:
+        stats = json.load(f)
+    assert stats["remove_all_special_chars"]["calls"] == 10
+    assert stats["remove_double_spaces"]["calls"] == 10
+    assert stats["percent"]["calls"] == 10
+    assert stats["percent"]["matches"] == 10
+    assert stats["percent"]["changed_chars"] == 10
+    assert stats["millions"]["matches"] == 0
+
+    for file_name in ["rule_stats_test.txt", "rule_stats_test_cleaned.txt"]:
+        os.remove(f"{test_dir}/{file_name}")
+    os.remove(f"{test_dir}/rule_stats_test.json")
+
+
+if __name__ == "__main__":
+    import sys
+
+    import pytest
+
+    pytest.main(sys.argv)
@@ -3,7 +3,15 @@
 Test wer calculation
 """
 
-from asrtoolkit.clean_formatting import clean_up
+import random
+
+from asrtoolkit.clean_formatting import clean_up, is_normalized
+
+# words and symbols which trigger default rules, mixed with plain words
+FUZZ_TOKENS = (
+    "it we 's 'll otc mln mio mlns plz pls thx thks um uh the price net org com "
+    ".com ... - -4 + % $5 1st 3/4 90s 2 10.5 ABC a.b.c Mr. [noise] <unk> x and"
+).split() + ["", " "]
 
 
 def test_clean_up():
@@ -152,6 +160,15 @@ def test_clean_up():
         assert result == test[1]
 
 
+def test_is_normalized_fuzz():
+    "lines is_normalized accepts are always left unchanged by clean_up"
+    rng = random.Random(0)
+    for _ in range(2000):
+        line = " ".join(rng.choice(FUZZ_TOKENS) for _ in range(rng.randint(1, 6)))
+        if is_normalized(line):
+            assert clean_up(line) == line, line
+
+
 if __name__ == "__main__":
     import sys
 
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""
+Test merging transcripts in time order
+"""
+
+import os
+import random
+
+from utils import get_test_dir
+
+from asrtoolkit.combine_audio_files import combine_transcripts
+from asrtoolkit.data_structures import Transcript
+from asrtoolkit.data_structures.segment import Segment
+from asrtoolkit.data_structures.time_aligned_text import (
+    find_overlaps,
+    merge_transcripts,
+)
+
+test_dir = get_test_dir(__file__)
+
+
+def make_transcript(name, times):
+    transcript = Transcript()
+    transcript.file_extension = "stm"
+    transcript.segments = [
+        Segment(filename=name, start=start, stop=stop, text="{} {}".format(name, i))
+        for i, (start, stop) in enumerate(times)
+    ]
+    return transcript
+
+
+def test_merge_many_transcripts():
+    "merging many transcripts matches concatenating and sorting them"
+    random.seed(0)
+    transcripts = [
+        make_transcript(
+            str(i), sorted((t, t + 0.5) for t in random.sample(range(1000), 20))
+        )
+        for i in range(100)
+    ]
+    merged = merge_transcripts(transcripts)
+    expected = sorted(
+        (seg for t in transcripts for seg in t.segments),
+        key=lambda seg: (float(seg.start), float(seg.stop)),
+    )
+    assert [seg.text for seg in merged.segments] == [seg.text for seg in expected]
+
+
+def test_combine_transcripts_overlaps():
+    "overlaps are only reported between different transcripts"
+    first = make_transcript("first", [(0, 1), (1, 2), (5, 6)])
+    second = make_transcript("second", [(1.5, 3), (3, 4)])
+    third = make_transcript("third", [(3.5, 4.5), (10, 11)])
+    assert [(a.text, b.text) for a, b in find_overlaps([first, second, third])] == [
+        ("first 1", "second 0"),
+        ("second 1", "third 0"),
+    ]
+
+    output_file = f"{test_dir}/combined_test.wav"
+    overlaps = combine_transcripts([third, first, second], output_file, True)
+    assert len(overlaps) == 2
+    combined = Transcript(f"{test_dir}/combined_test.stm")
+    assert [float(seg.start) for seg in combined.segments] == [
+        0,
+        1,
+        1.5,
+        3,
+        3.5,
+        5,
+        10,
+    ]
+    os.remove(f"{test_dir}/combined_test.stm")
+
+
+if __name__ == "__main__":
+    import sys
+
+    import pytest
+
+    pytest.main(sys.argv)
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+"""
+Test reading and writing compressed transcripts
+"""
+
+import os
+
+from utils import get_sample_dir, get_test_dir
+
+from asrtoolkit.convert_transcript import convert
+from asrtoolkit.data_structures import Transcript
+from asrtoolkit.file_utils.script_input_validation import valid_input_file
+
+test_dir = get_test_dir(__file__)
+sample_dir = get_sample_dir(__file__)
+
+
+def test_compressed_round_trip():
+    "write and reread every text format with every compression"
+    reference = Transcript(f"{sample_dir}/BillGatesTEDTalk.stm")
+    for extension in ["stm", "vtt", "srt", "html", "txt", "atb"]:
+        plain = f"{test_dir}/compressed_test.{extension}"
+        reference.write(plain)
+        expected = Transcript(plain).text()
+        os.remove(plain)
+        for compression in ["gz", "bz2", "xz"]:
+            compressed = f"{plain}.{compression}"
+            reference.write(compressed)
+            assert valid_input_file(compressed)
+            assert Transcript(compressed).text() == expected
+            os.remove(compressed)
+
+
+def test_compressed_json_conversion():
+    "convert a compressed json file with detected format to a compressed stm"
+    convert(
+        f"{sample_dir}/simple_test.json",
+        f"{test_dir}/simple_test.json.gz",
+        json_format="greenkey",
+    )
+    convert(f"{test_dir}/simple_test.json.gz", f"{test_dir}/simple_test.stm.gz")
+    assert Transcript(f"{test_dir}/simple_test.stm.gz").segments
+    os.remove(f"{test_dir}/simple_test.json.gz")
+    os.remove(f"{test_dir}/simple_test.stm.gz")
+
+
+if __name__ == "__main__":
+    import sys
+
+    import pytest
+
+    pytest.main(sys.argv)
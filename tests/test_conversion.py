@@ -2,10 +2,21 @@
 """
 Test file conversion using samples
 """
+
+import json
 import os
+import shutil
 
 from utils import get_sample_dir, get_test_dir
 
+from asrtoolkit.clean_formatting import clean_up, collect_rule_stats
+from asrtoolkit.convert_transcript import convert_many
+from asrtoolkit.data_handlers import format_detection
+from asrtoolkit.data_handlers.format_detection import (
+    SNIFF_SIZE,
+    detect_format,
+    detect_json_format,
+)
 from asrtoolkit.data_structures import Transcript
 
 test_dir = get_test_dir(__file__)
@@ -76,6 +87,137 @@ def test_json_to_rttm_conversion_without_speaker():
     convert_and_test_it_loads(transcript, f"{test_dir}/no_speaker.rttm")
 
 
+def test_stm_to_atb_round_trip():
+    "execute stm to atb test with and without compression"
+
+    transcript = Transcript(f"{sample_dir}/BillGatesTEDTalk.stm")
+    for compression in [None, "gzip"]:
+        transcript.write(f"{test_dir}/stm_to_atb_test.atb", compression=compression)
+        reloaded = Transcript(f"{test_dir}/stm_to_atb_test.atb")
+        os.remove(f"{test_dir}/stm_to_atb_test.atb")
+
+        assert len(reloaded.segments) == len(transcript.segments)
+        for original, loaded in zip(transcript.segments, reloaded.segments):
+            assert all(
+                getattr(loaded, key) == value for key, value in vars(original).items()
+            )
+
+
+def test_stm_text_is_cleaned_once():
+    "writing a transcript to STM again reuses the text cleaned the first time"
+
+    transcript = Transcript(f"{sample_dir}/BillGatesTEDTalk.json")
+    with collect_rule_stats() as stats:
+        transcript.write(f"{test_dir}/cleaned_once_test.stm")
+    assert stats.as_dict()
+
+    with collect_rule_stats() as stats:
+        transcript.write(f"{test_dir}/cleaned_twice_test.stm")
+    assert not stats.as_dict()
+
+    Transcript(f"{test_dir}/cleaned_once_test.stm").write(
+        f"{test_dir}/cleaned_twice_test.stm"
+    )
+    with open(f"{test_dir}/cleaned_once_test.stm") as once, open(
+        f"{test_dir}/cleaned_twice_test.stm"
+    ) as twice:
+        assert once.read() == twice.read()
+
+    os.remove(f"{test_dir}/cleaned_once_test.stm")
+    os.remove(f"{test_dir}/cleaned_twice_test.stm")
+
+
+def test_written_text_is_cleaned():
+    "lowercase text which the rules still change is cleaned when written"
+
+    lines = ["it 's otc", "we 'll pay one mln", "this is clean"]
+    transcript = Transcript("\n".join(lines), file_format="txt")
+    for extension in ["stm", "atb"]:
+        transcript.write(f"{test_dir}/rule_words_test.{extension}")
+        reloaded = Transcript(f"{test_dir}/rule_words_test.{extension}")
+        os.remove(f"{test_dir}/rule_words_test.{extension}")
+
+        assert [seg.clean_text() for seg in reloaded.segments] == list(
+            map(clean_up, lines)
+        )
+    assert reloaded.segments[0].normalized_text == "it 's o t c"
+
+
+def test_write_returns_written_file():
+    "write returns the file as it was written, not the source segments"
+
+    transcript = Transcript("Hello World 2", file_format="txt")
+    written = transcript.write(f"{test_dir}/written_test.stm")
+    assert [seg.text for seg in written.segments] == ["hello world two"]
+    assert written.segments[0] is not transcript.segments[0]
+    assert transcript.segments[0].text == "Hello World 2"
+
+    os.remove(f"{test_dir}/written_test.stm")
+
+
+def test_json_format_detection():
+    """
+    execute json reading without giving the format
+    """
+    detected = Transcript(f"{sample_dir}/BillGatesTEDTalk.json")
+    given = Transcript(f"{sample_dir}/BillGatesTEDTalk.json", file_format="greenkey")
+    assert detected.text() == given.text()
+
+    assert detect_format(f"{sample_dir}/simple_test.json") == "greenkey"
+    assert detect_json_format({"monologues": [{"elements": []}]}) == "rev"
+
+
+def test_json_format_detection_after_sniff(monkeypatch):
+    "keys of a higher precedence format after the sniffed bytes are not missed"
+    file_name = f"{test_dir}/late_keys_test.json"
+    with open(file_name, "w") as f:
+        json.dump(
+            {
+                "segments": [{"transcript": "x" * SNIFF_SIZE}],
+                "tokens": [{"text": "x"}],
+            },
+            f,
+        )
+    monkeypatch.setattr(format_detection, "DETECTION_CACHE_SIZE", 1)
+    assert detect_format(file_name) == "truleo"
+    assert detect_format(f"{sample_dir}/simple_test.json") == "greenkey"
+    assert list(format_detection.DETECTED_FORMATS) == [
+        os.path.abspath(f"{sample_dir}/simple_test.json")
+    ]
+    os.remove(file_name)
+
+
+def test_batch_conversion():
+    """
+    execute parallel conversion of a glob and check up to date outputs are skipped
+    """
+    output_dir = f"{test_dir}/batch_conversion"
+    inputs = [f"{sample_dir}/BillGates*.stm", f"{sample_dir}/simple_test.json"]
+
+    summary = convert_many(
+        *inputs, output_dir=output_dir, output_format="vtt", workers=2
+    )
+    assert summary["converted"] == 3 and summary["failed"] == 0
+    assert sorted(os.listdir(output_dir)) == [
+        "BillGatesTEDTalk.vtt",
+        "BillGatesTEDTalk_transcribed.vtt",
+        "simple_test.vtt",
+    ]
+    input_files = [
+        "BillGatesTEDTalk.stm",
+        "BillGatesTEDTalk_transcribed.stm",
+        "simple_test.json",
+    ]
+    assert summary["segments"] == sum(
+        len(Transcript(f"{sample_dir}/{_}").segments) for _ in input_files
+    )
+
+    summary = convert_many(*inputs, output_dir=output_dir, output_format="vtt")
+    assert summary["converted"] == 0 and summary["skipped"] == 3
+
+    shutil.rmtree(output_dir)
+
+
 def convert_and_test_it_loads(transcript_obj, output_filename):
     """
     Tests that conversion works
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""
+Test set-like arithmetic of corpora
+"""
+
+import os
+import shutil
+
+from utils import get_test_dir
+
+from asrtoolkit.data_structures import AudioFile, Corpus, Exemplar, Transcript
+
+test_dir = get_test_dir(__file__)
+
+
+def test_corpus_arithmetic():
+    "corpora add, subtract and deduplicate exemplars by their file paths"
+    corpus_dir = f"{test_dir}/arithmetic-corpus"
+    os.makedirs(corpus_dir, exist_ok=True)
+    for i in range(4):
+        shutil.copy(f"{test_dir}/small-test-file.mp3", f"{corpus_dir}/file-{i}.mp3")
+        shutil.copy(f"{test_dir}/small-test-file.stm", f"{corpus_dir}/file-{i}.stm")
+
+    corpus = Corpus({"location": corpus_dir})
+    first, rest = corpus[:1], corpus[1:]
+    assert len(corpus) == 4 and len(first) == 1 and len(rest) == 3
+    assert len(corpus[4:]) == 0
+
+    same_files = Exemplar(
+        {
+            "audio_file": AudioFile(f"{corpus_dir}/file-0.mp3"),
+            "transcript_file": Transcript(f"{corpus_dir}/file-0.stm", lazy=True),
+        }
+    )
+    assert same_files in corpus and same_files not in rest
+    assert same_files == first.exemplars[0]
+
+    union = first + corpus
+    assert union.exemplars == first.exemplars + rest.exemplars
+    assert len(corpus - first) == 3 and len(corpus - corpus) == 0
+
+    remaining = corpus[:]
+    remaining -= first
+    assert isinstance(remaining, Corpus) and remaining.exemplars == rest.exemplars
+    remaining += first
+    assert len(remaining) == 4
+
+    # the index follows exemplars replaced in place
+    replaced = corpus[:]
+    assert same_files in replaced
+    replaced.exemplars[0] = rest.exemplars[0]
+    assert same_files not in replaced
+
+    # exemplars without files are never duplicates of each other
+    assert len(Corpus({"exemplars": [Exemplar(), Exemplar()]}).index()) == 2
+
+    # identical audio files are deduplicated in order
+    assert corpus.validate() == 1
+    assert corpus.exemplars == first.exemplars
+
+    shutil.rmtree(corpus_dir)
+
+
+if __name__ == "__main__":
+    import sys
+
+    import pytest
+
+    pytest.main(sys.argv)
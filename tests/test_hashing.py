@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+"""
+Test chunked and cached file hashing
+"""
+
+import hashlib
+
+from utils import get_sample_dir
+
+from asrtoolkit.data_structures import Transcript
+from asrtoolkit.file_utils.hashing import compute_file_hash, hash_files
+
+sample_dir = get_sample_dir(__file__)
+
+
+def test_chunked_hashes_match_whole_file_hashes():
+    "hashing in small chunks, in parallel, or through the cache gives the same digest"
+    file_names = [f"{sample_dir}/BillGatesTEDTalk.{_}" for _ in ["stm", "vtt", "srt"]]
+    for file_name in file_names:
+        with open(file_name, "rb") as f:
+            expected = hashlib.sha1(f.read()).hexdigest()
+        assert compute_file_hash(file_name, chunk_size=1000) == expected
+        assert Transcript(file_name).hash() == expected
+
+    fast_hashes = hash_files(file_names, algorithm="fast", max_workers=2)
+    assert len(set(fast_hashes.values())) == len(file_names)
+    assert fast_hashes == hash_files(file_names, algorithm="fast")
+
+
+if __name__ == "__main__":
+    import sys
+
+    import pytest
+
+    pytest.main(sys.argv)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+"""
+Test html reading fast path and fallback
+"""
+
+import os
+
+from utils import get_sample_dir, get_test_dir
+
+from asrtoolkit.data_handlers import html
+
+test_dir = get_test_dir(__file__)
+sample_dir = get_sample_dir(__file__)
+
+
+def test_fast_path_matches_soup():
+    "fast path must return the same segments as BeautifulSoup"
+    fast = html.read_file(f"{sample_dir}/BillGatesTEDTalk.html")
+    soup = html.read_soup(f"{sample_dir}/BillGatesTEDTalk.html")
+    assert len(fast) == len(soup) == 162
+    assert all(a.__dict__ == b.__dict__ for a, b in zip(fast, soup))
+
+
+def test_hand_edited_file_falls_back():
+    "files outside the format_segment layout are still read"
+    edited = f"{test_dir}/hand_edited.html"
+    with open(edited, "w") as f:
+        f.write(
+            "<html><body><table>\n"
+            '<tr><td>[0.00 - 1.50]</td><td>someone</td><td class="x">hello there</td></tr>\n'
+            "</table></body></html>\n"
+        )
+    segments = html.read_file(edited)
+    os.remove(edited)
+
+    assert [(seg.start, seg.stop, seg.text) for seg in segments] == [
+        ("0.00", "1.50", "hello there")
+    ]
+
+
+if __name__ == "__main__":
+    import sys
+
+    import pytest
+
+    pytest.main(sys.argv)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+"""
+Test journaling of prepared exemplars for incremental corpus preparation
+"""
+
+import os
+import shutil
+
+from utils import get_test_dir
+
+from asrtoolkit.data_structures import AudioFile, Exemplar, Transcript
+
+test_dir = get_test_dir(__file__)
+
+
+def test_find_prepared_exemplars():
+    "prepared outputs are reused only for unchanged inputs and sample rate"
+    source_dir = f"{test_dir}/incremental-corpus/source"
+    target_dir = f"{test_dir}/incremental-corpus/target"
+    os.makedirs(source_dir, exist_ok=True)
+    os.makedirs(target_dir, exist_ok=True)
+    shutil.copy(f"{test_dir}/small-test-file.mp3", f"{source_dir}/file_0.mp3")
+    shutil.copy(f"{test_dir}/small-test-file.stm", f"{source_dir}/file_0.stm")
+
+    source = Exemplar(
+        {
+            "audio_file": AudioFile(f"{source_dir}/file_0.mp3"),
+            "transcript_file": Transcript(f"{source_dir}/file_0.stm", lazy=True),
+        }
+    )
+    assert source.find_prepared(target_dir) is None
+
+    # stand-in for a resampled audio file
+    shutil.copy(f"{source_dir}/file_0.mp3", f"{target_dir}/file_0.sph")
+    prepared = Exemplar(
+        {
+            "audio_file": AudioFile(f"{target_dir}/file_0.sph"),
+            "transcript_file": source.transcript_file.write(f"{target_dir}/file_0.stm"),
+        }
+    )
+    source.record_prepared(prepared, sample_rate=16000)
+
+    assert source.find_prepared(target_dir) == prepared
+    assert source.find_prepared(target_dir, sample_rate=8000) is None
+
+    with open(f"{source_dir}/file_0.stm", "a") as f:
+        f.write("file_0 1 gk_speaker 7.0 8.0 <o,f0,female> eleven\n")
+    assert source.find_prepared(target_dir) is None
+
+    shutil.rmtree(f"{test_dir}/incremental-corpus")
+
+
+if __name__ == "__main__":
+    import sys
+
+    import pytest
+
+    pytest.main(sys.argv)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""
+Test lazy loading of transcripts and corpora
+"""
+
+import os
+import shutil
+
+from utils import get_sample_dir, get_test_dir
+
+from asrtoolkit.data_structures import Corpus, Transcript
+from asrtoolkit.data_structures.time_aligned_text import set_transcript_cache_size
+
+test_dir = get_test_dir(__file__)
+sample_dir = get_sample_dir(__file__)
+
+
+def test_lazy_corpus():
+    "transcripts in a corpus are only parsed once their segments are used"
+    corpus_dir = f"{test_dir}/lazy-corpus"
+    os.makedirs(corpus_dir, exist_ok=True)
+    for i in range(3):
+        shutil.copy(f"{test_dir}/small-test-file.mp3", f"{corpus_dir}/file-{i}.mp3")
+        shutil.copy(f"{test_dir}/small-test-file.stm", f"{corpus_dir}/file-{i}.stm")
+
+    corpus = Corpus({"location": corpus_dir})
+    subset = corpus[:2]
+    assert len(subset.exemplars) == 2
+    assert all(eg.transcript_file._segments is None for eg in corpus.exemplars)
+
+    eager = Transcript(f"{test_dir}/small-test-file.stm")
+    lazy = subset.exemplars[0].transcript_file
+    assert lazy.text() == eager.text()
+    assert lazy._segments is not None
+    assert subset.exemplars[1].transcript_file._segments is None
+
+    shutil.rmtree(corpus_dir)
+
+
+def test_parsed_transcript_cache():
+    "lazy transcripts share parsed segments through the bounded cache"
+    set_transcript_cache_size(1)
+    try:
+        first = Transcript(f"{sample_dir}/BillGatesTEDTalk.stm", lazy=True)
+        second = Transcript(f"{sample_dir}/BillGatesTEDTalk.stm", lazy=True)
+        assert first.segments is not second.segments
+        assert first.segments[0] is second.segments[0]
+        assert first._segments is None
+
+        # callers cannot change the cached list
+        segments = first.segments
+        segments.append(segments[0])
+        assert len(second.segments) == len(segments) - 1
+
+        other = Transcript(f"{sample_dir}/simple_test.stm", lazy=True)
+        assert other.segments is not first.segments
+        assert len(first.segments) == len(
+            Transcript(f"{sample_dir}/BillGatesTEDTalk.stm").segments
+        )
+    finally:
+        set_transcript_cache_size(0)
+
+
+if __name__ == "__main__":
+    import sys
+
+    import pytest
+
+    pytest.main(sys.argv)
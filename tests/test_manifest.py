@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""
+Test the persistent file property manifest
+"""
+
+import os
+import shutil
+
+from utils import get_test_dir
+
+from asrtoolkit.file_utils.manifest import MANIFEST_NAME, Manifest
+
+test_dir = get_test_dir(__file__)
+
+
+def test_manifest_cache_and_invalidation():
+    "properties are reused from disk until the file changes"
+    manifest_dir = f"{test_dir}/manifest-test"
+    os.makedirs(manifest_dir, exist_ok=True)
+    file_name = f"{manifest_dir}/file.stm"
+    with open(file_name, "w") as f:
+        f.write("some text")
+
+    calls = []
+
+    def compute(file_name):
+        calls.append(file_name)
+        return len(calls)
+
+    # nothing is written unless manifests are persisted
+    manifest = Manifest(manifest_dir)
+    assert manifest.cached(file_name, "n_words", compute) == 1
+    manifest.save()
+    assert not os.path.exists(f"{manifest_dir}/{MANIFEST_NAME}")
+
+    calls.clear()
+    manifest = Manifest(manifest_dir, persist=True)
+    assert manifest.cached(file_name, "n_words", compute) == 1
+    assert manifest.cached(file_name, "n_words", compute) == 1
+    manifest.save()
+
+    # a truncated last line from an interrupted run is ignored
+    with open(f"{manifest_dir}/{MANIFEST_NAME}", "a") as f:
+        f.write('{"name": "file.st')
+
+    reloaded = Manifest(manifest_dir, persist=True)
+    assert reloaded.cached(file_name, "n_words", compute) == 1
+    assert len(calls) == 1
+
+    with open(file_name, "a") as f:
+        f.write(" and more")
+    assert reloaded.cached(file_name, "n_words", compute) == 2
+    assert reloaded.lookup(file_name) == {"n_words": 2}
+
+    shutil.rmtree(manifest_dir)
+
+
+def test_manifest_compaction_keeps_other_writers():
+    "compacting keeps entries appended by another process since loading"
+    manifest_dir = f"{test_dir}/manifest-compaction-test"
+    os.makedirs(manifest_dir, exist_ok=True)
+    for name in ["a.stm", "b.stm"]:
+        with open(f"{manifest_dir}/{name}", "w") as f:
+            f.write(name)
+
+    first = Manifest(manifest_dir, persist=True)
+    second = Manifest(manifest_dir, persist=True)
+    second.record(f"{manifest_dir}/b.stm", n_words=2)
+    second.save()
+
+    # superseded lines force the first manifest to rewrite the file
+    for n_words in range(5):
+        first.record(f"{manifest_dir}/a.stm", n_words=n_words)
+    first.save()
+
+    reloaded = Manifest(manifest_dir)
+    assert reloaded.n_lines == 2
+    assert reloaded.lookup(f"{manifest_dir}/a.stm") == {"n_words": 4}
+    assert reloaded.lookup(f"{manifest_dir}/b.stm") == {"n_words": 2}
+
+    shutil.rmtree(manifest_dir)
+
+
+if __name__ == "__main__":
+    import sys
+
+    import pytest
+
+    pytest.main(sys.argv)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+"""
+Test normalization profiles
+"""
+
+import json
+import os
+import pickle
+
+from utils import get_test_dir
+
+from asrtoolkit.clean_formatting import (
+    DEFAULT_NORMALIZER,
+    NORMALIZERS,
+    Normalizer,
+    clean_text_file,
+    clean_up,
+    load_normalizer,
+)
+from asrtoolkit.metrics import wer
+
+test_dir = get_test_dir(__file__)
+
+PROFILE = {
+    "name": "radio",
+    "extends": "default",
+    "drop": ["thanks"],
+    "rules": [
+        {
+            "name": "police_codes",
+            "pattern": r"\b10-4\b",
+            "replacement": "ten four",
+            "before": "phone_numbers",
+        },
+        {
+            "name": "units",
+            "pattern": r"\b(\d+)hrs\b",
+            "replacement": r"\1 hours",
+            "before": "numbers",
+        },
+    ],
+}
+
+
+def test_normalizer_profile():
+    "profiles extend, reorder and drop rules and survive pickling"
+    profile_file = f"{test_dir}/radio_profile.json"
+    with open(profile_file, "w") as f:
+        json.dump(PROFILE, f)
+
+    normalizer = load_normalizer(profile_file)
+    assert normalizer is load_normalizer(profile_file)
+
+    # only the latest version of an edited profile is kept
+    stat = os.stat(profile_file)
+    os.utime(profile_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert load_normalizer(profile_file) is not normalizer
+    assert [key[0] for key in NORMALIZERS].count(os.path.abspath(profile_file)) == 1
+    normalizer = load_normalizer(profile_file)
+    assert normalizer.name == "radio"
+    assert list(normalizer.replacements).index("police_codes") < list(
+        normalizer.replacements
+    ).index("phone_numbers")
+    assert "thanks" not in normalizer.replacements
+
+    text = "copy that 10-4 thx at 1400hrs"
+    assert (
+        clean_up(text)
+        == "copy that ten negative four thanks at one thousand four hundred hrs"
+    )
+    assert (
+        clean_up(text, normalizer=profile_file)
+        == "copy that ten four thx at one thousand four hundred hours"
+    )
+    assert wer("ten four thx", text, normalizer=normalizer) != wer("ten four thx", text)
+
+    # profile rules also apply to text which is already lowercase
+    lowercase = Normalizer(
+        DEFAULT_NORMALIZER.rules
+        + [{"name": "tickers", "pattern": r"\baapl\b", "replacement": "apple"}]
+    )
+    assert clean_up("buy aapl", normalizer=lowercase) == "buy apple"
+    assert clean_up("Buy aapl", normalizer=lowercase) == "buy apple"
+    assert clean_up("buy aapl") == "buy aapl"
+
+    copy = pickle.loads(pickle.dumps(normalizer))
+    assert copy.version == normalizer.version
+    assert copy.replacements is normalizer.replacements
+    assert Normalizer().version == DEFAULT_NORMALIZER.version != normalizer.version
+
+    input_file = f"{test_dir}/normalizer_test.txt"
+    with open(input_file, "w") as f:
+        f.write(text + "\n")
+    clean_text_file(input_file, workers=2, normalizer=profile_file)
+    with open(f"{test_dir}/normalizer_test_cleaned.txt") as f:
+        assert f.read() == clean_up(text, normalizer=normalizer)
+
+    for file_name in [
+        profile_file,
+        input_file,
+        f"{test_dir}/normalizer_test_cleaned.txt",
+    ]:
+        os.remove(file_name)
+
+
+if __name__ == "__main__":
+    import sys
+
+    import pytest
+
+    pytest.main(sys.argv)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+"""
+Test packing corpora into shards and streaming them back
+"""
+
+import os
+import shutil
+
+import pytest
+from utils import get_test_dir
+
+from asrtoolkit.data_structures import Transcript
+from asrtoolkit.file_utils.shards import load_index
+from asrtoolkit.pack_corpus import pack_corpus, read_exemplars
+
+test_dir = get_test_dir(__file__)
+
+
+def test_pack_corpus():
+    "exemplars are split over size-bounded shards and read back by workers"
+    corpus_dir = f"{test_dir}/pack-corpus/corpus"
+    shard_dir = f"{test_dir}/pack-corpus/shards"
+    os.makedirs(corpus_dir, exist_ok=True)
+    for i in range(5):
+        shutil.copy(f"{test_dir}/small-test-file.mp3", f"{corpus_dir}/file_{i}.mp3")
+        shutil.copy(f"{test_dir}/small-test-file.stm", f"{corpus_dir}/file_{i}.stm")
+
+    audio_size = os.path.getsize(f"{test_dir}/small-test-file.mp3")
+    summary = pack_corpus(
+        corpus_dir, output_dir=shard_dir, max_shard_size=int(2.5 * audio_size)
+    )
+    assert summary == {"exemplars": 5, "shards": 3}
+    assert [_["keys"] for _ in load_index(shard_dir)] == [
+        ["file_0", "file_1"],
+        ["file_2", "file_3"],
+        ["file_4"],
+    ]
+
+    expected = Transcript(f"{test_dir}/small-test-file.stm")
+    with open(f"{test_dir}/small-test-file.mp3", "rb") as f:
+        expected_audio = f.read()
+
+    keys = []
+    for worker in range(2):
+        for key, extension, audio, transcript in read_exemplars(shard_dir, worker, 2):
+            keys.append(key)
+            assert extension == "mp3" and audio == expected_audio
+            assert str(transcript) == str(expected)
+    assert keys == ["file_0", "file_1", "file_4", "file_2", "file_3"]
+
+    # files with the same name in several corpora are kept apart by directory
+    other_dir = f"{test_dir}/pack-corpus/other"
+    shutil.copytree(corpus_dir, other_dir)
+    pack_corpus(corpus_dir, other_dir, output_dir=f"{shard_dir}-both")
+    assert load_index(f"{shard_dir}-both")[0]["keys"] == [
+        "{}/file_{}".format(name, i) for name in ["corpus", "other"] for i in range(5)
+    ]
+    shutil.copytree(corpus_dir, f"{other_dir}/corpus")
+    with pytest.raises(ValueError):
+        pack_corpus(corpus_dir, f"{other_dir}/corpus", output_dir=shard_dir)
+
+    shutil.rmtree(f"{test_dir}/pack-corpus")
+
+
+if __name__ == "__main__":
+    import sys
+
+    import pytest
+
+    pytest.main(sys.argv)
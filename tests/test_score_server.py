@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+"""
+Test scoring batches of transcripts with the scoring server
+"""
+
+import json
+import os
+import socket
+import tempfile
+import threading
+
+import pytest
+from utils import get_sample_dir
+
+from asrtoolkit.data_structures import Transcript
+from asrtoolkit.metrics import cer, tswde, wder, wer
+from asrtoolkit.metrics.server import ScoringClient, ScoringServer
+
+sample_dir = get_sample_dir(__file__)
+
+
+def start_server(normalizers=(), **kwargs):
+    "runs a scoring server in a background thread until it is listening"
+    server = ScoringServer(max_workers=2, normalizers=normalizers)
+    thread = threading.Thread(target=server.run, kwargs=kwargs, daemon=True)
+    thread.start()
+    assert server.ready.wait(30)
+    return server, thread
+
+
+def test_score_server():
+    "scores a batch and compares it to the metric functions"
+
+    reference = f"{sample_dir}/BillGatesTEDTalk.stm"
+    hypothesis = f"{sample_dir}/BillGatesTEDTalk_transcribed.stm"
+    ref, hyp = Transcript(reference), Transcript(hypothesis)
+    target_speaker = ref.segments[0].speaker
+
+    profile = os.path.join(tempfile.mkdtemp(), "server_profile.json")
+    with open(profile, "w") as f:
+        json.dump({"name": "plain", "extends": "default"}, f)
+
+    server, thread = start_server(normalizers=[profile], port=0)
+    host, port = server.address
+    with ScoringClient(host, port) as client:
+        results = client.score(
+            [
+                {"reference": reference, "hypothesis": hypothesis},
+                {
+                    "reference": reference,
+                    "hypothesis": reference,
+                    "metrics": ["tswde"],
+                    "target_speaker": target_speaker,
+                },
+                {"reference": reference, "hypothesis": "missing.stm"},
+                {
+                    "reference": {"content": "this is a cat"},
+                    "hypothesis": {"content": "this is a dog"},
+                },
+            ],
+            metrics=["wer", "cer", "wder"],
+        )
+        stats = client.stats()
+
+        with pytest.raises(RuntimeError):
+            client.score("not a list of pairs")
+
+        # only profiles loaded at startup may be used
+        pair = {"reference": reference, "hypothesis": hypothesis}
+        assert client.score([pair], normalizer="plain") == [{"wer": wer(ref, hyp)}]
+        assert client.score([pair], normalizer=profile) == [{"wer": wer(ref, hyp)}]
+        assert "error" in client.score([pair], normalizer=__file__)[0]
+        assert client.score([{"reference": reference, "hypothesis": reference}])
+    server.stop()
+    thread.join(30)
+
+    assert results[0] == {
+        "wer": wer(ref, hyp),
+        "cer": cer(ref, hyp),
+        "wder": wder(ref, hyp),
+    }
+    assert results[1] == {"tswde": tswde(ref, ref, target_speaker)}
+    assert "error" in results[2]
+    assert results[3] == {
+        "wer": 25.0,
+        "cer": cer("this is a cat", "this is a dog"),
+        "wder": 0.0,
+    }
+
+    assert stats["requests"] == 1
+    assert stats["pairs"] == 4
+    assert stats["errors"] == 1
+    assert stats["latency_ms"]["max"] > 0
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="needs Unix sockets")
+def test_score_server_unix_socket():
+    "scores over a Unix socket"
+
+    socket_path = os.path.join(tempfile.mkdtemp(), "score.sock")
+    server, thread = start_server(socket_path=socket_path)
+    with ScoringClient(socket_path=socket_path) as client:
+        results = client.score(
+            [{"reference": {"content": "a b"}, "hypothesis": {"content": "a c"}}]
+        )
+    server.stop()
+    thread.join(30)
+
+    assert results == [{"wer": 50.0}]
+    assert not os.path.exists(socket_path)
@@ -2,6 +2,7 @@
 """
 Test audio file splitter
 """
+
 import os
 import shutil
 from os.path import join as pjoin
@@ -9,6 +10,8 @@ from os.path import join as pjoin
 from utils import get_sample_dir, get_test_dir
 
 from asrtoolkit.data_structures import Corpus
+from asrtoolkit.data_structures import corpus as corpus_module
+from asrtoolkit.data_structures import exemplar as exemplar_module
 from asrtoolkit.split_corpus import split_corpus
 
 test_dir = get_test_dir(__file__)
@@ -74,6 +77,63 @@ def test_split_corpus():
     assert dev_corpus.validate()
 
 
+def test_cached_counts(monkeypatch):
+    """Test word and segment counts are computed once until transcripts change"""
+    corpus_dir = pjoin(test_dir, "split-corpus", "counts")
+    setup_test_corpus(corpus_dir, corpus_dir, corpus_dir, 3)
+    monkeypatch.setattr(corpus_module, "MIN_PARALLEL_COUNTS", 1)
+
+    valid_exemplars, total_words = Corpus(
+        {"location": corpus_dir}
+    ).count_exemplar_words()
+    assert total_words == 30
+    assert [eg.n_segments for eg in valid_exemplars] == [2, 2, 2]
+
+    monkeypatch.setattr(exemplar_module, "count_words_and_segments", None)
+    monkeypatch.setattr(corpus_module, "count_words_and_segments", None)
+    corpus = Corpus({"location": corpus_dir})
+    assert corpus.calculate_number_of_segments() == 6
+    assert corpus.exemplars[0].count_words() == 10
+
+    # counts made with other default rules are stale
+    stale = corpus.exemplars[0]
+    manifest = stale.transcript_manifest()
+    manifest.record(stale.transcript_file.location, normalizer="stale")
+    assert not stale.cached_counts()
+    stale.record_counts(10, 2)
+    assert stale.cached_counts()
+
+    with open(pjoin(corpus_dir, "file-00.stm"), "a") as f:
+        f.write("file-00 1 gk_speaker 7.0 8.0 <o,f0,female> eleven\n")
+    monkeypatch.undo()
+    assert corpus.calculate_number_of_segments() == 7
+
+    shutil.rmtree(pjoin(test_dir, "split-corpus"))
+
+
+def test_seeded_multiple_splits():
+    """Test splits are reproducible and disjoint"""
+    corpus_dir = pjoin(test_dir, "split-corpus", "seeded")
+    setup_test_corpus(corpus_dir, corpus_dir, corpus_dir, 10)
+
+    def make_splits():
+        return Corpus({"location": corpus_dir}).split_many(
+            {"test": 15, "dev": 5}, min_segments=1, seed=1337, stratify="source"
+        )
+
+    remaining, splits = make_splits()
+    same_remaining, same_splits = make_splits()
+    assert [eg.key() for eg in splits["test"].exemplars] == [
+        eg.key() for eg in same_splits["test"].exemplars
+    ]
+    assert [len(remaining)] + [len(_) for _ in splits.values()] == [7, 2, 1]
+    assert not any(
+        eg in remaining or eg in splits["dev"] for eg in splits["test"].exemplars
+    )
+
+    shutil.rmtree(pjoin(test_dir, "split-corpus"))
+
+
 if __name__ == "__main__":
     import sys
 
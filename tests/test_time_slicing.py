@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""
+Test time range queries on transcripts
+"""
+
+import random
+
+from utils import get_sample_dir
+
+from asrtoolkit.data_structures import Transcript
+from asrtoolkit.data_structures.segment import Segment
+from asrtoolkit.metrics.wer import compute_wer
+
+sample_dir = get_sample_dir(__file__)
+
+
+def test_slice_matches_filtering():
+    "binary searched slices match filtering every segment"
+    random.seed(0)
+    transcript = Transcript()
+    transcript.segments = [
+        Segment(start="{:.2f}".format(t), stop="{:.2f}".format(t + d), text=str(i))
+        for i, (t, d) in enumerate(
+            (random.uniform(0, 1000), random.uniform(0, 20)) for _ in range(2000)
+        )
+    ]
+    for _ in range(50):
+        start = random.uniform(-10, 1010)
+        stop = start + random.uniform(0, 50)
+        expected = {
+            seg.text
+            for seg in transcript.segments
+            if float(seg.start) < stop and float(seg.stop) > start
+        }
+        assert {seg.text for seg in transcript.slice(start, stop).segments} == expected
+        assert {seg.text for seg in transcript.at(start)} == {
+            seg.text
+            for seg in transcript.segments
+            if float(seg.start) <= start < float(seg.stop)
+        }
+
+    clipped = transcript.slice(100, 200, clip=True).segments
+    assert all(100 <= float(seg.start) <= float(seg.stop) <= 200 for seg in clipped)
+
+    # the index is rebuilt when segments change
+    transcript.segments.append(Segment(start="2000.00", stop="2001.00", text="new"))
+    assert [seg.text for seg in transcript.at(2000.5)] == ["new"]
+
+    # and when segments are replaced or their times edited in place
+    transcript.segments[-1] = Segment(start="3000.00", stop="3001.00", text="moved")
+    assert transcript.at(2000.5) == []
+    assert [seg.text for seg in transcript.at(3000.5)] == ["moved"]
+    transcript.segments[-1].start, transcript.segments[-1].stop = "4000.00", "4001.00"
+    assert transcript.at(3000.5) == []
+    assert [seg.text for seg in transcript.at(4000.5)] == ["moved"]
+
+
+def test_windows():
+    "windows cover the transcript until its last segment ends"
+    transcript = Transcript(f"{sample_dir}/BillGatesTEDTalk.stm")
+    end = max(float(seg.stop) for seg in transcript.segments)
+    windows = list(transcript.windows(60, clip=True))
+    assert windows[0][0] == 0.0 and windows[-1][0] < end <= windows[-1][0] + 60
+    assert all(
+        start <= float(seg.start) and float(seg.stop) <= start + 60
+        for start, window in windows
+        for seg in window.segments
+    )
+
+
+def test_windowed_wer():
+    "scoring a time range only scores the segments overlapping it"
+    reference = f"{sample_dir}/BillGatesTEDTalk.stm"
+    hypothesis = f"{sample_dir}/BillGatesTEDTalk_transcribed.stm"
+    assert compute_wer(reference, reference, start=30, stop=90) == 0
+    assert compute_wer(reference, hypothesis, start=30, stop=90) != compute_wer(
+        reference, hypothesis
+    )
+
+
+if __name__ == "__main__":
+    import sys
+
+    import pytest
+
+    pytest.main(sys.argv)
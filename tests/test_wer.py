@@ -3,12 +3,16 @@
 Test wer calculation
 """
 
-from utils import get_sample_dir
+import os
+
+from utils import get_sample_dir, get_test_dir
 
 from asrtoolkit.data_structures import Transcript
 from asrtoolkit.metrics import cer, wer
+from asrtoolkit.metrics.wer import compute_wer, standardize_transcript
 
 sample_dir = get_sample_dir(__file__)
+test_dir = get_test_dir(__file__)
 
 
 def test_conversion_wer():
@@ -43,6 +47,56 @@ def test_non_ascii():
     assert cer(ref, hyp) == 100.0 / 3.0
 
 
+def test_normalized_stm_fast_path():
+    """
+    STM files written by asrtoolkit are scored without cleaning them again
+    """
+    written = Transcript("This is um a Test\nwith 2 lines", file_format="txt").write(
+        f"{test_dir}/normalized_test.stm"
+    )
+    transcript = Transcript(written.location)
+    assert transcript.normalized
+    assert not Transcript(f"{sample_dir}/BillGatesTEDTalk.txt").normalized
+
+    for remove_nsns in (False, True):
+        assert standardize_transcript(
+            transcript, remove_nsns
+        ) == standardize_transcript(transcript.text(), remove_nsns)
+
+    transcript.segments[0].text = "Not Clean"
+    assert not transcript.normalized
+    transcript.segments[0].text = "hello world"
+    assert wer(transcript, "hello world with two lines") == 0.0
+    transcript.segments[0].text = "Hello World 2"
+    assert wer(transcript, "hello world two with two lines") == 0.0
+
+    os.remove(written.location)
+
+
+def test_normalized_stm_rule_words():
+    """
+    lowercase STM text with apostrophes is still cleaned, as rules may match it
+    """
+    lines = ["it 's otc", "we 'll pay one mln", "thx and plz"]
+    with open(f"{test_dir}/rule_words_test.stm", "w") as f:
+        for i, line in enumerate(lines):
+            f.write(f"test 1 speaker {i}.0 {i + 1}.0 <o,f0,male> {line}\n")
+    with open(f"{test_dir}/rule_words_test.txt", "w") as f:
+        f.write("it's o t c\nwe'll pay one million\nthanks and please\n")
+
+    reference = Transcript(f"{test_dir}/rule_words_test.stm")
+    assert not reference.normalized
+    assert (
+        compute_wer(
+            f"{test_dir}/rule_words_test.stm", f"{test_dir}/rule_words_test.txt"
+        )
+        == 0.0
+    )
+
+    os.remove(f"{test_dir}/rule_words_test.stm")
+    os.remove(f"{test_dir}/rule_words_test.txt")
+
+
 if __name__ == "__main__":
     import sys
 